@@ -0,0 +1,77 @@
+"""
+Lightweight stand-ins for the discord.py objects that cogs are driven by, so they can be
+benchmarked without connecting to Discord.
+
+Only the attributes that the cogs actually use are provided.
+"""
+
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+
+@dataclass
+class FakeBot:
+    loop: object = None
+    user: object = None
+
+
+@dataclass
+class FakeCog:
+    qualified_name: str = "benchmark"
+
+
+@dataclass
+class FakeGuild:
+    id: int
+
+
+@dataclass
+class FakeChannel:
+    id: int
+    guild: Optional[FakeGuild] = None
+
+
+@dataclass
+class FakeUser:
+    id: int = 0
+    bot: bool = False
+
+
+@dataclass
+class FakeMessage:
+    id: int
+    content: str
+    channel: FakeChannel
+    guild: Optional[FakeGuild] = None
+    author: FakeUser = field(default_factory=FakeUser)
+    attachments: List[object] = field(default_factory=list)
+
+    @property
+    def jump_url(self) -> str:
+        guild_id = self.guild.id if self.guild else "@me"
+        return f"https://discord.com/channels/{guild_id}/{self.channel.id}/{self.id}"
+
+    async def add_reaction(self, emoji: str):
+        pass
+
+
+class FakeContext:
+    """Records whatever is sent, instead of sending it anywhere."""
+
+    def __init__(self, message: FakeMessage):
+        self.message: FakeMessage = message
+        self.channel: FakeChannel = message.channel
+        self.guild: Optional[FakeGuild] = message.guild
+        self.sent: List[str] = []
+        self._next_message_id: int = message.id + 1
+
+    async def send(self, content: str = None, **kwargs) -> FakeMessage:
+        self.sent.append(content)
+        message = FakeMessage(
+            id=self._next_message_id,
+            content=content,
+            channel=self.channel,
+            guild=self.guild,
+        )
+        self._next_message_id += 1
+        return message
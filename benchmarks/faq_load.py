@@ -0,0 +1,83 @@
+"""
+Measure how long it takes to load FAQ data on startup.
+
+Run from the repository root with:
+
+    python -m benchmarks.faq_load --guilds 1000 --entries 100
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from commanderbot_ext.faq.faq_cache import FaqCache
+
+
+def make_data(
+    guild_count: int,
+    entries_per_guild: int,
+    seed: int = 0,
+    aliases_per_entry: Optional[int] = None,
+    content_size: Optional[int] = None,
+) -> dict:
+    """
+    Make data for a database of FAQs. Unless given, the number of aliases and the size of
+    the content varies from one entry to the next.
+    """
+    rng = random.Random(seed)
+    start = datetime(2021, 1, 1)
+    guilds = {}
+    for guild_index in range(guild_count):
+        entries = {}
+        for entry_index in range(entries_per_guild):
+            added_on = start + timedelta(seconds=rng.randrange(10_000_000))
+            alias_count = aliases_per_entry
+            if alias_count is None:
+                alias_count = rng.choice((0, 0, 1, 2))
+            aliases = [f"alias{entry_index}-{i}" for i in range(alias_count)]
+            entries[f"faq{entry_index}"] = {
+                "content": "x" * (content_size or rng.randrange(50, 500)),
+                "message_link": f"https://discord.com/channels/{guild_index}/1/{entry_index}",
+                "aliases": aliases,
+                "added_on": added_on.isoformat(),
+                "updated_on": (added_on + timedelta(microseconds=123)).isoformat(),
+                "hits": rng.randrange(1000),
+            }
+        guilds[str(10**17 + guild_index)] = {"entries": entries}
+    return {"guilds": guilds}
+
+
+async def run(guild_count: int, entries_per_guild: int):
+    raw = json.dumps(make_data(guild_count, entries_per_guild))
+
+    started = time.perf_counter()
+    data = json.loads(raw)
+    parsed = time.perf_counter()
+    cache = await FaqCache.deserialize(data)
+    loaded = time.perf_counter()
+    for guild_data in cache.guilds.values():
+        for entry in guild_data.entries.values():
+            entry.added_on
+    touched = time.perf_counter()
+
+    print(f"guilds:              {guild_count}")
+    print(f"entries:             {guild_count * entries_per_guild}")
+    print(f"json.loads:          {parsed - started:.3f}s")
+    print(f"FaqCache.deserialize: {loaded - parsed:.3f}s")
+    print(f"access every entry:  {touched - loaded:.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--guilds", type=int, default=1000)
+    parser.add_argument("--entries", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(run(args.guilds, args.entries))
+
+
+if __name__ == "__main__":
+    main()
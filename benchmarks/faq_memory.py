@@ -0,0 +1,62 @@
+"""
+Measure how much memory FAQ entries take up once they have been accessed.
+
+Run from the repository root with:
+
+    python -m benchmarks.faq_memory --guilds 100 --entries 100
+"""
+
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+
+from benchmarks.faq_load import make_data
+from commanderbot_ext.faq.faq_cache import FaqCache
+
+
+def run(guild_count: int, entries_per_guild: int):
+    data = make_data(guild_count, entries_per_guild)
+    raw = json.dumps(data)
+    entry_count = guild_count * entries_per_guild
+    # Content is stored as-is no matter what, so it's reported separately.
+    content_bytes = sum(
+        sys.getsizeof(entry["content"])
+        for guild_data in data["guilds"].values()
+        for entry in guild_data["entries"].values()
+    )
+    del data
+
+    gc.collect()
+    tracemalloc.start()
+    cache = FaqCache.from_data(json.loads(raw))
+    loaded, _ = tracemalloc.get_traced_memory()
+    for guild_data in cache.guilds.values():
+        for entry in guild_data.entries.values():
+            pass
+    # Drop the references kept by the parsed JSON, so only the entries themselves remain.
+    gc.collect()
+    materialized, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"entries:                   {entry_count}")
+    print(f"bytes per entry (loaded):  {loaded / entry_count:.0f}")
+    print(f"bytes per entry (in use):  {materialized / entry_count:.0f}")
+    print(f"peak bytes per entry:      {peak / entry_count:.0f}")
+    print(f"content bytes per entry:   {content_bytes / entry_count:.0f}")
+    print(
+        f"overhead per entry:        {(materialized - content_bytes) / entry_count:.0f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--guilds", type=int, default=100)
+    parser.add_argument("--entries", type=int, default=100)
+    args = parser.parse_args()
+    run(args.guilds, args.entries)
+
+
+if __name__ == "__main__":
+    main()
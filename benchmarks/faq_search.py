@@ -0,0 +1,133 @@
+"""
+Measure how long it takes to search the FAQs of a guild with many long entries.
+
+Run from the repository root with:
+
+    python -m benchmarks.faq_search --entries 5000 --words 300
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from typing import List
+
+from commanderbot_ext.faq.faq_cache import FaqEntry, FaqGuildData
+from commanderbot_ext.faq.faq_options import FaqOptions
+from commanderbot_ext.faq.faq_sqlite_store import FaqSqliteStore
+
+GUILD_ID = 10**17
+
+
+def make_vocabulary(size: int, rng: random.Random) -> List[str]:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return [
+        "".join(rng.choice(letters) for _ in range(rng.randrange(3, 10)))
+        for _ in range(size)
+    ]
+
+
+def make_entries(
+    entry_count: int,
+    words_per_entry: int,
+    vocabulary: List[str],
+    weights: List[float],
+    rng: random.Random,
+) -> List[FaqEntry]:
+    now = datetime.utcnow()
+    entries = []
+    for entry_index in range(entry_count):
+        words = rng.choices(vocabulary, weights, k=words_per_entry)
+        entries.append(
+            FaqEntry(
+                name=f"faq{entry_index}",
+                content=" ".join(words),
+                message_link=None,
+                aliases=[f"alias{entry_index}"] if rng.random() < 0.3 else [],
+                added_on=now,
+                updated_on=now,
+                hits=rng.randrange(1000),
+            )
+        )
+    return entries
+
+
+def percentiles(timings: List[float]) -> str:
+    timings = sorted(timings)
+    p50 = statistics.median(timings)
+    p95 = timings[int(len(timings) * 0.95)]
+    return f"p50 {p50 * 1000:.3f}ms, p95 {p95 * 1000:.3f}ms, max {timings[-1] * 1000:.3f}ms"
+
+
+async def run(entry_count: int, words_per_entry: int, query_count: int):
+    rng = random.Random(0)
+    # Skew word frequencies like natural text, so some terms are far more common.
+    vocabulary = make_vocabulary(20_000, rng)
+    weights = [1.0 / (rank + 1) for rank in range(len(vocabulary))]
+    entries = make_entries(entry_count, words_per_entry, vocabulary, weights, rng)
+    # Draw query terms like the content, so that some of them match most entries.
+    queries = [
+        " ".join(rng.choices(vocabulary, weights, k=rng.randrange(1, 4)))
+        for _ in range(query_count)
+    ]
+    print(f"entries:             {entry_count}")
+    print(f"words per entry:     {words_per_entry}")
+
+    guild_data = FaqGuildData(guild_id=GUILD_ID, entries={})
+    for entry in entries:
+        guild_data.add_entry(entry)
+    started = time.perf_counter()
+    guild_data.search_entries("", 5)
+    print(f"build index:         {time.perf_counter() - started:.3f}s")
+
+    timings = []
+    for query in queries:
+        started = time.perf_counter()
+        guild_data.search_entries(query, 5)
+        timings.append(time.perf_counter() - started)
+    print(f"search in memory:    {percentiles(timings)}")
+
+    timings = []
+    for entry in entries[:query_count]:
+        started = time.perf_counter()
+        guild_data.update_entry(entry, entry.content[::-1], None, entry.updated_on)
+        timings.append(time.perf_counter() - started)
+    print(f"update in memory:    {percentiles(timings)}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        bot = SimpleNamespace(loop=None)
+        cog = SimpleNamespace(qualified_name="faq")
+        options = FaqOptions(database=os.path.join(directory, "faq.db"))
+        store = FaqSqliteStore(bot, cog, options)
+        await store.async_init()
+        guild = SimpleNamespace(id=GUILD_ID)
+        started = time.perf_counter()
+        for entry in entries:
+            await store.add_guild_faq(guild, entry)
+        print(f"fill SQLite:         {time.perf_counter() - started:.3f}s")
+
+        timings = []
+        for query in queries:
+            started = time.perf_counter()
+            await store.search_guild_faqs(guild, query, 5)
+            timings.append(time.perf_counter() - started)
+        print(f"search SQLite:       {percentiles(timings)}")
+        await store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=5000)
+    parser.add_argument("--words", type=int, default=300)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args.entries, args.words, args.queries))
+
+
+if __name__ == "__main__":
+    main()
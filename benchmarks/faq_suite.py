@@ -0,0 +1,310 @@
+"""
+Benchmark the FAQ cog end-to-end against a synthetic dataset, and report the results as JSON.
+
+Each operation is driven through `FaqCog`, `FaqState`, `FaqGuildState` and the store, using
+stand-ins for the discord.py objects. For every operation, the throughput and latency
+percentiles are measured first, and then the peak memory allocated while running it again
+with `tracemalloc`. The cog runs with its default options, so the tail latencies of anything
+that counts hits include the occasional write of those hits to the database.
+
+Run from the repository root with:
+
+    python -m benchmarks.faq_suite --guilds 100 --entries 500 --output before.json
+
+And compare against an earlier run with:
+
+    python -m benchmarks.faq_suite --guilds 100 --entries 500 --compare before.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Awaitable, Callable, Dict, List, TextIO
+
+from benchmarks.fakes import (
+    FakeBot,
+    FakeChannel,
+    FakeContext,
+    FakeGuild,
+    FakeMessage,
+)
+from benchmarks.faq_load import make_data
+from commanderbot_ext.faq.faq_cog import FaqCog
+
+STORES = ("json", "sqlite", "sharded")
+
+PREFIX = "?"
+
+Operation = Callable[[int], Awaitable[None]]
+
+
+def write_database(data: dict, store: str, directory: str) -> str:
+    """Write the data wherever the given kind of store expects it, and return where."""
+    json_path = os.path.join(directory, "faq.json")
+    with open(json_path, "w", encoding="utf-8") as file:
+        json.dump({"version": 1, "data": data}, file)
+    if store == "json":
+        return json_path
+    if store == "sqlite":
+        # Imported the first time the store is opened, which isn't measured.
+        return os.path.join(directory, "faq.db")
+    shard_path = os.path.join(directory, "faq")
+    os.makedirs(shard_path)
+    for guild_id, guild_data in data["guilds"].items():
+        with open(os.path.join(shard_path, f"{guild_id}.json"), "w") as file:
+            json.dump({"version": 1, "data": guild_data}, file)
+    return shard_path
+
+
+def summarize(timings_ns: List[int]) -> Dict[str, float]:
+    timings_us = sorted(timing / 1000 for timing in timings_ns)
+
+    def percentile(fraction: float) -> float:
+        return round(
+            timings_us[min(int(len(timings_us) * fraction), len(timings_us) - 1)], 3
+        )
+
+    total_s = sum(timings_ns) / 1e9
+    return {
+        "iterations": len(timings_us),
+        "ops_per_sec": round(len(timings_us) / total_s, 1) if total_s else None,
+        "mean_us": round(statistics.mean(timings_us), 3),
+        "p50_us": percentile(0.50),
+        "p90_us": percentile(0.90),
+        "p99_us": percentile(0.99),
+        "max_us": round(timings_us[-1], 3),
+    }
+
+
+async def measure(
+    operation: Operation, iterations: int, memory_iterations: int
+) -> dict:
+    timings_ns = []
+    for i in range(iterations):
+        started = time.perf_counter_ns()
+        await operation(i)
+        timings_ns.append(time.perf_counter_ns() - started)
+    result = summarize(timings_ns)
+    tracemalloc.start()
+    for i in range(memory_iterations):
+        await operation(i)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result["peak_memory_bytes"] = peak
+    return result
+
+
+async def run(args: argparse.Namespace) -> dict:
+    rng = random.Random(args.seed)
+    data = make_data(
+        args.guilds,
+        args.entries,
+        seed=args.seed,
+        aliases_per_entry=args.aliases,
+        content_size=args.content_size,
+    )
+    guilds = [FakeGuild(id=int(guild_id)) for guild_id in data["guilds"]]
+    entry_names = [f"faq{i}" for i in range(args.entries)]
+    # Each guild has its own aliases, so queries for them have to line up with the guild.
+    aliases_by_guild = [
+        [
+            alias
+            for entry in guild_data["entries"].values()
+            for alias in entry["aliases"]
+        ]
+        for guild_data in data["guilds"].values()
+    ]
+    directory = tempfile.mkdtemp()
+    database = write_database(data, args.store, directory)
+    options = dict(
+        database=database,
+        prefix=PREFIX,
+        json_import=os.path.join(directory, "faq.json"),
+    )
+    del data
+
+    bot = FakeBot(loop=asyncio.get_running_loop())
+    cogs: List[FaqCog] = []
+
+    async def open_cog() -> FaqCog:
+        cog = FaqCog(bot, **options)
+        await cog.on_ready()
+        cogs.append(cog)
+        return cog
+
+    async def close_cogs():
+        while cogs:
+            await cogs.pop().state.close()
+
+    # Open the database once up-front, so that any one-time setup isn't measured.
+    await open_cog()
+    await close_cogs()
+
+    def make_context(i: int, content: str) -> FakeContext:
+        guild = guilds[i % len(guilds)]
+        channel = FakeChannel(id=i % 10, guild=guild)
+        return FakeContext(
+            FakeMessage(id=i, content=content, channel=channel, guild=guild)
+        )
+
+    results = {}
+
+    async def op_load(i: int):
+        await open_cog()
+        await close_cogs()
+
+    results["load"] = await measure(op_load, args.loads, 1)
+
+    cog = await open_cog()
+    state = cog.state
+    store = state.store
+
+    queries = [rng.choice(entry_names) for _ in range(args.iterations)]
+    alias_queries = [
+        rng.choice(aliases_by_guild[i % len(guilds)] or entry_names)
+        for i in range(args.iterations)
+    ]
+    misses = [rng.choice(entry_names)[::-1] for _ in range(args.iterations)]
+
+    async def op_show_by_name(i: int):
+        await state.show_faq(make_context(i, ""), queries[i])
+
+    async def op_show_by_alias(i: int):
+        await state.show_faq(make_context(i, ""), alias_queries[i])
+
+    async def op_show_miss(i: int):
+        await state.show_faq(make_context(i, ""), misses[i])
+
+    async def op_increment_hits(i: int):
+        guild = guilds[i % len(guilds)]
+        entry = await store.get_guild_faq_by_name(guild, queries[i])
+        await store.increment_faq_hits(guild, entry)
+
+    async def op_list_page(i: int):
+        await state.list_faqs(make_context(i, ""), 1 + i % 3)
+
+    async def op_search(i: int):
+        await state.search_faqs(make_context(i, ""), "x " + queries[i])
+
+    async def op_export(i: int):
+        await state.export_faqs(make_context(i, ""))
+
+    rejected_messages = [
+        FakeMessage(
+            id=i,
+            content=f"just chatting {i}",
+            channel=FakeChannel(id=0),
+            guild=guilds[i % len(guilds)],
+        )
+        for i in range(args.iterations)
+    ]
+
+    async def op_on_message_rejected(i: int):
+        await cog.on_message(rejected_messages[i])
+
+    operations: Dict[str, Operation] = {
+        "show_by_name": op_show_by_name,
+        "show_by_alias": op_show_by_alias,
+        "show_miss": op_show_miss,
+        "increment_hits": op_increment_hits,
+        "list_page": op_list_page,
+        "search": op_search,
+        "on_message_rejected": op_on_message_rejected,
+    }
+    memory_iterations = min(args.iterations, 1000)
+    for name, operation in operations.items():
+        results[name] = await measure(operation, args.iterations, memory_iterations)
+
+    export_iterations = min(args.iterations, len(guilds))
+    results["export"] = await measure(op_export, export_iterations, 1)
+
+    if args.store == "json":
+
+        async def op_serialize(i: int):
+            json.dumps(await store.serialize())
+
+        results["serialize"] = await measure(op_serialize, args.loads, 1)
+
+    await close_cogs()
+    shutil.rmtree(directory)
+
+    return {
+        "label": args.label,
+        "python": platform.python_version(),
+        "parameters": {
+            "store": args.store,
+            "guilds": args.guilds,
+            "entries": args.entries,
+            "aliases": args.aliases,
+            "content_size": args.content_size,
+            "iterations": args.iterations,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+
+def compare(report: dict, baseline: dict, file: TextIO):
+    """Print how each operation changed relative to a baseline report."""
+    print(
+        f"{'operation':<22} {'ops/s':>12} {'p50':>10} {'p99':>10} {'memory':>10}",
+        file=file,
+    )
+    for name, result in report["results"].items():
+        before = baseline["results"].get(name)
+        if not before:
+            continue
+        cells = []
+        for key in ("ops_per_sec", "p50_us", "p99_us", "peak_memory_bytes"):
+            if before.get(key) and result.get(key) is not None:
+                cells.append(f"{result[key] / before[key]:>9.2f}x")
+            else:
+                cells.append(f"{'-':>10}")
+        print(f"{name:<22} {cells[0]:>12} {cells[1]} {cells[2]} {cells[3]}", file=file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--store", choices=STORES, default="json")
+    parser.add_argument("--guilds", type=int, default=100)
+    parser.add_argument("--entries", type=int, default=500)
+    parser.add_argument("--aliases", type=int, default=None, help="aliases per entry")
+    parser.add_argument("--content-size", type=int, default=None)
+    parser.add_argument("--iterations", type=int, default=10_000)
+    parser.add_argument("--loads", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--label", default=None)
+    parser.add_argument("--output", help="where to write the report, otherwise stdout")
+    parser.add_argument("--compare", help="an earlier report to compare against")
+    args = parser.parse_args()
+
+    # The cog logs every file it reads and writes, and the journal warns about anything
+    # it skips. None of it belongs in the report, which may be going to stdout.
+    logging.disable(logging.WARNING)
+    report = asyncio.run(run(args))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline = json.load(file)
+        # Keep stdout to the report itself, so it can be piped as JSON.
+        compare(report, baseline, sys.stdout if args.output else sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
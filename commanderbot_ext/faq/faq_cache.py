@@ -1,63 +1,175 @@
-from dataclasses import dataclass
-from datetime import datetime
-from typing import Dict, Set
+import gc
+import sys
+from bisect import bisect_left, insort
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import (
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    MutableMapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
 
 from commanderbot_lib.types import GuildID
 
+from commanderbot_ext.faq.faq_search import FaqSearchIndex
+from commanderbot_ext.faq.faq_trigrams import (
+    FaqTrigramIndex,
+    make_trigrams,
+    rank_suggestions,
+)
+
+# Shared by every entry that has no aliases, which is most of them.
+NO_ALIASES: FrozenSet[str] = frozenset()
+
+EPOCH = datetime(1970, 1, 1)
+
+ONE_MICROSECOND = timedelta(microseconds=1)
+
+
+def make_aliases(aliases: Iterable[str]) -> FrozenSet[str]:
+    if not aliases:
+        return NO_ALIASES
+    return frozenset(sys.intern(alias) for alias in aliases)
+
+
+def datetime_to_us(value: datetime) -> int:
+    # Timestamps are naive UTC, but convert any aware ones to match.
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - EPOCH) // ONE_MICROSECOND
+
+
+def us_to_datetime(value: int) -> datetime:
+    return EPOCH + timedelta(microseconds=value)
+
+
+class FaqEntryRecord(NamedTuple):
+    """
+    The validated but otherwise unprocessed form of a `FaqEntry`, which is kept around
+    until the entry is accessed for the first time.
+    """
 
-@dataclass
-class FaqEntry:
-    name: str
     content: str
-    message_link: str
-    aliases: Set[str]
-    added_on: datetime
-    updated_on: datetime
+    message_link: Optional[str]
+    aliases: List[str]
+    added_on: str
+    updated_on: str
     hits: int
 
     @staticmethod
-    async def deserialize(data: dict, name: str) -> "FaqEntry":
+    def from_data(data: dict) -> "FaqEntryRecord":
         if not isinstance(data, dict):
             raise ValueError(f"Invalid FAQ data: {type(data)}")
+        record = FaqEntryRecord(
+            data["content"],
+            data["message_link"],
+            data["aliases"],
+            data["added_on"],
+            data["updated_on"],
+            data["hits"],
+        )
+        # This runs for every entry on startup, so check all of the fields at once.
+        assert (
+            isinstance(record.content, str)
+            and (record.message_link is None or isinstance(record.message_link, str))
+            and isinstance(record.aliases, list)
+            and isinstance(record.added_on, str)
+            and isinstance(record.updated_on, str)
+            and isinstance(record.hits, int)
+        ), f"Invalid FAQ data: {data}"
+        for alias in record.aliases:
+            assert isinstance(alias, str), f"Invalid FAQ alias: {alias}"
+        return record
+
+    def serialize(self) -> dict:
+        return {
+            "content": self.content,
+            "message_link": self.message_link,
+            "aliases": self.aliases,
+            "added_on": self.added_on,
+            "updated_on": self.updated_on,
+            "hits": self.hits,
+        }
 
-        # content
-        content: str = data["content"]
-        assert isinstance(content, str)
 
-        # message_link
-        message_link = data["message_link"]
-        assert message_link is None or isinstance(message_link, str)
+class FaqEntry:
+    """
+    A single FAQ. There can be a great many of these, so they are kept as lean as possible:
+    attributes are slotted, names and aliases are interned, timestamps are only turned
+    into `datetime` objects when accessed, and entries without aliases share the same
+    empty set of them.
+    """
+
+    __slots__ = (
+        "name",
+        "content",
+        "message_link",
+        "aliases",
+        "_added_on_us",
+        "_updated_on_us",
+        "hits",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        content: str,
+        message_link: Optional[str],
+        aliases: Iterable[str],
+        added_on: datetime,
+        updated_on: datetime,
+        hits: int,
+    ):
+        self.name: str = sys.intern(name)
+        self.content: str = content
+        self.message_link: Optional[str] = message_link
+        self.aliases: FrozenSet[str] = make_aliases(aliases)
+        self._added_on_us: int = datetime_to_us(added_on)
+        self._updated_on_us: int = datetime_to_us(updated_on)
+        self.hits: int = hits
 
-        # aliases
-        aliases = data["aliases"]
-        assert isinstance(aliases, list)
-        for alias in aliases:
-            assert isinstance(alias, str)
+    def __repr__(self) -> str:
+        return f"FaqEntry(name={self.name!r}, aliases={set(self.aliases)!r}, hits={self.hits})"
 
-        # added_on
-        raw_added_on = data["added_on"]
-        assert isinstance(raw_added_on, str)
-        added_on = datetime.fromisoformat(raw_added_on)
+    @property
+    def added_on(self) -> datetime:
+        return us_to_datetime(self._added_on_us)
 
-        # updated_on
-        raw_updated_on = data["updated_on"]
-        assert isinstance(raw_updated_on, str)
-        updated_on = datetime.fromisoformat(raw_updated_on)
+    @added_on.setter
+    def added_on(self, value: datetime):
+        self._added_on_us = datetime_to_us(value)
 
-        # hits
-        hits = data["hits"]
-        assert isinstance(hits, int)
+    @property
+    def updated_on(self) -> datetime:
+        return us_to_datetime(self._updated_on_us)
 
+    @updated_on.setter
+    def updated_on(self, value: datetime):
+        self._updated_on_us = datetime_to_us(value)
+
+    @staticmethod
+    def from_record(record: FaqEntryRecord, name: str) -> "FaqEntry":
         return FaqEntry(
             name=name,
-            content=content,
-            message_link=message_link,
-            aliases=set(aliases),
-            added_on=added_on,
-            updated_on=updated_on,
-            hits=hits,
+            content=record.content,
+            message_link=record.message_link,
+            aliases=record.aliases,
+            added_on=datetime.fromisoformat(record.added_on),
+            updated_on=datetime.fromisoformat(record.updated_on),
+            hits=record.hits,
         )
 
+    @staticmethod
+    async def deserialize(data: dict, name: str) -> "FaqEntry":
+        return FaqEntry.from_record(FaqEntryRecord.from_data(data), name)
+
     def serialize(self) -> dict:
         return {
             "content": self.content,
@@ -69,31 +181,290 @@ class FaqEntry:
         }
 
 
+class FaqEntries(MutableMapping[str, FaqEntry]):
+    """
+    A mapping of FAQ names to entries, where each entry is kept as a `FaqEntryRecord` until
+    it is accessed for the first time, at which point it is replaced by a `FaqEntry`.
+    """
+
+    def __init__(
+        self, items: Optional[Dict[str, Union[FaqEntry, FaqEntryRecord]]] = None
+    ):
+        self._items: Dict[str, Union[FaqEntry, FaqEntryRecord]] = items or {}
+
+    def __getitem__(self, faq_name: str) -> FaqEntry:
+        item = self._items[faq_name]
+        if isinstance(item, FaqEntryRecord):
+            # Replacing the value of an existing key is safe even while iterating.
+            item = FaqEntry.from_record(item, faq_name)
+            self._items[faq_name] = item
+        return item
+
+    def __setitem__(self, faq_name: str, faq_entry: FaqEntry):
+        self._items[faq_name] = faq_entry
+
+    def __delitem__(self, faq_name: str):
+        del self._items[faq_name]
+
+    def __contains__(self, faq_name: object) -> bool:
+        return faq_name in self._items
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._items)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def iter_aliases(self) -> Iterable[Tuple[str, Iterable[str]]]:
+        """Yield the aliases of every entry, without having to materialize them."""
+        for faq_name, item in self._items.items():
+            yield faq_name, item.aliases
+
+    def iter_hits(self) -> Iterable[Tuple[str, int]]:
+        """Yield the hits of every entry, without having to materialize them."""
+        for faq_name, item in self._items.items():
+            yield faq_name, item.hits
+
+    def serialize(self) -> dict:
+        # Entries that were never accessed are serialized as-is.
+        return {faq_name: item.serialize() for faq_name, item in self._items.items()}
+
+
 @dataclass
 class FaqGuildData:
     guild_id: GuildID
-    entries: Dict[str, FaqEntry]
+    entries: FaqEntries
+    prefix: Optional[str] = None
+
+    # Maps both names and aliases to the name of their entry, so that queries are a single
+    # look-up without materializing any other entries.
+    _names_by_key: Dict[str, str] = field(
+        init=False, repr=False, compare=False, default_factory=dict
+    )
+
+    # Aliases left out of the index because they clash with another key, mapped to the
+    # names of their entries, so they can take over once that key is gone.
+    _shadowed_keys: Dict[str, List[str]] = field(
+        init=False, repr=False, compare=False, default_factory=dict
+    )
+
+    # Used to suggest similar keys for queries that don't match any. Built the first time
+    # it's needed, and kept up-to-date from then on.
+    _trigram_index: Optional[FaqTrigramIndex] = field(
+        init=False, repr=False, compare=False, default=None
+    )
+
+    # Used to search the names, aliases and content of entries. Like the trigram index,
+    # it's built the first time it's needed and kept up-to-date from then on.
+    _search_index: Optional[FaqSearchIndex] = field(
+        init=False, repr=False, compare=False, default=None
+    )
+
+    # Every entry as `(hits, name)` in sorted order, so that listing a page of entries
+    # doesn't require sorting all of them. Built the first time it's needed.
+    _hits_order: Optional[List[Tuple[int, str]]] = field(
+        init=False, repr=False, compare=False, default=None
+    )
+
+    def __post_init__(self):
+        if not isinstance(self.entries, FaqEntries):
+            self.entries = FaqEntries(dict(self.entries))
+        self.rebuild_index()
 
     @staticmethod
-    async def deserialize(data: dict, guild_id: GuildID) -> "FaqGuildData":
+    def from_data(data: dict, guild_id: GuildID) -> "FaqGuildData":
         if not isinstance(data, dict):
             raise ValueError(f"Invalid guild data: {type(data)}")
         raw_entries: dict = data.get("entries", {})
         if not isinstance(raw_entries, dict):
             raise ValueError(f"Invalid guild entries: {type(raw_entries)}")
-        entries = {}
-        for faq_name, raw_faq_entry in raw_entries.items():
-            faq_entry = await FaqEntry.deserialize(raw_faq_entry, faq_name)
-            entries[faq_name] = faq_entry
-        return FaqGuildData(guild_id=guild_id, entries=entries)
+        prefix = data.get("prefix")
+        if not (prefix is None or isinstance(prefix, str)):
+            raise ValueError(f"Invalid guild prefix: {type(prefix)}")
+        records = {
+            sys.intern(faq_name): FaqEntryRecord.from_data(raw_faq_entry)
+            for faq_name, raw_faq_entry in raw_entries.items()
+        }
+        return FaqGuildData(
+            guild_id=guild_id, entries=FaqEntries(records), prefix=prefix
+        )
+
+    @staticmethod
+    async def deserialize(data: dict, guild_id: GuildID) -> "FaqGuildData":
+        return FaqGuildData.from_data(data, guild_id)
 
     def serialize(self) -> dict:
-        return {
-            "entries": {
-                faq_name: faq_entry.serialize()
-                for faq_name, faq_entry in self.entries.items()
-            }
-        }
+        data = {"entries": self.entries.serialize()}
+        if self.prefix is not None:
+            data["prefix"] = self.prefix
+        return data
+
+    def rebuild_index(self):
+        # Names take precedence over aliases, so index all of them first. Any alias that
+        # clashes with an existing key is left out to keep look-ups unambiguous.
+        self._names_by_key = {faq_name: faq_name for faq_name in self.entries}
+        self._shadowed_keys = {}
+        for faq_name, aliases in self.entries.iter_aliases():
+            for alias in aliases:
+                if self._names_by_key.setdefault(alias, faq_name) != faq_name:
+                    self._shadowed_keys.setdefault(alias, []).append(faq_name)
+        self._trigram_index = None
+        self._search_index = None
+        self._hits_order = None
+
+    def _index_key(self, key: str, faq_name: str):
+        self._names_by_key[key] = faq_name
+        if self._trigram_index:
+            self._trigram_index.add(key)
+
+    def _unindex_key(self, key: str, faq_name: str):
+        if self._names_by_key.get(key) == faq_name:
+            del self._names_by_key[key]
+            if self._trigram_index:
+                self._trigram_index.remove(key)
+            self._unshadow_key(key)
+
+    def _unshadow_key(self, key: str):
+        # Hand the key over to the first entry whose alias it was shadowing, if that entry
+        # still exists and still has the alias.
+        shadowed_names = self._shadowed_keys.pop(key, None)
+        while shadowed_names:
+            faq_name = shadowed_names.pop(0)
+            faq_entry = self.entries.get(faq_name)
+            if faq_entry and key in faq_entry.aliases:
+                self._index_key(key, faq_name)
+                if shadowed_names:
+                    self._shadowed_keys[key] = shadowed_names
+                return
+
+    def get_entry(self, faq_query: str) -> Optional[FaqEntry]:
+        if faq_name := self._names_by_key.get(faq_query):
+            return self.entries[faq_name]
+
+    def get_entry_by_name(self, faq_name: str) -> Optional[FaqEntry]:
+        if faq_name in self.entries:
+            return self.entries[faq_name]
+
+    def get_entry_by_alias(self, faq_alias: str) -> Optional[FaqEntry]:
+        faq_entry = self.get_entry(faq_alias)
+        if faq_entry and faq_alias in faq_entry.aliases:
+            return faq_entry
+
+    def suggest_keys(self, faq_query: str, limit: int) -> List[str]:
+        """Return up to `limit` names or aliases similar to the query, one per entry."""
+        if self._trigram_index is None:
+            self._trigram_index = FaqTrigramIndex()
+            for key in self._names_by_key:
+                self._trigram_index.add(key)
+        query_trigrams = make_trigrams(faq_query)
+        shared_by_key = self._trigram_index.count_shared(query_trigrams)
+        candidates = (
+            (key, self._names_by_key[key], shared)
+            for key, shared in shared_by_key.items()
+        )
+        return rank_suggestions(
+            query_trigrams, candidates, limit, self._trigram_index.count_trigrams
+        )
+
+    def search_entries(self, terms: str, limit: int) -> List[FaqEntry]:
+        """Return up to `limit` entries that best match the search terms, best first."""
+        if self._search_index is None:
+            self._search_index = FaqSearchIndex()
+            for faq_entry in self.entries.values():
+                self._search_entry(faq_entry)
+        results = self._search_index.search(
+            terms, limit, lambda faq_name: self.entries[faq_name].hits
+        )
+        return [self.entries[faq_name] for faq_name, _ in results]
+
+    def _search_entry(self, faq_entry: FaqEntry):
+        if self._search_index is not None:
+            self._search_index.add(
+                faq_entry.name, (faq_entry.name, *faq_entry.aliases), faq_entry.content
+            )
+
+    def get_page(
+        self, offset: int, limit: int, most_popular_first: bool = False
+    ) -> List[FaqEntry]:
+        """
+        Return up to `limit` entries ordered by hits and then name, starting at `offset`.
+        """
+        if self._hits_order is None:
+            self._hits_order = sorted(
+                (hits, faq_name) for faq_name, hits in self.entries.iter_hits()
+            )
+        if most_popular_first:
+            end = max(len(self._hits_order) - offset, 0)
+            keys = reversed(self._hits_order[max(end - limit, 0) : end])
+        else:
+            keys = self._hits_order[offset : offset + limit]
+        return [self.entries[faq_name] for _, faq_name in keys]
+
+    def _order_entry(self, hits: int, faq_name: str):
+        if self._hits_order is not None:
+            insort(self._hits_order, (hits, faq_name))
+
+    def _unorder_entry(self, hits: int, faq_name: str):
+        if self._hits_order is not None:
+            index = bisect_left(self._hits_order, (hits, faq_name))
+            if self._hits_order[index : index + 1] == [(hits, faq_name)]:
+                del self._hits_order[index]
+
+    def is_key_available(self, key: str) -> bool:
+        return key not in self._names_by_key
+
+    def add_entry(self, faq_entry: FaqEntry) -> bool:
+        keys = {faq_entry.name, *faq_entry.aliases}
+        if not all(self.is_key_available(key) for key in keys):
+            return False
+        self.entries[faq_entry.name] = faq_entry
+        for key in keys:
+            self._index_key(key, faq_entry.name)
+        self._search_entry(faq_entry)
+        self._order_entry(faq_entry.hits, faq_entry.name)
+        return True
+
+    def remove_entry(self, faq_name: str) -> Optional[FaqEntry]:
+        if faq_entry := self.entries.pop(faq_name, None):
+            for key in (faq_entry.name, *faq_entry.aliases):
+                self._unindex_key(key, faq_name)
+            if self._search_index is not None:
+                self._search_index.remove(faq_name)
+            self._unorder_entry(faq_entry.hits, faq_name)
+            return faq_entry
+
+    def update_entry(
+        self,
+        faq_entry: FaqEntry,
+        content: str,
+        message_link: str,
+        updated_on: datetime,
+    ):
+        faq_entry.content = content
+        faq_entry.message_link = message_link
+        faq_entry.updated_on = updated_on
+        self._search_entry(faq_entry)
+
+    def add_hits(self, faq_entry: FaqEntry, hits: int):
+        self._unorder_entry(faq_entry.hits, faq_entry.name)
+        faq_entry.hits += hits
+        self._order_entry(faq_entry.hits, faq_entry.name)
+
+    def add_alias(self, faq_entry: FaqEntry, faq_alias: str) -> bool:
+        if not self.is_key_available(faq_alias):
+            return False
+        faq_entry.aliases = make_aliases({*faq_entry.aliases, faq_alias})
+        self._index_key(faq_alias, faq_entry.name)
+        self._search_entry(faq_entry)
+        return True
+
+    def remove_alias(self, faq_entry: FaqEntry, faq_alias: str) -> bool:
+        if faq_alias not in faq_entry.aliases:
+            return False
+        faq_entry.aliases = make_aliases(faq_entry.aliases - {faq_alias})
+        self._unindex_key(faq_alias, faq_entry.name)
+        self._search_entry(faq_entry)
+        return True
 
 
 @dataclass
@@ -101,21 +472,32 @@ class FaqCache:
     guilds: Dict[GuildID, FaqGuildData]
 
     @staticmethod
-    async def deserialize(data: dict) -> "FaqCache":
+    def from_data(data: dict) -> "FaqCache":
         if not isinstance(data, dict):
             raise ValueError(f"Invalid data: {type(data)}")
         raw_guilds: dict = data.get("guilds", {})
         if not isinstance(raw_guilds, dict):
             raise ValueError(f"Invalid guilds data: {type(raw_guilds)}")
         guilds = {}
-        for raw_guild_id, raw_guild_data in raw_guilds.items():
-            guild_id = int(raw_guild_id)
-            guild_data = await FaqGuildData.deserialize(
-                raw_guild_data, guild_id=guild_id
-            )
-            guilds[guild_id] = guild_data
+        # Everything built here is long-lived, so pause the garbage collector rather than
+        # having it repeatedly scan objects that can't be freed anyway.
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for raw_guild_id, raw_guild_data in raw_guilds.items():
+                guild_id = int(raw_guild_id)
+                guilds[guild_id] = FaqGuildData.from_data(raw_guild_data, guild_id)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
         return FaqCache(guilds=guilds)
 
+    @staticmethod
+    async def deserialize(data: dict) -> "FaqCache":
+        # Everything is validated up-front in a single synchronous pass, but entries
+        # are only fully processed once they are accessed.
+        return FaqCache.from_data(data)
+
     def serialize(self) -> dict:
         return {
             "guilds": {
@@ -16,6 +16,9 @@ class FaqCog(Cog, name="commanderbot_ext.faq"):
         self.options: FaqOptions = FaqOptions(**options)
         self._log: Logger = get_clogger(self)
         self._state: Optional[FaqState] = None
+        # How many messages did or didn't make it past the prefix check in `on_message`.
+        self.accepted_messages: int = 0
+        self.rejected_messages: int = 0
 
     @property
     def state(self) -> FaqState:
@@ -23,6 +26,11 @@ class FaqCog(Cog, name="commanderbot_ext.faq"):
             raise ValueError("Tried to access state before it was created")
         return self._state
 
+    # @overrides Cog
+    def cog_unload(self):
+        if self._state:
+            self.bot.loop.create_task(self._state.close())
+
     # @@ LISTENERS
 
     @Cog.listener()
@@ -34,13 +42,22 @@ class FaqCog(Cog, name="commanderbot_ext.faq"):
 
     @Cog.listener()
     async def on_message(self, message: Message):
-        await self.state.on_message(message)
+        # This sees every message, so rule out most of them as cheaply as possible.
+        content = message.content
+        guild = message.guild
+        if self._state and guild and content and not message.author.bot:
+            prefix = self._state.get_prefix(guild)
+            if prefix and len(content) > len(prefix) and content.startswith(prefix):
+                self.accepted_messages += 1
+                await self._state.on_faq_message(message, prefix)
+                return
+        self.rejected_messages += 1
 
     # @@ COMMANDS
 
     @command(name="faqs")
-    async def cmd_faqs(self, ctx: Context):
-        await self.state.list_faqs(ctx)
+    async def cmd_faqs(self, ctx: Context, page: int = 1):
+        await self.state.list_faqs(ctx, page)
 
     @group(name="faq")
     async def cmd_faq(self, ctx: Context):
@@ -48,17 +65,50 @@ class FaqCog(Cog, name="commanderbot_ext.faq"):
             await ctx.send_help(self.cmd_faq)
 
     @cmd_faq.command(name="list")
-    async def cmd_faq_list(self, ctx: Context):
-        await self.state.list_faqs(ctx)
+    async def cmd_faq_list(self, ctx: Context, page: int = 1):
+        await self.state.list_faqs(ctx, page)
 
     @cmd_faq.command(name="show")
     async def cmd_faq_show(self, ctx: Context, faq_query: str):
         await self.state.show_faq(ctx, faq_query)
 
+    @cmd_faq.command(name="search")
+    async def cmd_faq_search(self, ctx: Context, *, terms: str):
+        await self.state.search_faqs(ctx, terms)
+
     @cmd_faq.command(name="details")
     async def cmd_faq_details(self, ctx: Context, faq_query: str):
         await self.state.show_faq_details(ctx, faq_query)
 
+    @cmd_faq.command(name="stats")
+    @checks.is_administrator()
+    async def cmd_faq_stats(self, ctx: Context):
+        await ctx.send(
+            f"Messages accepted: {self.accepted_messages}\n"
+            f"Messages rejected: {self.rejected_messages}"
+        )
+
+    # @@ faq prefix
+
+    @cmd_faq.group(name="prefix")
+    async def cmd_faq_prefix(self, ctx: Context):
+        if not ctx.invoked_subcommand:
+            await ctx.send_help(self.cmd_faq_prefix)
+
+    @cmd_faq_prefix.command(name="show")
+    async def cmd_faq_prefix_show(self, ctx: Context):
+        await self.state.show_prefix(ctx)
+
+    @cmd_faq_prefix.command(name="set")
+    @checks.is_administrator()
+    async def cmd_faq_prefix_set(self, ctx: Context, prefix: str):
+        await self.state.set_prefix(ctx, prefix)
+
+    @cmd_faq_prefix.command(name="unset")
+    @checks.is_administrator()
+    async def cmd_faq_prefix_unset(self, ctx: Context):
+        await self.state.set_prefix(ctx, None)
+
     # @@ faq add
 
     @cmd_faq.group(name="add")
@@ -106,6 +156,18 @@ class FaqCog(Cog, name="commanderbot_ext.faq"):
     ):
         await self.state.update_faq(ctx, faq_name, ctx.message, content)
 
+    # @@ faq export/import
+
+    @cmd_faq.command(name="export")
+    @checks.is_administrator()
+    async def cmd_faq_export(self, ctx: Context):
+        await self.state.export_faqs(ctx)
+
+    @cmd_faq.command(name="import")
+    @checks.is_administrator()
+    async def cmd_faq_import(self, ctx: Context, policy: str = "skip"):
+        await self.state.import_faqs(ctx, policy)
+
     # @@ faq alias
 
     @cmd_faq.group(name="alias")
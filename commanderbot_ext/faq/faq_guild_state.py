@@ -1,33 +1,114 @@
+import io
+import json
 from datetime import datetime
+from typing import Optional
 
 from commanderbot_lib.guild_state.abc.cog_guild_state import CogGuildState
-from discord import Message
-from discord.ext.commands import Context
+from discord import File, Guild, Message
+from discord.ext.commands import Bot, Cog, Context
 
-from commanderbot_ext.faq.faq_cache import FaqEntry
+from commanderbot_ext.faq.faq_cache import FaqEntry, FaqGuildData
 from commanderbot_ext.faq.faq_options import FaqOptions
-from commanderbot_ext.faq.faq_store import FaqStore
-
-
-class FaqGuildState(CogGuildState[FaqOptions, FaqStore]):
-    async def list_faqs(self, ctx: Context):
-        if entries := await self.store.iter_guild_faqs(self.guild):
-            # Sort entries by hits -> name.
-            sorted_entries = sorted(entries, key=lambda entry: (entry.hits, entry.name))
-            count = len(sorted_entries)
-            faq_names = (entry.name for entry in sorted_entries)
-            text = f"There are {count} FAQs available: `" + "` `".join(faq_names) + "`"
-            await ctx.send(text)
-        else:
+from commanderbot_ext.faq.faq_recent_answers import FaqRecentAnswers
+from commanderbot_ext.faq.faq_store_base import FaqStoreBase
+
+MAX_SUGGESTION_QUERY_LENGTH = 100
+
+IMPORT_POLICIES = ("skip", "overwrite")
+
+# The most recent answers to remember per guild, no matter how busy it gets.
+MAX_RECENT_ANSWERS = 1000
+
+# The most characters that Discord allows in a single message.
+MAX_MESSAGE_LENGTH = 2000
+
+
+class FaqGuildState(CogGuildState[FaqOptions, FaqStoreBase]):
+    def __init__(
+        self, bot: Bot, cog: Cog, options: FaqOptions, guild: Guild, store: FaqStoreBase
+    ):
+        super().__init__(bot, cog, options, guild, store)
+        self._recent_answers: Optional[FaqRecentAnswers] = None
+        if options.dedupe_window:
+            self._recent_answers = FaqRecentAnswers(
+                options.dedupe_window, MAX_RECENT_ANSWERS
+            )
+
+    async def list_faqs(self, ctx: Context, page: int = 1):
+        count = await self.store.count_guild_faqs(self.guild)
+        if not count:
             await ctx.send(f"No FAQs available")
+            return
+        page_size = self.options.list_page_size
+        page_count = -(-count // page_size)
+        if not 1 <= page <= page_count:
+            await ctx.send(f"There are only {page_count} page(s) of FAQs")
+            return
+        entries = await self.store.get_guild_faq_page(
+            self.guild,
+            offset=(page - 1) * page_size,
+            limit=page_size,
+            most_popular_first=self.options.list_most_popular_first,
+        )
+        text = f"There are {count} FAQs available"
+        if page_count > 1:
+            text += f" (page {page} of {page_count})"
+        text += ":"
+        # Names can be long, so the page is sent in as many messages as it takes.
+        for entry in entries:
+            name_text = f"`{entry.name}`"
+            if len(text) + 1 + len(name_text) > MAX_MESSAGE_LENGTH:
+                await ctx.send(text)
+                text = name_text
+            else:
+                text += " " + name_text
+        await ctx.send(text)
 
     async def show_faq(self, ctx: Context, faq_query: str):
         if entry := await self.store.get_guild_faq(self.guild, faq_query):
-            await self.store.increment_faq_hits(entry)
+            await self.store.increment_faq_hits(self.guild, entry)
+            await self.send_answer(ctx, entry)
+        else:
+            await self.send_no_match(ctx, faq_query)
+
+    async def send_answer(self, ctx: Context, entry: FaqEntry):
+        if self._recent_answers is None:
             await ctx.send(entry.content)
+            return
+        channel_id = ctx.channel.id
+        if answer_link := self._recent_answers.get(channel_id, entry.name):
+            if self.options.dedupe_reaction:
+                await ctx.message.add_reaction(self.options.dedupe_reaction)
+            else:
+                await ctx.send(f"FAQ `{entry.name}` was just answered: <{answer_link}>")
+        else:
+            answer = await ctx.send(entry.content)
+            self._recent_answers.add(channel_id, entry.name, answer.jump_url)
+
+    async def send_no_match(self, ctx: Context, faq_query: str):
+        suggestions = []
+        # Long queries are most likely just messages that happen to start with the prefix.
+        if self.options.suggestions and len(faq_query) <= MAX_SUGGESTION_QUERY_LENGTH:
+            suggestions = await self.store.suggest_guild_faqs(
+                self.guild, faq_query, self.options.suggestions
+            )
+        if suggestions:
+            suggestions_str = "` `".join(suggestions)
+            await ctx.send(
+                f"No FAQ matching `{faq_query}`, did you mean: `{suggestions_str}`"
+            )
         else:
             await ctx.send(f"No FAQ matching `{faq_query}`")
 
+    async def search_faqs(self, ctx: Context, terms: str):
+        if entries := await self.store.search_guild_faqs(
+            self.guild, terms, self.options.search_results
+        ):
+            faq_names = (entry.name for entry in entries)
+            await ctx.send(f"FAQs matching `{terms}`: `" + "` `".join(faq_names) + "`")
+        else:
+            await ctx.send(f"No FAQs matching `{terms}`")
+
     async def show_faq_details(self, ctx: Context, faq_query: str):
         if faq_entry := await self.store.get_guild_faq(self.guild, faq_query):
             aliases_str = ", ".join(faq_entry.aliases)
@@ -51,15 +132,20 @@ class FaqGuildState(CogGuildState[FaqOptions, FaqStore]):
     async def add_faq(
         self, ctx: Context, faq_name: str, message: Message, content: str
     ):
-        if await self.store.get_guild_faq_by_name(self.guild, faq_name):
-            await ctx.send(f"FAQ named `{faq_name}` already exists")
+        if existing_entry := await self.store.get_guild_faq(self.guild, faq_name):
+            if existing_entry.name == faq_name:
+                await ctx.send(f"FAQ named `{faq_name}` already exists")
+            else:
+                await ctx.send(
+                    f"`{faq_name}` is already an alias of FAQ `{existing_entry.name}`"
+                )
         else:
             now = datetime.utcnow()
             faq_entry = FaqEntry(
                 name=faq_name,
                 content=content,
                 message_link=message.jump_url,
-                aliases=[],
+                aliases=set(),
                 added_on=now,
                 updated_on=now,
                 hits=0,
@@ -77,36 +163,72 @@ class FaqGuildState(CogGuildState[FaqOptions, FaqStore]):
         self, ctx: Context, faq_name: str, message: Message, content: str
     ):
         if faq_entry := await self.store.get_guild_faq_by_name(self.guild, faq_name):
-            await self.store.update_faq(faq_entry, message, content)
+            await self.store.update_faq(self.guild, faq_entry, message, content)
             await ctx.send(f"Updated FAQ named `{faq_name}`")
         else:
             await ctx.send(f"No FAQ named `{faq_name}`")
 
+    async def export_faqs(self, ctx: Context):
+        entries = await self.store.iter_guild_faqs(self.guild) or ()
+        data = {"entries": {entry.name: entry.serialize() for entry in entries}}
+        file = File(
+            io.BytesIO(json.dumps(data, indent=2).encode("utf-8")),
+            filename=f"faqs-{self.guild.id}.json",
+        )
+        await ctx.send(f"Exported {len(data['entries'])} FAQs", file=file)
+
+    async def import_faqs(self, ctx: Context, policy: str):
+        if policy not in IMPORT_POLICIES:
+            policies_str = "` `".join(IMPORT_POLICIES)
+            await ctx.send(f"Unknown import policy `{policy}`, use: `{policies_str}`")
+            return
+        if not ctx.message.attachments:
+            await ctx.send(f"Attach a JSON file of FAQs to import")
+            return
+        raw_data = await ctx.message.attachments[0].read()
+        # Validate everything up-front, so that nothing is imported from a bad file.
+        try:
+            guild_data = FaqGuildData.from_data(json.loads(raw_data), self.guild.id)
+            faq_entries = list(guild_data.entries.values())
+        except KeyError as ex:
+            await ctx.send(f"Invalid FAQ file, missing field: {ex}")
+            return
+        except (AssertionError, TypeError, ValueError) as ex:
+            await ctx.send(f"Invalid FAQ file: {ex}")
+            return
+        result = await self.store.import_guild_faqs(
+            self.guild, faq_entries, overwrite=(policy == "overwrite")
+        )
+        await ctx.send(
+            f"Imported FAQs: {result.added} added, {result.replaced} replaced,"
+            f" {result.skipped} skipped"
+        )
+
     async def add_alias(self, ctx: Context, faq_name: str, faq_alias: str):
         if faq_entry := await self.store.get_guild_faq_by_name(self.guild, faq_name):
-            if await self.store.add_alias_to_faq(faq_entry, faq_alias):
+            if await self.store.add_alias_to_faq(self.guild, faq_entry, faq_alias):
                 await ctx.send(f"Added alias `{faq_alias}` to FAQ `{faq_name}`")
-            else:
+            elif faq_alias in faq_entry.aliases:
                 await ctx.send(f"FAQ `{faq_name}` already has alias `{faq_alias}`")
+            elif clashing_entry := await self.store.get_guild_faq(
+                self.guild, faq_alias
+            ):
+                await ctx.send(
+                    f"`{faq_alias}` is already used by FAQ `{clashing_entry.name}`"
+                )
         else:
             await ctx.send(f"No FAQ named `{faq_name}`")
 
     async def remove_alias(self, ctx: Context, faq_name: str, faq_alias: str):
         if faq_entry := await self.store.get_guild_faq_by_name(self.guild, faq_name):
-            if await self.store.remove_alias_from_faq(faq_entry, faq_alias):
+            if await self.store.remove_alias_from_faq(self.guild, faq_entry, faq_alias):
                 await ctx.send(f"Removed alias `{faq_alias}` from FAQ `{faq_name}`")
             else:
                 await ctx.send(f"FAQ `{faq_name}` has no alias `{faq_alias}`")
         else:
             await ctx.send(f"No FAQ named `{faq_name}`")
 
-    # @overrides CogGuildState
-    async def on_message(self, message: Message):
-        prefix = self.options.prefix
-        if prefix:
-            content = message.content
-            if isinstance(content, str):
-                if content.startswith(prefix) and len(content) > len(prefix):
-                    ctx = Context(message=message, prefix=prefix)
-                    faq_query = content[len(prefix) :]
-                    await self.show_faq(ctx, faq_query)
+    async def on_faq_message(self, message: Message, prefix: str):
+        ctx = Context(message=message, prefix=prefix)
+        faq_query = message.content[len(prefix) :]
+        await self.show_faq(ctx, faq_query)
@@ -0,0 +1,84 @@
+import json
+from pathlib import Path
+from typing import IO, Iterable, List, Optional
+
+from commanderbot_lib.logging import Logger
+
+from commanderbot_ext.utils import write_file_atomically
+
+
+class FaqJournal:
+    """
+    An append-only log of changes made on top of the last full snapshot of the database.
+
+    Each change is a small JSON object written on its own line, tagged with an increasing
+    sequence number. A snapshot remembers the sequence number of the last change it
+    contains, so changes that made it into the snapshot are never applied twice.
+
+    Attributes
+    -----------
+    path: :class:`Path`
+        The path to the journal file on the local filesystem.
+    """
+
+    def __init__(self, path: Path, log: Logger):
+        self.path: Path = path
+        self._log: Logger = log
+        self._file: Optional[IO] = None
+        self.last_seq: int = 0
+        self.length: int = 0
+
+    def read(self, after_seq: int) -> Iterable[dict]:
+        """Yield every change recorded after the given sequence number."""
+        self.last_seq = after_seq
+        self.length = 0
+        if not self.path.exists():
+            return
+        self._log.info(f"Replaying journal from file: {self.path}")
+        with open(self.path, encoding="utf-8") as file:
+            for line_number, line in enumerate(file, start=1):
+                try:
+                    change = json.loads(line)
+                    seq = change["seq"]
+                    assert isinstance(seq, int)
+                except:
+                    # A partially-written line is expected if we crashed mid-append.
+                    self._log.warning(
+                        f"Skipping malformed journal line {line_number}: {line!r}"
+                    )
+                    continue
+                self.length += 1
+                if seq > self.last_seq:
+                    self.last_seq = seq
+                    yield change
+
+    def append(self, changes: List[dict]):
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        lines = []
+        for change in changes:
+            self.last_seq += 1
+            change["seq"] = self.last_seq
+            lines.append(json.dumps(change) + "\n")
+        self._file.writelines(lines)
+        self._file.flush()
+        self.length += len(lines)
+
+    def discard_through(self, seq: int):
+        """Drop every change up to and including the given sequence number."""
+        self.close()
+        kept_lines = []
+        with open(self.path, encoding="utf-8") as file:
+            for line in file:
+                try:
+                    if json.loads(line)["seq"] > seq:
+                        kept_lines.append(line.rstrip("\n") + "\n")
+                except:
+                    continue
+        write_file_atomically(self.path, "".join(kept_lines).encode("utf-8"))
+        self.length = len(kept_lines)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
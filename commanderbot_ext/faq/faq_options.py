@@ -8,3 +8,33 @@ from commanderbot_lib.options.abc.cog_options import CogOptions
 class FaqOptions(CogOptions):
     database: Optional[Any] = None
     prefix: Optional[str] = None
+
+    # How many similar FAQs to suggest when a query doesn't match any.
+    suggestions: int = 3
+
+    # How many FAQs to list per page, and whether to list the most popular ones first.
+    list_page_size: int = 50
+    list_most_popular_first: bool = False
+
+    # How long (in seconds) to point repeat queries for a FAQ in the same channel back at
+    # the earlier answer, either with a reply or by reacting with `dedupe_reaction`.
+    dedupe_window: Optional[float] = None
+    dedupe_reaction: Optional[str] = None
+
+    # How many FAQs to list when searching their content.
+    search_results: int = 5
+
+    # How often (in seconds) and after how many hits to write unsaved FAQ hits.
+    hits_flush_interval: Optional[float] = 60.0
+    hits_flush_threshold: Optional[int] = 100
+
+    # Whether to append changes to a journal instead of rewriting the entire database,
+    # and how many journaled changes to allow before compacting them into the database.
+    journal: bool = False
+    journal_compact_threshold: int = 1000
+
+    # When using a directory of per-guild files, how many guilds to keep loaded at once.
+    max_loaded_guilds: Optional[int] = None
+
+    # When creating a new SQLite database, an existing JSON database to import FAQs from.
+    json_import: Optional[str] = None
@@ -0,0 +1,56 @@
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from commanderbot_lib.types import IDType
+
+
+class FaqRecentAnswers:
+    """
+    Remembers where each FAQ was last answered in each channel, for `window` seconds, so
+    that repeat queries can point back at the earlier answer instead of repeating it.
+
+    Answers are kept in the order they were given, so expired ones are always at the front.
+    No more than `max_size` answers are ever kept, dropping the oldest ones first.
+
+    Attributes
+    -----------
+    window: :class:`float`
+        How long (in seconds) to remember each answer.
+    max_size: :class:`int`
+        The most answers to remember at once.
+    """
+
+    def __init__(self, window: float, max_size: int):
+        self.window: float = window
+        self.max_size: int = max_size
+        # Maps `(channel_id, faq_name)` to `(expires_at, message_link)`.
+        self._answers: "OrderedDict[Tuple[IDType, str], Tuple[float, str]]" = (
+            OrderedDict()
+        )
+
+    def __len__(self) -> int:
+        return len(self._answers)
+
+    def _expire(self, now: float):
+        answers = self._answers
+        while answers:
+            expires_at, _ = next(iter(answers.values()))
+            if expires_at > now:
+                break
+            answers.popitem(last=False)
+
+    def get(self, channel_id: IDType, faq_name: str) -> Optional[str]:
+        """Return the link to an earlier answer in the channel, if it's recent enough."""
+        self._expire(time.monotonic())
+        if answer := self._answers.get((channel_id, faq_name)):
+            return answer[1]
+
+    def add(self, channel_id: IDType, faq_name: str, message_link: str):
+        now = time.monotonic()
+        self._expire(now)
+        key = (channel_id, faq_name)
+        self._answers.pop(key, None)
+        self._answers[key] = (now + self.window, message_link)
+        while len(self._answers) > self.max_size:
+            self._answers.popitem(last=False)
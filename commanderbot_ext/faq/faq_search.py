@@ -0,0 +1,97 @@
+import heapq
+import math
+import re
+from typing import Callable, Dict, Iterable, List, Tuple
+
+TERM_PATTERN = re.compile(r"[^\W_]+")
+
+# Names and aliases are much better signals than content, so they count for more.
+KEY_TERM_WEIGHT = 3
+
+# Standard BM25 parameters.
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# How much popular entries get boosted, on a logarithmic scale of their hits.
+HITS_WEIGHT = 0.1
+
+
+def tokenize(text: str) -> List[str]:
+    return TERM_PATTERN.findall(text.lower())
+
+
+def weigh_by_hits(score: float, hits: int) -> float:
+    return score * (1.0 + HITS_WEIGHT * math.log1p(hits))
+
+
+class FaqSearchIndex:
+    """
+    An inverted index over the names, aliases and content of the FAQs in a guild, which
+    ranks them against a query using BM25. Entries are added and removed one at a time, so
+    the index never has to be rebuilt after a change.
+    """
+
+    def __init__(self):
+        # Term -> document -> term frequency.
+        self._postings: Dict[str, Dict[str, int]] = {}
+        # Document -> term frequency, so a document can be removed without re-tokenizing.
+        self._documents: Dict[str, Dict[str, int]] = {}
+        self._lengths: Dict[str, int] = {}
+        self._total_length: int = 0
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def add(self, doc: str, keys: Iterable[str], content: str):
+        if doc in self._documents:
+            self.remove(doc)
+        term_counts: Dict[str, int] = {}
+        for key in keys:
+            for term in tokenize(key):
+                term_counts[term] = term_counts.get(term, 0) + KEY_TERM_WEIGHT
+        for term in tokenize(content):
+            term_counts[term] = term_counts.get(term, 0) + 1
+        for term, count in term_counts.items():
+            self._postings.setdefault(term, {})[doc] = count
+        length = sum(term_counts.values())
+        self._documents[doc] = term_counts
+        self._lengths[doc] = length
+        self._total_length += length
+
+    def remove(self, doc: str):
+        if (term_counts := self._documents.pop(doc, None)) is None:
+            return
+        for term in term_counts:
+            postings = self._postings[term]
+            del postings[doc]
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._lengths.pop(doc)
+
+    def search(
+        self, query: str, limit: int, get_hits: Callable[[str], int]
+    ) -> List[Tuple[str, float]]:
+        """Return up to `limit` documents matching the query, best first."""
+        doc_count = len(self._documents)
+        if not doc_count:
+            return []
+        # Work out the parts of the length normalization that are the same for every term.
+        length_factor = BM25_K1 * BM25_B * doc_count / max(self._total_length, 1)
+        base_norm = BM25_K1 * (1.0 - BM25_B)
+        lengths = self._lengths
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(
+                1.0 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5)
+            )
+            weight = idf * (BM25_K1 + 1.0)
+            for doc, count in postings.items():
+                norm = base_norm + length_factor * lengths[doc]
+                scores[doc] = scores.get(doc, 0.0) + weight * count / (count + norm)
+        weighted = (
+            (doc, weigh_by_hits(score, get_hits(doc))) for doc, score in scores.items()
+        )
+        return heapq.nlargest(limit, weighted, key=lambda item: item[1])
@@ -0,0 +1,140 @@
+import json
+from datetime import datetime
+from os import PathLike
+from pathlib import Path
+from shutil import copyfile
+from typing import Optional, Tuple
+
+from commanderbot_lib.database.abc.cog_database import CogDatabase
+from commanderbot_lib.database.abc.file_database import BACKUP_TIMESTAMP_FORMAT
+from commanderbot_lib.database.abc.versioned_file_database import (
+    BackwardsMigrationError,
+    DataMigrationCollector,
+    FailedMigrationError,
+)
+from commanderbot_lib.types import GuildID
+from commanderbot_lib.utils import fix_path
+from discord.ext.commands import Bot, Cog
+
+from commanderbot_ext.utils import write_file_atomically
+
+
+class FaqShardDatabase(CogDatabase):
+    """
+    A `CogDatabase` that keeps the data for each guild in its own versioned JSON file, all
+    inside of one directory, so that guilds can be read and written independently. A small
+    manifest file alongside them holds whatever is needed without loading any guilds.
+
+    Attributes
+    -----------
+    bot: :class:`Bot`
+        The parent discord.py bot instance.
+    cog: :class:`Cog`
+        The parent discord.py cog instance.
+    path: :class:`PathLike`
+        The path to the directory on the local filesystem.
+    version: :class:`int`
+        The expected version of the data in each file.
+    migrate: :class:`DataMigrationCollector`
+        The same migrations as a `VersionedFileDatabase` would use, which are applied to
+        each guild file as it's read. They're given the guild's data as if it were the only
+        guild in a single-file database.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        cog: Cog,
+        path: PathLike,
+        version: int,
+        migrate: DataMigrationCollector,
+    ):
+        super().__init__(bot, cog)
+        self._path: Path = fix_path(path)
+        self.version: int = version
+        self._migrate: DataMigrationCollector = migrate
+
+    @property
+    def persistent(self) -> bool:
+        return True
+
+    # @overrides CogDatabase
+    async def _async_init(self):
+        self._path.mkdir(parents=True, exist_ok=True)
+
+    def _guild_path(self, guild_id: GuildID) -> Path:
+        return self._path / f"{guild_id}.json"
+
+    @property
+    def _manifest_path(self) -> Path:
+        return self._path / "manifest.json"
+
+    async def read_manifest(self) -> Optional[dict]:
+        if file_data := self._read_file(self._manifest_path):
+            return file_data[1]
+
+    async def write_manifest(self, data: dict):
+        self._write_file(self._manifest_path, data)
+
+    async def read_guild(self, guild_id: GuildID) -> Optional[dict]:
+        path = self._guild_path(guild_id)
+        file_data = self._read_file(path)
+        if not file_data:
+            return None
+        actual_version, data = file_data
+        if actual_version < self.version:
+            data = await self._migrate_guild(path, guild_id, actual_version, data)
+        return data
+
+    async def write_guild(self, guild_id: GuildID, data: dict):
+        self._write_file(self._guild_path(guild_id), data)
+
+    async def _migrate_guild(
+        self, path: Path, guild_id: GuildID, actual_version: int, data: dict
+    ) -> dict:
+        self._log.warning(
+            f"Migrating data for guild {guild_id} from version {actual_version}"
+            f" to {self.version}..."
+        )
+        single_guild_data = {"guilds": {str(guild_id): data}}
+        try:
+            for migration in self._migrate(self, actual_version, self.version):
+                self._log.warning(f"[->] {migration.__name__}")
+                await migration(self, single_guild_data)
+        except Exception as ex:
+            raise FailedMigrationError(self.version, actual_version) from ex
+        data = single_guild_data["guilds"][str(guild_id)]
+        self._backup_file(path)
+        self._write_file(path, data)
+        self._log.warning("Data migration complete!")
+        return data
+
+    def _read_file(self, path: Path) -> Optional[Tuple[int, dict]]:
+        if not path.exists():
+            return None
+        self._log.info(f"Loading data from file: {path}")
+        with open(path, encoding="utf-8") as file:
+            wrapper_data = json.load(file)
+        actual_version = wrapper_data.get("version", None)
+        # As with a `VersionedFileDatabase`, assume unversioned data is all of the file.
+        if actual_version is None:
+            self._log.warning(
+                f"Data is unversioned! Assuming expected version: {self.version}"
+            )
+            self._backup_file(path)
+            self._write_file(path, wrapper_data)
+            return self.version, wrapper_data
+        if actual_version > self.version:
+            raise BackwardsMigrationError(self.version, actual_version)
+        return actual_version, wrapper_data.get("data", {})
+
+    def _backup_file(self, path: Path):
+        timestamp = datetime.utcnow().strftime(BACKUP_TIMESTAMP_FORMAT)
+        backup_path = path.with_suffix(f".backup.{timestamp}{path.suffix}")
+        self._log.warning(f'Backing up data from "{path}" to "{backup_path}"')
+        copyfile(path, backup_path)
+
+    def _write_file(self, path: Path, data: dict):
+        self._log.info(f"Saving data to file: {path}")
+        content = json.dumps({"version": self.version, "data": data}, indent=2)
+        write_file_atomically(path, content.encode("utf-8"))
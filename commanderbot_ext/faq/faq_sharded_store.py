@@ -0,0 +1,117 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from commanderbot_lib.types import GuildID
+from discord import Guild
+from discord.ext.commands import Bot, Cog
+
+from commanderbot_ext.faq.faq_cache import FaqCache, FaqGuildData
+from commanderbot_ext.faq.faq_options import FaqOptions
+from commanderbot_ext.faq.faq_shard_database import FaqShardDatabase
+from commanderbot_ext.faq.faq_store import FaqStore
+
+
+class FaqShardedStore(FaqStore):
+    """
+    A variant of `FaqStore` that keeps each guild in its own file. Guilds are loaded the
+    first time they are accessed, written back independently of one another, and the
+    least-recently-used ones are evicted once more than `max_loaded_guilds` are loaded.
+    """
+
+    def __init__(self, bot: Bot, cog: Cog, options: FaqOptions):
+        super().__init__(bot, cog, options)
+        self._guilds_by_recency: "OrderedDict[GuildID, FaqGuildData]" = OrderedDict()
+        # Prefixes are needed for every guild up-front, so they're kept in the manifest
+        # rather than with each guild, and read from it once.
+        self._prefixes: Dict[GuildID, str] = {}
+
+    # @overrides VersionedCachedStore
+    async def _create_database(self) -> FaqShardDatabase:
+        location = self.options.database
+        self._log.info(
+            f"Creating a sharded database using the directory at: {location}"
+        )
+        return FaqShardDatabase(
+            self.bot,
+            self.cog,
+            path=location,
+            version=self.data_version,
+            migrate=self._collect_migrations,
+        )
+
+    # @overrides FaqStore
+    async def _after_database_init(self):
+        # Don't read anything yet; guilds are loaded as they are accessed.
+        self._cache = FaqCache(guilds=self._guilds_by_recency)
+        manifest = await self._database.read_manifest() or {}
+        self._prefixes = {
+            int(guild_id): prefix
+            for guild_id, prefix in manifest.get("prefixes", {}).items()
+        }
+        if self.options.journal:
+            self._log.warning("Journaling is not supported by sharded databases")
+        self._start_flushing_hits()
+
+    # @overrides FaqStore
+    async def flush_hits(self):
+        for guild_id in {guild_id for guild_id, _ in self._unsaved_hits}:
+            await self._write_guild(guild_id)
+
+    # @overrides FaqStore
+    async def _save_changes(self, changes: List[dict]):
+        for guild_id in {change["guild"] for change in changes}:
+            await self._write_guild(guild_id)
+
+    # @overrides FaqStore
+    async def get_guild_data(self, guild: Guild) -> Optional[FaqGuildData]:
+        if guild_data := self._guilds_by_recency.get(guild.id):
+            self._guilds_by_recency.move_to_end(guild.id)
+            return guild_data
+        raw_guild_data = await self._database.read_guild(guild.id)
+        if raw_guild_data is None:
+            guild_data = FaqGuildData(guild_id=guild.id, entries={})
+        else:
+            guild_data = await FaqGuildData.deserialize(raw_guild_data, guild.id)
+        guild_data.prefix = self._prefixes.get(guild.id)
+        self._guilds_by_recency[guild.id] = guild_data
+        await self._evict_idle_guilds()
+        return guild_data
+
+    # @overrides FaqStore
+    async def get_guild_prefixes(self) -> Dict[GuildID, str]:
+        return dict(self._prefixes)
+
+    # @overrides FaqStore
+    async def set_guild_prefix(self, guild: Guild, prefix: Optional[str]):
+        if prefix is None:
+            self._prefixes.pop(guild.id, None)
+        else:
+            self._prefixes[guild.id] = prefix
+        if guild_data := self._guilds_by_recency.get(guild.id):
+            guild_data.prefix = prefix
+        prefixes = {
+            str(guild_id): prefix for guild_id, prefix in self._prefixes.items()
+        }
+        await self._database.write_manifest({"prefixes": prefixes})
+
+    async def _write_guild(self, guild_id: GuildID):
+        if guild_data := self._guilds_by_recency.get(guild_id):
+            # Only the manifest has the prefix, so that the two files can never disagree.
+            raw_guild_data = guild_data.serialize()
+            raw_guild_data.pop("prefix", None)
+            await self._database.write_guild(guild_id, raw_guild_data)
+        # Whatever hits the guild had are now saved along with it.
+        for key in [key for key in self._unsaved_hits if key[0] == guild_id]:
+            self._unsaved_hit_count -= self._unsaved_hits.pop(key)
+
+    async def _evict_idle_guilds(self):
+        max_loaded_guilds = self.options.max_loaded_guilds
+        if not max_loaded_guilds:
+            return
+        while len(self._guilds_by_recency) > max_loaded_guilds:
+            guild_id = next(iter(self._guilds_by_recency))
+            # Every other change is written immediately, so only hits may be unsaved.
+            if any(key[0] == guild_id for key in self._unsaved_hits):
+                await self._write_guild(guild_id)
+            self._log.info(f"Evicting idle guild from memory: {guild_id}")
+            del self._guilds_by_recency[guild_id]
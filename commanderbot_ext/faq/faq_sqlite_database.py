@@ -0,0 +1,120 @@
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from os import PathLike
+from pathlib import Path
+from typing import Callable, Iterable, Optional, TypeVar
+
+from commanderbot_lib.database.abc.cog_database import CogDatabase
+from commanderbot_lib.database.abc.versioned_file_database import (
+    BackwardsMigrationError,
+    FailedMigrationError,
+)
+from commanderbot_lib.utils import fix_path
+from discord.ext.commands import Bot, Cog
+
+SqliteMigration = Callable[[sqlite3.Connection], None]
+SqliteMigrationCollector = Callable[[int, int], Iterable[SqliteMigration]]
+
+ResultType = TypeVar("ResultType")
+
+
+class FaqSqliteDatabase(CogDatabase):
+    """
+    A `CogDatabase` backed by a local SQLite file. The schema is versioned using SQLite's
+    `user_version` and upgraded automatically through pre-programmed migrations.
+
+    Every query blocks, so the connection is only ever used from a thread of its own, by
+    passing whatever uses it to `run`.
+
+    Attributes
+    -----------
+    bot: :class:`Bot`
+        The parent discord.py bot instance.
+    cog: :class:`Cog`
+        The parent discord.py cog instance.
+    path: :class:`PathLike`
+        The path to the database file on the local filesystem.
+    version: :class:`int`
+        The expected version of the schema.
+    migrate: :class:`SqliteMigrationCollector`
+        A callable iterator that yields migrations, in the order that they are to be applied.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        cog: Cog,
+        path: PathLike,
+        version: int,
+        migrate: SqliteMigrationCollector,
+    ):
+        super().__init__(bot, cog)
+        self._path: Path = fix_path(path)
+        self.version: int = version
+        self._migrate: SqliteMigrationCollector = migrate
+        self._connection: Optional[sqlite3.Connection] = None
+        self._executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="faq-sqlite"
+        )
+        self.created: bool = False
+
+    @property
+    def persistent(self) -> bool:
+        return True
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if not self._connection:
+            raise ValueError("Tried to access connection before it was opened")
+        return self._connection
+
+    async def run(self, func: Callable[..., ResultType], *args) -> ResultType:
+        """Call `func` on the database's own thread, and return what it returns."""
+        return await self.bot.loop.run_in_executor(self._executor, func, *args)
+
+    # @overrides CogDatabase
+    async def _async_init(self):
+        self._log.info(f"Opening SQLite database at: {self._path}")
+        await self.run(self._open)
+
+    def _open(self):
+        self.created = not self._path.exists()
+        connection = sqlite3.connect(self._path)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA foreign_keys = ON")
+        # Write-ahead logging makes each small write cheap, since it no longer has to
+        # wait for the whole file to be synced to disk.
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = NORMAL")
+        self._connection = connection
+        self._apply_migrations()
+
+    def _apply_migrations(self):
+        connection = self.connection
+        actual_version = connection.execute("PRAGMA user_version").fetchone()[0]
+        if actual_version > self.version:
+            raise BackwardsMigrationError(self.version, actual_version)
+        if actual_version == self.version:
+            return
+        self._log.warning(
+            f"Migrating schema from version {actual_version} to {self.version}..."
+        )
+        try:
+            with connection:
+                for migration in self._migrate(actual_version, self.version):
+                    self._log.warning(f"[->] {migration.__name__}")
+                    migration(connection)
+                # PRAGMA doesn't support parameters, but the version is always an int.
+                connection.execute(f"PRAGMA user_version = {int(self.version)}")
+        except Exception as ex:
+            raise FailedMigrationError(self.version, actual_version) from ex
+        self._log.warning(f"Schema migration complete!")
+
+    async def close(self):
+        await self.run(self._close)
+        self._executor.shutdown()
+
+    def _close(self):
+        if self._connection:
+            self._connection.close()
+            self._connection = None
@@ -0,0 +1,107 @@
+from sqlite3 import Connection
+
+from commanderbot_ext.faq.faq_trigrams import make_trigrams
+
+
+def m_1a_create_tables(connection: Connection):
+    connection.executescript("""
+        CREATE TABLE faq_entries (
+            entry_id INTEGER PRIMARY KEY,
+            guild_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            content TEXT NOT NULL,
+            message_link TEXT,
+            added_on TEXT NOT NULL,
+            updated_on TEXT NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0,
+            UNIQUE (guild_id, name)
+        );
+        CREATE INDEX faq_entries_by_hits ON faq_entries (guild_id, hits, name);
+        CREATE TABLE faq_aliases (
+            guild_id INTEGER NOT NULL,
+            alias TEXT NOT NULL,
+            entry_id INTEGER NOT NULL
+                REFERENCES faq_entries (entry_id) ON DELETE CASCADE,
+            PRIMARY KEY (guild_id, alias)
+        );
+        CREATE INDEX faq_aliases_by_entry ON faq_aliases (entry_id);
+        """)
+
+
+def m_2a_create_trigrams(connection: Connection):
+    connection.executescript("""
+        CREATE TABLE faq_trigrams (
+            guild_id INTEGER NOT NULL,
+            trigram TEXT NOT NULL,
+            key TEXT NOT NULL,
+            entry_id INTEGER NOT NULL
+                REFERENCES faq_entries (entry_id) ON DELETE CASCADE
+        );
+        CREATE INDEX faq_trigrams_by_trigram ON faq_trigrams (guild_id, trigram);
+        CREATE INDEX faq_trigrams_by_entry ON faq_trigrams (entry_id, key);
+        """)
+    keys = connection.execute(
+        "SELECT guild_id, name, entry_id FROM faq_entries"
+        " UNION ALL"
+        " SELECT guild_id, alias, entry_id FROM faq_aliases"
+    ).fetchall()
+    connection.executemany(
+        "INSERT INTO faq_trigrams (guild_id, trigram, key, entry_id) VALUES (?, ?, ?, ?)",
+        (
+            (guild_id, trigram, key, entry_id)
+            for guild_id, key, entry_id in keys
+            for trigram in make_trigrams(key)
+        ),
+    )
+
+
+def m_3a_create_search(connection: Connection):
+    # The search index is kept in sync by triggers, with the names and aliases of each
+    # entry in one column and its content in another.
+    connection.executescript("""
+        CREATE VIRTUAL TABLE faq_search USING fts5 (
+            keys, content, guild_id UNINDEXED
+        );
+        CREATE TRIGGER faq_search_after_entry_insert AFTER INSERT ON faq_entries
+        BEGIN
+            INSERT INTO faq_search (rowid, keys, content, guild_id)
+                VALUES (new.entry_id, new.name, new.content, new.guild_id);
+        END;
+        CREATE TRIGGER faq_search_after_entry_update AFTER UPDATE OF content ON faq_entries
+        BEGIN
+            UPDATE faq_search SET content = new.content WHERE rowid = new.entry_id;
+        END;
+        CREATE TRIGGER faq_search_after_entry_delete AFTER DELETE ON faq_entries
+        BEGIN
+            DELETE FROM faq_search WHERE rowid = old.entry_id;
+        END;
+        CREATE VIEW faq_search_keys (entry_id, keys) AS
+            SELECT entry_id, name || ' ' || COALESCE((
+                SELECT group_concat(alias, ' ') FROM faq_aliases
+                WHERE faq_aliases.entry_id = faq_entries.entry_id
+            ), '') FROM faq_entries;
+        CREATE TRIGGER faq_search_after_alias_insert AFTER INSERT ON faq_aliases
+        BEGIN
+            UPDATE faq_search SET keys = (
+                SELECT keys FROM faq_search_keys WHERE entry_id = new.entry_id
+            ) WHERE rowid = new.entry_id;
+        END;
+        CREATE TRIGGER faq_search_after_alias_delete AFTER DELETE ON faq_aliases
+        BEGIN
+            UPDATE faq_search SET keys = (
+                SELECT keys FROM faq_search_keys WHERE entry_id = old.entry_id
+            ) WHERE rowid = old.entry_id;
+        END;
+        INSERT INTO faq_search (rowid, keys, content, guild_id)
+            SELECT faq_entries.entry_id, keys, content, guild_id
+            FROM faq_entries JOIN faq_search_keys USING (entry_id);
+        """)
+
+
+def m_4a_create_guilds(connection: Connection):
+    connection.executescript("""
+        CREATE TABLE faq_guilds (
+            guild_id INTEGER PRIMARY KEY,
+            prefix TEXT
+        );
+        """)
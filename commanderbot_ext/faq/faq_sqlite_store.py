@@ -0,0 +1,500 @@
+from dataclasses import replace
+from datetime import datetime
+from sqlite3 import Row
+from typing import Dict, Iterable, List, Optional
+
+from commanderbot_lib.types import GuildID
+from discord import Guild, Message
+
+from commanderbot_ext.faq import faq_sqlite_migrations as sqlite_migrations
+from commanderbot_ext.faq.faq_cache import FaqCache, FaqEntry, make_aliases
+from commanderbot_ext.faq.faq_search import KEY_TERM_WEIGHT, tokenize, weigh_by_hits
+from commanderbot_ext.faq.faq_sqlite_database import (
+    FaqSqliteDatabase,
+    SqliteMigration,
+)
+from commanderbot_ext.faq.faq_store import FaqStore
+from commanderbot_ext.faq.faq_store_base import FaqImportResult, FaqStoreBase
+from commanderbot_ext.faq.faq_trigrams import (
+    MIN_SIMILARITY,
+    make_trigrams,
+    rank_suggestions,
+)
+
+ENTRY_COLUMNS = "entry_id, name, content, message_link, added_on, updated_on, hits"
+
+
+class FaqSqliteStore(FaqStoreBase[FaqSqliteDatabase]):
+    """
+    An alternative to `FaqStore` that keeps FAQs in a local SQLite database. Look-ups and
+    listings are served by indexes, and each change only touches the rows involved.
+
+    Queries are run on the database's own thread, so none of them hold up the bot. Each
+    public method hands a private one of the same name over to it.
+    """
+
+    # @implements CogStore
+    async def _create_database(self) -> FaqSqliteDatabase:
+        location = self.options.database
+        self._log.info(f"Creating an SQLite database using the file at: {location}")
+        return FaqSqliteDatabase(
+            self.bot,
+            self.cog,
+            path=location,
+            version=self.data_version,
+            migrate=self._collect_migrations,
+        )
+
+    # @overrides CogStore
+    async def _after_database_init(self):
+        await self._database.run(self._create_functions)
+        # Carry over the FAQs from an existing JSON database, but only once.
+        if self._database.created and self.options.json_import:
+            await self.import_json(self.options.json_import)
+
+    def _create_functions(self):
+        # Lets search results be ranked the same way as they are with the other stores.
+        self._database.connection.create_function(
+            "faq_weigh_by_hits", 2, weigh_by_hits, deterministic=True
+        )
+
+    def _collect_migrations(
+        self, actual_version: int, expected_version: int
+    ) -> Iterable[SqliteMigration]:
+        if actual_version < 1:
+            yield sqlite_migrations.m_1a_create_tables
+        if actual_version < 2:
+            yield sqlite_migrations.m_2a_create_trigrams
+        if actual_version < 3:
+            yield sqlite_migrations.m_3a_create_search
+        if actual_version < 4:
+            yield sqlite_migrations.m_4a_create_guilds
+
+    @property
+    def data_version(self) -> int:
+        return 4
+
+    # @implements FaqStoreBase
+    async def close(self):
+        await self._database.close()
+
+    async def import_json(self, location: str):
+        self._log.warning(f"Importing FAQs from JSON database: {location}")
+        # Load the file with a regular `FaqStore`, so it gets migrated if necessary.
+        json_options = replace(
+            self.options, database=location, hits_flush_interval=None
+        )
+        json_store = FaqStore(self.bot, self.cog, json_options)
+        await json_store.async_init()
+        cache = FaqCache.from_data(await json_store.serialize())
+        await json_store.close()
+        entry_count = await self._database.run(self._import_cache, cache)
+        self._log.warning(f"Imported {entry_count} FAQs from JSON database")
+
+    def _import_cache(self, cache: FaqCache) -> int:
+        entry_count = 0
+        with self._database.connection:
+            for guild_id, guild_data in cache.guilds.items():
+                if guild_data.prefix is not None:
+                    self._set_prefix(guild_id, guild_data.prefix)
+                for entry in guild_data.entries.values():
+                    self._insert_entry(guild_id, entry)
+                    entry_count += 1
+        return entry_count
+
+    def _insert_entry(self, guild_id: GuildID, entry: FaqEntry):
+        connection = self._database.connection
+        cursor = connection.execute(
+            "INSERT INTO faq_entries"
+            " (guild_id, name, content, message_link, added_on, updated_on, hits)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                guild_id,
+                entry.name,
+                entry.content,
+                entry.message_link,
+                entry.added_on.isoformat(),
+                entry.updated_on.isoformat(),
+                entry.hits,
+            ),
+        )
+        connection.executemany(
+            "INSERT INTO faq_aliases (guild_id, alias, entry_id) VALUES (?, ?, ?)",
+            ((guild_id, alias, cursor.lastrowid) for alias in entry.aliases),
+        )
+        for key in (entry.name, *entry.aliases):
+            self._insert_trigrams(guild_id, key, cursor.lastrowid)
+
+    def _set_prefix(self, guild_id: GuildID, prefix: Optional[str]):
+        self._database.connection.execute(
+            "INSERT INTO faq_guilds (guild_id, prefix) VALUES (?, ?)"
+            " ON CONFLICT (guild_id) DO UPDATE SET prefix = excluded.prefix",
+            (guild_id, prefix),
+        )
+
+    def _insert_trigrams(self, guild_id: GuildID, key: str, entry_id: int):
+        self._database.connection.executemany(
+            "INSERT INTO faq_trigrams (guild_id, trigram, key, entry_id)"
+            " VALUES (?, ?, ?, ?)",
+            ((guild_id, trigram, key, entry_id) for trigram in make_trigrams(key)),
+        )
+
+    def _make_entry(self, row: Row, aliases: Iterable[str]) -> FaqEntry:
+        return FaqEntry(
+            name=row["name"],
+            content=row["content"],
+            message_link=row["message_link"],
+            aliases=aliases,
+            added_on=datetime.fromisoformat(row["added_on"]),
+            updated_on=datetime.fromisoformat(row["updated_on"]),
+            hits=row["hits"],
+        )
+
+    def _fetch_entry(self, where: str, params: tuple) -> Optional[FaqEntry]:
+        connection = self._database.connection
+        row = connection.execute(
+            f"SELECT {ENTRY_COLUMNS} FROM faq_entries WHERE {where}", params
+        ).fetchone()
+        if row is not None:
+            aliases = [
+                alias_row[0]
+                for alias_row in connection.execute(
+                    "SELECT alias FROM faq_aliases WHERE entry_id = ?",
+                    (row["entry_id"],),
+                )
+            ]
+            return self._make_entry(row, aliases)
+
+    def _get_key_owner(self, guild_id: GuildID, key: str) -> Optional[int]:
+        row = self._database.connection.execute(
+            "SELECT entry_id FROM faq_entries WHERE guild_id = ? AND name = ?"
+            " UNION ALL"
+            " SELECT entry_id FROM faq_aliases WHERE guild_id = ? AND alias = ?",
+            (guild_id, key, guild_id, key),
+        ).fetchone()
+        if row is not None:
+            return row[0]
+
+    def _is_key_available(self, guild_id: GuildID, key: str) -> bool:
+        return self._get_key_owner(guild_id, key) is None
+
+    def _fetch_entries(self, where: str, params: tuple) -> List[FaqEntry]:
+        connection = self._database.connection
+        rows = connection.execute(
+            f"SELECT {ENTRY_COLUMNS} FROM faq_entries WHERE {where}", params
+        ).fetchall()
+        aliases_by_entry_id: Dict[int, List[str]] = {}
+        for entry_id, alias in connection.execute(
+            "SELECT entry_id, alias FROM faq_aliases WHERE entry_id IN ("
+            f" SELECT entry_id FROM faq_entries WHERE {where}"
+            ")",
+            params,
+        ):
+            aliases_by_entry_id.setdefault(entry_id, []).append(alias)
+        return [
+            self._make_entry(row, aliases_by_entry_id.get(row["entry_id"], ()))
+            for row in rows
+        ]
+
+    # @implements FaqStoreBase
+    async def iter_guild_faqs(self, guild: Guild) -> Optional[Iterable[FaqEntry]]:
+        return await self._database.run(self._iter_guild_faqs, guild.id)
+
+    def _iter_guild_faqs(self, guild_id: GuildID) -> List[FaqEntry]:
+        return self._fetch_entries("guild_id = ? ORDER BY hits, name", (guild_id,))
+
+    # @implements FaqStoreBase
+    async def count_guild_faqs(self, guild: Guild) -> int:
+        return await self._database.run(self._count_guild_faqs, guild.id)
+
+    def _count_guild_faqs(self, guild_id: GuildID) -> int:
+        (count,) = self._database.connection.execute(
+            "SELECT COUNT(*) FROM faq_entries WHERE guild_id = ?", (guild_id,)
+        ).fetchone()
+        return count
+
+    # @implements FaqStoreBase
+    async def get_guild_faq_page(
+        self, guild: Guild, offset: int, limit: int, most_popular_first: bool = False
+    ) -> List[FaqEntry]:
+        return await self._database.run(
+            self._get_guild_faq_page, guild.id, offset, limit, most_popular_first
+        )
+
+    def _get_guild_faq_page(
+        self, guild_id: GuildID, offset: int, limit: int, most_popular_first: bool
+    ) -> List[FaqEntry]:
+        # Both orders are served by the index on hits.
+        order = "hits DESC, name DESC" if most_popular_first else "hits, name"
+        return self._fetch_entries(
+            f"guild_id = ? ORDER BY {order} LIMIT ? OFFSET ?", (guild_id, limit, offset)
+        )
+
+    # @implements FaqStoreBase
+    async def get_guild_prefixes(self) -> Dict[GuildID, str]:
+        return await self._database.run(self._get_guild_prefixes)
+
+    def _get_guild_prefixes(self) -> Dict[GuildID, str]:
+        rows = self._database.connection.execute(
+            "SELECT guild_id, prefix FROM faq_guilds WHERE prefix IS NOT NULL"
+        )
+        return dict(rows.fetchall())
+
+    # @implements FaqStoreBase
+    async def set_guild_prefix(self, guild: Guild, prefix: Optional[str]):
+        await self._database.run(self._set_guild_prefix, guild.id, prefix)
+
+    def _set_guild_prefix(self, guild_id: GuildID, prefix: Optional[str]):
+        with self._database.connection:
+            self._set_prefix(guild_id, prefix)
+
+    # @implements FaqStoreBase
+    async def get_guild_faq_by_name(
+        self, guild: Guild, faq_name: str
+    ) -> Optional[FaqEntry]:
+        return await self._database.run(self._get_guild_faq_by_name, guild.id, faq_name)
+
+    def _get_guild_faq_by_name(
+        self, guild_id: GuildID, faq_name: str
+    ) -> Optional[FaqEntry]:
+        return self._fetch_entry("guild_id = ? AND name = ?", (guild_id, faq_name))
+
+    # @implements FaqStoreBase
+    async def get_guild_faq_by_alias(
+        self, guild: Guild, faq_alias: str
+    ) -> Optional[FaqEntry]:
+        return await self._database.run(
+            self._get_guild_faq_by_alias, guild.id, faq_alias
+        )
+
+    def _get_guild_faq_by_alias(
+        self, guild_id: GuildID, faq_alias: str
+    ) -> Optional[FaqEntry]:
+        return self._fetch_entry(
+            "entry_id = ("
+            " SELECT entry_id FROM faq_aliases WHERE guild_id = ? AND alias = ?"
+            ")",
+            (guild_id, faq_alias),
+        )
+
+    # @implements FaqStoreBase
+    async def get_guild_faq(self, guild: Guild, faq_query: str) -> Optional[FaqEntry]:
+        return await self._database.run(self._get_guild_faq, guild.id, faq_query)
+
+    def _get_guild_faq(self, guild_id: GuildID, faq_query: str) -> Optional[FaqEntry]:
+        # Names take precedence over aliases, although they should never clash anyway.
+        entry = self._get_guild_faq_by_name(guild_id, faq_query)
+        if entry is None:
+            entry = self._get_guild_faq_by_alias(guild_id, faq_query)
+        return entry
+
+    # @implements FaqStoreBase
+    async def suggest_guild_faqs(
+        self, guild: Guild, faq_query: str, limit: int
+    ) -> List[str]:
+        return await self._database.run(
+            self._suggest_guild_faqs, guild.id, faq_query, limit
+        )
+
+    def _suggest_guild_faqs(
+        self, guild_id: GuildID, faq_query: str, limit: int
+    ) -> List[str]:
+        query_trigrams = make_trigrams(faq_query)
+        placeholders = ", ".join("?" * len(query_trigrams))
+        candidates = self._database.connection.execute(
+            "SELECT key, entry_id, COUNT(*) FROM faq_trigrams"
+            f" WHERE guild_id = ? AND trigram IN ({placeholders})"
+            " GROUP BY entry_id, key HAVING COUNT(*) >= ?",
+            (guild_id, *query_trigrams, MIN_SIMILARITY * len(query_trigrams)),
+        )
+        return rank_suggestions(query_trigrams, candidates, limit)
+
+    # @implements FaqStoreBase
+    async def search_guild_faqs(
+        self, guild: Guild, terms: str, limit: int
+    ) -> List[FaqEntry]:
+        return await self._database.run(self._search_guild_faqs, guild.id, terms, limit)
+
+    def _search_guild_faqs(
+        self, guild_id: GuildID, terms: str, limit: int
+    ) -> List[FaqEntry]:
+        # Quote every term, so nothing in them is mistaken for query syntax.
+        if not (search_terms := set(tokenize(terms))):
+            return []
+        match = " OR ".join(f'"{term}"' for term in search_terms)
+        rows = self._database.connection.execute(
+            "SELECT faq_search.rowid FROM faq_search"
+            " JOIN faq_entries ON faq_entries.entry_id = faq_search.rowid"
+            " WHERE faq_search MATCH ? AND faq_search.guild_id = ?"
+            " ORDER BY faq_weigh_by_hits(-bm25(faq_search, ?, 1.0), hits) DESC"
+            " LIMIT ?",
+            (match, guild_id, KEY_TERM_WEIGHT, limit),
+        ).fetchall()
+        return [self._fetch_entry("entry_id = ?", (entry_id,)) for (entry_id,) in rows]
+
+    # @implements FaqStoreBase
+    async def add_guild_faq(self, guild: Guild, faq_entry: FaqEntry) -> bool:
+        return await self._database.run(self._add_guild_faq, guild.id, faq_entry)
+
+    def _add_guild_faq(self, guild_id: GuildID, faq_entry: FaqEntry) -> bool:
+        keys = {faq_entry.name, *faq_entry.aliases}
+        if not all(self._is_key_available(guild_id, key) for key in keys):
+            return False
+        with self._database.connection:
+            self._insert_entry(guild_id, faq_entry)
+        return True
+
+    # @implements FaqStoreBase
+    async def import_guild_faqs(
+        self, guild: Guild, faq_entries: Iterable[FaqEntry], overwrite: bool
+    ) -> FaqImportResult:
+        return await self._database.run(
+            self._import_guild_faqs, guild.id, list(faq_entries), overwrite
+        )
+
+    def _import_guild_faqs(
+        self, guild_id: GuildID, faq_entries: List[FaqEntry], overwrite: bool
+    ) -> FaqImportResult:
+        added, replaced, skipped = 0, 0, 0
+        # Everything is imported in one transaction, rather than one per entry.
+        with self._database.connection as connection:
+            for faq_entry in faq_entries:
+                row = connection.execute(
+                    "SELECT entry_id FROM faq_entries WHERE guild_id = ? AND name = ?",
+                    (guild_id, faq_entry.name),
+                ).fetchone()
+                existing_entry_id = row[0] if row else None
+                if existing_entry_id and not overwrite:
+                    skipped += 1
+                    continue
+                # Any of its keys may only be used by the entry it replaces, if any.
+                keys = {faq_entry.name, *faq_entry.aliases}
+                key_owners = {self._get_key_owner(guild_id, key) for key in keys}
+                if key_owners - {None, existing_entry_id}:
+                    skipped += 1
+                    continue
+                if existing_entry_id:
+                    connection.execute(
+                        "DELETE FROM faq_entries WHERE entry_id = ?",
+                        (existing_entry_id,),
+                    )
+                    replaced += 1
+                else:
+                    added += 1
+                self._insert_entry(guild_id, faq_entry)
+        return FaqImportResult(added=added, replaced=replaced, skipped=skipped)
+
+    # @implements FaqStoreBase
+    async def remove_guild_faq(self, guild: Guild, faq_name: str) -> Optional[FaqEntry]:
+        return await self._database.run(self._remove_guild_faq, guild.id, faq_name)
+
+    def _remove_guild_faq(self, guild_id: GuildID, faq_name: str) -> Optional[FaqEntry]:
+        if removed_entry := self._get_guild_faq_by_name(guild_id, faq_name):
+            # Aliases are removed along with the entry.
+            with self._database.connection as connection:
+                connection.execute(
+                    "DELETE FROM faq_entries WHERE guild_id = ? AND name = ?",
+                    (guild_id, faq_name),
+                )
+            return removed_entry
+
+    # @implements FaqStoreBase
+    async def update_faq(
+        self, guild: Guild, entry: FaqEntry, message: Message, content: str
+    ):
+        entry.updated_on = datetime.utcnow()
+        entry.content = content
+        entry.message_link = message.jump_url
+        await self._database.run(
+            self._update_faq,
+            guild.id,
+            entry.name,
+            entry.content,
+            entry.message_link,
+            entry.updated_on,
+        )
+
+    def _update_faq(
+        self,
+        guild_id: GuildID,
+        faq_name: str,
+        content: str,
+        message_link: str,
+        updated_on: datetime,
+    ):
+        with self._database.connection as connection:
+            connection.execute(
+                "UPDATE faq_entries SET content = ?, message_link = ?, updated_on = ?"
+                " WHERE guild_id = ? AND name = ?",
+                (content, message_link, updated_on.isoformat(), guild_id, faq_name),
+            )
+
+    # @implements FaqStoreBase
+    async def increment_faq_hits(self, guild: Guild, entry: FaqEntry) -> int:
+        await self._database.run(self._increment_faq_hits, guild.id, entry.name)
+        entry.hits += 1
+        return entry.hits
+
+    def _increment_faq_hits(self, guild_id: GuildID, faq_name: str):
+        with self._database.connection as connection:
+            connection.execute(
+                "UPDATE faq_entries SET hits = hits + 1 WHERE guild_id = ? AND name = ?",
+                (guild_id, faq_name),
+            )
+
+    # @implements FaqStoreBase
+    async def add_alias_to_faq(self, guild: Guild, entry: FaqEntry, alias: str) -> bool:
+        if added := await self._database.run(
+            self._add_alias_to_faq, guild.id, entry.name, alias
+        ):
+            entry.aliases = make_aliases({*entry.aliases, alias})
+        return added
+
+    def _add_alias_to_faq(self, guild_id: GuildID, faq_name: str, alias: str) -> bool:
+        # Refuse any alias that is already in use, either by this entry or another one.
+        if not self._is_key_available(guild_id, alias):
+            return False
+        with self._database.connection as connection:
+            (entry_id,) = connection.execute(
+                "SELECT entry_id FROM faq_entries WHERE guild_id = ? AND name = ?",
+                (guild_id, faq_name),
+            ).fetchone()
+            connection.execute(
+                "INSERT INTO faq_aliases (guild_id, alias, entry_id) VALUES (?, ?, ?)",
+                (guild_id, alias, entry_id),
+            )
+            self._insert_trigrams(guild_id, alias, entry_id)
+        return True
+
+    # @implements FaqStoreBase
+    async def remove_alias_from_faq(
+        self, guild: Guild, entry: FaqEntry, alias: str
+    ) -> bool:
+        if removed := await self._database.run(
+            self._remove_alias_from_faq, guild.id, entry.name, alias
+        ):
+            entry.aliases = make_aliases(entry.aliases - {alias})
+        return removed
+
+    def _remove_alias_from_faq(
+        self, guild_id: GuildID, faq_name: str, alias: str
+    ) -> bool:
+        with self._database.connection as connection:
+            row = connection.execute(
+                "SELECT entry_id FROM faq_aliases WHERE guild_id = ? AND alias = ?"
+                " AND entry_id = ("
+                " SELECT entry_id FROM faq_entries WHERE guild_id = ? AND name = ?"
+                ")",
+                (guild_id, alias, guild_id, faq_name),
+            ).fetchone()
+            if row is None:
+                return False
+            connection.execute(
+                "DELETE FROM faq_aliases WHERE guild_id = ? AND alias = ?",
+                (guild_id, alias),
+            )
+            connection.execute(
+                "DELETE FROM faq_trigrams WHERE entry_id = ? AND key = ?",
+                (row["entry_id"], alias),
+            )
+        return True
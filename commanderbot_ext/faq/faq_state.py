@@ -1,24 +1,88 @@
+from pathlib import Path
+from typing import Dict, Optional
+
 from commanderbot_lib.state.abc.cog_state import CogState
-from discord import Message
-from discord.ext.commands import Context
+from commanderbot_lib.types import GuildID
+from discord import Guild, Message
+from discord.ext.commands import Bot, Cog, Context
 
 from commanderbot_ext.faq.faq_guild_state import FaqGuildState
 from commanderbot_ext.faq.faq_options import FaqOptions
+from commanderbot_ext.faq.faq_sharded_store import FaqShardedStore
+from commanderbot_ext.faq.faq_sqlite_store import FaqSqliteStore
 from commanderbot_ext.faq.faq_store import FaqStore
+from commanderbot_ext.faq.faq_store_base import FaqStoreBase
+
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
 
 
-class FaqState(CogState[FaqOptions, FaqStore, FaqGuildState]):
+class FaqState(CogState[FaqOptions, FaqStoreBase, FaqGuildState]):
     store_class = FaqStore
     guild_state_class = FaqGuildState
 
-    async def list_faqs(self, ctx: Context):
+    def __init__(self, bot: Bot, cog: Cog, options: FaqOptions):
+        super().__init__(bot, cog, options)
+        # Guilds without a prefix of their own use the default one from the options.
+        self._prefixes_by_guild: Dict[GuildID, str] = {}
+
+    # @overrides CogState
+    async def _async_init(self):
+        # The database location decides where FAQs are kept: a directory (without a file
+        # extension) of per-guild files, an SQLite file, or otherwise a single file.
+        database = self.options.database
+        if isinstance(database, str):
+            suffix = Path(database).suffix
+            if not suffix:
+                self.store_class = FaqShardedStore
+            elif suffix in SQLITE_SUFFIXES:
+                self.store_class = FaqSqliteStore
+        await super()._async_init()
+        self._prefixes_by_guild = await self.store.get_guild_prefixes()
+
+    def get_prefix(self, guild: Guild) -> Optional[str]:
+        # This is checked for every message, so it must never touch the store.
+        return self._prefixes_by_guild.get(guild.id, self.options.prefix)
+
+    async def on_faq_message(self, message: Message, prefix: str):
+        if self.should_ack_message(message):
+            if guild_state := await self.get_guild_state(message.guild):
+                await guild_state.on_faq_message(message, prefix)
+
+    async def close(self):
+        await self.store.close()
+
+    async def list_faqs(self, ctx: Context, page: int = 1):
         if guild_state := await self.get_guild_state(ctx.guild):
-            await guild_state.list_faqs(ctx)
+            await guild_state.list_faqs(ctx, page)
 
     async def show_faq(self, ctx: Context, faq_query: str):
         if guild_state := await self.get_guild_state(ctx.guild):
             await guild_state.show_faq(ctx, faq_query)
 
+    async def show_prefix(self, ctx: Context):
+        if not ctx.guild:
+            return
+        if (prefix := self.get_prefix(ctx.guild)) is not None:
+            await ctx.send(f"FAQ prefix is `{prefix}`")
+        else:
+            await ctx.send(f"No FAQ prefix is set")
+
+    async def set_prefix(self, ctx: Context, prefix: Optional[str]):
+        if not ctx.guild:
+            return
+        # Unsetting the prefix of a guild falls back to the default one, if any.
+        await self.store.set_guild_prefix(ctx.guild, prefix)
+        if prefix is not None:
+            self._prefixes_by_guild[ctx.guild.id] = prefix
+            await ctx.send(f"Set FAQ prefix to `{prefix}`")
+        else:
+            self._prefixes_by_guild.pop(ctx.guild.id, None)
+            await self.show_prefix(ctx)
+
+    async def search_faqs(self, ctx: Context, terms: str):
+        if guild_state := await self.get_guild_state(ctx.guild):
+            await guild_state.search_faqs(ctx, terms)
+
     async def show_faq_details(self, ctx: Context, faq_query: str):
         if guild_state := await self.get_guild_state(ctx.guild):
             await guild_state.show_faq_details(ctx, faq_query)
@@ -39,6 +103,14 @@ class FaqState(CogState[FaqOptions, FaqStore, FaqGuildState]):
         if guild_state := await self.get_guild_state(ctx.guild):
             await guild_state.update_faq(ctx, faq_name, message, content)
 
+    async def export_faqs(self, ctx: Context):
+        if guild_state := await self.get_guild_state(ctx.guild):
+            await guild_state.export_faqs(ctx)
+
+    async def import_faqs(self, ctx: Context, policy: str):
+        if guild_state := await self.get_guild_state(ctx.guild):
+            await guild_state.import_faqs(ctx, policy)
+
     async def add_alias(self, ctx: Context, faq_name: str, alias: str):
         if guild_state := await self.get_guild_state(ctx.guild):
             await guild_state.add_alias(ctx, faq_name, alias)
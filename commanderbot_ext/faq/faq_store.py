@@ -1,26 +1,206 @@
+import asyncio
+import json
 from datetime import datetime
-from typing import Iterable, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 
+import yaml
 from commanderbot_lib.database.abc.versioned_file_database import (
     DataMigration,
     VersionedFileDatabase,
 )
+from commanderbot_lib.database.yaml_versioned_file_database import (
+    YamlVersionedFileDatabase,
+)
 from commanderbot_lib.store.abc.versioned_cached_store import VersionedCachedStore
+from commanderbot_lib.types import GuildID
+from commanderbot_lib.utils import fix_path
 from discord import Guild, Message
+from discord.ext.commands import Bot, Cog
 
 from commanderbot_ext.faq import faq_migrations as migrations
 from commanderbot_ext.faq.faq_cache import FaqCache, FaqEntry, FaqGuildData
+from commanderbot_ext.faq.faq_journal import FaqJournal
 from commanderbot_ext.faq.faq_options import FaqOptions
+from commanderbot_ext.faq.faq_store_base import FaqImportResult, FaqStoreBase
+from commanderbot_ext.utils import write_file_atomically
+
 
+class FaqStore(
+    VersionedCachedStore[FaqOptions, VersionedFileDatabase, FaqCache],
+    FaqStoreBase[VersionedFileDatabase],
+):
+    def __init__(self, bot: Bot, cog: Cog, options: FaqOptions):
+        super().__init__(bot, cog, options)
+        # Hits are applied to entries immediately, but only written to the database in
+        # batches. This keeps track of how many hits each entry has gained since then.
+        self._unsaved_hits: Dict[Tuple[GuildID, str], int] = {}
+        self._unsaved_hit_count: int = 0
+        self._flush_hits_task: Optional[asyncio.Task] = None
+        # In journaled mode, changes are appended to the journal instead of rewriting the
+        # entire database, which is only done to compact the journal.
+        self._journal: Optional[FaqJournal] = None
+        self._journal_seq: int = 0
+        self._compact_journal_task: Optional[asyncio.Task] = None
 
-class FaqStore(VersionedCachedStore[FaqOptions, VersionedFileDatabase, FaqCache]):
     # @implements CachedStore
     async def _build_cache(self, data: dict) -> FaqCache:
+        self._journal_seq = data.get("journal_seq", 0)
         return await FaqCache.deserialize(data)
 
     # @implements CachedStore
     async def serialize(self) -> dict:
-        return self._cache.serialize()
+        data = self._cache.serialize()
+        if self._journal:
+            data["journal_seq"] = self._journal.last_seq
+        return data
+
+    # @overrides CachedStore
+    async def _after_database_init(self):
+        await super()._after_database_init()
+        if self.options.journal and self._database.persistent:
+            await self._init_journal()
+        self._start_flushing_hits()
+
+    # @overrides CachedStore
+    async def dirty(self):
+        # Every write persists the whole cache, including any unsaved hits.
+        await super().dirty()
+        self._unsaved_hits.clear()
+        self._unsaved_hit_count = 0
+
+    async def close(self):
+        if self._flush_hits_task:
+            self._flush_hits_task.cancel()
+            self._flush_hits_task = None
+        await self.flush_hits()
+        # Let any compaction finish writing its snapshot before closing the journal, which
+        # it may still be about to compact.
+        if self._compact_journal_task:
+            await self._compact_journal_task
+        if self._journal:
+            self._journal.close()
+
+    async def flush_hits(self):
+        if not self._unsaved_hits:
+            return
+        if self._journal:
+            changes = [
+                dict(op="hits", guild=guild_id, name=faq_name, delta=delta)
+                for (guild_id, faq_name), delta in self._unsaved_hits.items()
+            ]
+            self._unsaved_hits.clear()
+            self._unsaved_hit_count = 0
+            await self._save_changes(changes)
+        else:
+            await self.dirty()
+
+    async def _save_changes(self, changes: List[dict]):
+        if not self._journal:
+            await self.dirty()
+            return
+        self._journal.append(changes)
+        # Compact the journal in the background, so the caller doesn't have to wait.
+        if (
+            self._journal.length >= self.options.journal_compact_threshold
+            and not self._compact_journal_task
+        ):
+            self._compact_journal_task = asyncio.create_task(self._compact_journal())
+
+    async def _init_journal(self):
+        journal_path = fix_path(self.options.database).with_suffix(".journal.jsonl")
+        self._journal = FaqJournal(journal_path, self._log)
+        replayed = 0
+        for change in self._journal.read(after_seq=self._journal_seq):
+            try:
+                await self._apply_change(change)
+                replayed += 1
+            except:
+                self._log.exception(f"Failed to replay journal change: {change}")
+        self._log.info(f"Replayed {replayed} change(s) from the journal")
+
+    async def _compact_journal(self):
+        # Take the snapshot all at once, so it matches the journal up to `seq` exactly. Any
+        # unsaved hits are part of it, so they mustn't be journaled again afterwards.
+        seq = self._journal.last_seq
+        data = await self.serialize()
+        unsaved_hits = self._unsaved_hits
+        self._unsaved_hits = {}
+        self._unsaved_hit_count = 0
+        try:
+            self._log.info(f"Compacting journal with {self._journal.length} change(s)")
+            # Only the writing is done off the event loop, while changes keep being
+            # appended to the journal.
+            content = self._encode_snapshot(data)
+            path = fix_path(self.options.database)
+            await self.bot.loop.run_in_executor(
+                None, write_file_atomically, path, content
+            )
+            # Keep whatever was appended while the snapshot was being written.
+            self._journal.discard_through(seq)
+        except:
+            self._log.exception("Failed to compact journal")
+            # The snapshot never made it, so the hits are still unsaved.
+            for key, delta in unsaved_hits.items():
+                self._unsaved_hits[key] = self._unsaved_hits.get(key, 0) + delta
+                self._unsaved_hit_count += delta
+        finally:
+            self._compact_journal_task = None
+
+    def _encode_snapshot(self, data: dict) -> bytes:
+        # Encode it just as the database itself would, so that it can be read back.
+        wrapper_data = {"version": self.data_version, "data": data}
+        if isinstance(self._database, YamlVersionedFileDatabase):
+            return yaml.safe_dump(wrapper_data).encode("utf-8")
+        return json.dumps(wrapper_data, indent=2).encode("utf-8")
+
+    async def _apply_change(self, change: dict):
+        op = change["op"]
+        guild_id = change["guild"]
+        guild_data = self._cache.guilds.get(guild_id)
+        if guild_data is None:
+            guild_data = FaqGuildData(guild_id=guild_id, entries={})
+            self._cache.guilds[guild_id] = guild_data
+        if op == "prefix":
+            guild_data.prefix = change["prefix"]
+            return
+        faq_name = change["name"]
+        if op == "add":
+            guild_data.add_entry(await FaqEntry.deserialize(change["entry"], faq_name))
+            return
+        if op == "remove":
+            guild_data.remove_entry(faq_name)
+            return
+        # The entry may have been removed by a later change that has already been applied.
+        entry = guild_data.entries.get(faq_name)
+        if entry is None:
+            return
+        if op == "update":
+            guild_data.update_entry(
+                entry,
+                content=change["content"],
+                message_link=change["message_link"],
+                updated_on=datetime.fromisoformat(change["updated_on"]),
+            )
+        elif op == "hits":
+            guild_data.add_hits(entry, change["delta"])
+        elif op == "alias_add":
+            guild_data.add_alias(entry, change["alias"])
+        elif op == "alias_remove":
+            guild_data.remove_alias(entry, change["alias"])
+        else:
+            raise ValueError(f"Unknown journal operation: {op}")
+
+    def _start_flushing_hits(self):
+        if self.options.hits_flush_interval:
+            self._flush_hits_task = asyncio.create_task(self._flush_hits_periodically())
+
+    async def _flush_hits_periodically(self):
+        while True:
+            await asyncio.sleep(self.options.hits_flush_interval)
+            try:
+                await self.flush_hits()
+            except:
+                self._log.exception("Failed to flush FAQ hits")
 
     # @implements VersionedCachedStore
     def _collect_migrations(
@@ -37,73 +217,200 @@ class FaqStore(VersionedCachedStore[FaqOptions, VersionedFileDatabase, FaqCache]
     def data_version(self) -> int:
         return 1
 
-    def get_guild_data(self, guild: Guild) -> Optional[FaqGuildData]:
+    async def get_guild_data(self, guild: Guild) -> Optional[FaqGuildData]:
         return self._cache.guilds.get(guild.id)
 
+    async def get_guild_prefixes(self) -> Dict[GuildID, str]:
+        return {
+            guild_id: guild_data.prefix
+            for guild_id, guild_data in self._cache.guilds.items()
+            if guild_data.prefix is not None
+        }
+
+    async def set_guild_prefix(self, guild: Guild, prefix: Optional[str]):
+        guild_data = await self.get_guild_data(guild)
+        if guild_data is None:
+            guild_data = FaqGuildData(guild_id=guild.id, entries={})
+            self._cache.guilds[guild.id] = guild_data
+        guild_data.prefix = prefix
+        await self._save_changes([dict(op="prefix", guild=guild.id, prefix=prefix)])
+
     async def iter_guild_faqs(self, guild: Guild) -> Optional[Iterable[FaqEntry]]:
-        if guild_data := self.get_guild_data(guild):
+        if guild_data := await self.get_guild_data(guild):
             return guild_data.entries.values()
 
+    async def count_guild_faqs(self, guild: Guild) -> int:
+        if guild_data := await self.get_guild_data(guild):
+            return len(guild_data.entries)
+        return 0
+
+    async def get_guild_faq_page(
+        self, guild: Guild, offset: int, limit: int, most_popular_first: bool = False
+    ) -> List[FaqEntry]:
+        if guild_data := await self.get_guild_data(guild):
+            return guild_data.get_page(offset, limit, most_popular_first)
+        return []
+
     async def get_guild_faq_by_name(
         self, guild: Guild, faq_name: str
     ) -> Optional[FaqEntry]:
-        if guild_data := self.get_guild_data(guild):
-            return guild_data.entries.get(faq_name)
+        if guild_data := await self.get_guild_data(guild):
+            return guild_data.get_entry_by_name(faq_name)
 
     async def get_guild_faq_by_alias(
         self, guild: Guild, faq_alias: str
     ) -> Optional[FaqEntry]:
-        if guild_data := self.get_guild_data(guild):
-            # TODO Optimize look-up by re-building a map every time aliases are changed. #optimize
-            for faq_entry in guild_data.entries.values():
-                if faq_alias in faq_entry.aliases:
-                    return faq_entry
+        if guild_data := await self.get_guild_data(guild):
+            return guild_data.get_entry_by_alias(faq_alias)
 
     async def get_guild_faq(self, guild: Guild, faq_query: str) -> Optional[FaqEntry]:
-        # First try to get the FAQ entry by name.
-        entry = await self.get_guild_faq_by_name(guild, faq_query)
-        # If that doesn't work, try to get it by alias.
-        if entry is None:
-            entry = await self.get_guild_faq_by_alias(guild, faq_query)
-        # Return whatever we get, even if nothing comes up.
-        return entry
+        # Names and aliases share the same index, with names taking precedence.
+        if guild_data := await self.get_guild_data(guild):
+            return guild_data.get_entry(faq_query)
 
-    async def add_guild_faq(self, guild: Guild, faq_entry: FaqEntry):
-        guild_data = self.get_guild_data(guild)
+    async def suggest_guild_faqs(
+        self, guild: Guild, faq_query: str, limit: int
+    ) -> List[str]:
+        if guild_data := await self.get_guild_data(guild):
+            return guild_data.suggest_keys(faq_query, limit)
+        return []
+
+    async def search_guild_faqs(
+        self, guild: Guild, terms: str, limit: int
+    ) -> List[FaqEntry]:
+        if guild_data := await self.get_guild_data(guild):
+            return guild_data.search_entries(terms, limit)
+        return []
+
+    async def add_guild_faq(self, guild: Guild, faq_entry: FaqEntry) -> bool:
+        guild_data = await self.get_guild_data(guild)
         if guild_data is None:
             guild_data = FaqGuildData(guild_id=guild.id, entries={})
             self._cache.guilds[guild.id] = guild_data
-        guild_data.entries[faq_entry.name] = faq_entry
-        await self.dirty()
+        if guild_data.add_entry(faq_entry):
+            await self._save_changes(
+                [
+                    dict(
+                        op="add",
+                        guild=guild.id,
+                        name=faq_entry.name,
+                        entry=faq_entry.serialize(),
+                    )
+                ]
+            )
+            return True
+        return False
+
+    async def import_guild_faqs(
+        self, guild: Guild, faq_entries: Iterable[FaqEntry], overwrite: bool
+    ) -> FaqImportResult:
+        guild_data = await self.get_guild_data(guild)
+        if guild_data is None:
+            guild_data = FaqGuildData(guild_id=guild.id, entries={})
+            self._cache.guilds[guild.id] = guild_data
+        added, replaced, skipped = 0, 0, 0
+        changes = []
+        for faq_entry in faq_entries:
+            existing_entry = guild_data.get_entry_by_name(faq_entry.name)
+            if existing_entry and not overwrite:
+                skipped += 1
+                continue
+            if existing_entry:
+                guild_data.remove_entry(faq_entry.name)
+            if not guild_data.add_entry(faq_entry):
+                # One of its aliases belongs to another entry, so put back the old one.
+                if existing_entry:
+                    guild_data.add_entry(existing_entry)
+                skipped += 1
+                continue
+            if existing_entry:
+                # Any unsaved hits belonged to the entry being replaced.
+                unsaved_hits = self._unsaved_hits.pop((guild.id, faq_entry.name), 0)
+                self._unsaved_hit_count -= unsaved_hits
+                changes.append(dict(op="remove", guild=guild.id, name=faq_entry.name))
+                replaced += 1
+            else:
+                added += 1
+            changes.append(
+                dict(
+                    op="add",
+                    guild=guild.id,
+                    name=faq_entry.name,
+                    entry=faq_entry.serialize(),
+                )
+            )
+        # Everything is saved at once, rather than once per entry.
+        if changes:
+            await self._save_changes(changes)
+        return FaqImportResult(added=added, replaced=replaced, skipped=skipped)
 
     async def remove_guild_faq(self, guild: Guild, faq_name: str) -> Optional[FaqEntry]:
-        if guild_data := self.get_guild_data(guild):
-            if removed_entry := guild_data.entries.pop(faq_name, None):
-                await self.dirty()
+        if guild_data := await self.get_guild_data(guild):
+            if removed_entry := guild_data.remove_entry(faq_name):
+                await self._save_changes(
+                    [dict(op="remove", guild=guild.id, name=faq_name)]
+                )
                 return removed_entry
 
-    async def update_faq(self, entry: FaqEntry, message: Message, content: str):
-        now = datetime.utcnow()
-        entry.updated_on = now
-        entry.content = content
-        entry.message_link = message.jump_url
-        await self.dirty()
+    async def update_faq(
+        self, guild: Guild, entry: FaqEntry, message: Message, content: str
+    ):
+        guild_data = await self.get_guild_data(guild)
+        guild_data.update_entry(
+            entry,
+            content=content,
+            message_link=message.jump_url,
+            updated_on=datetime.utcnow(),
+        )
+        await self._save_changes(
+            [
+                dict(
+                    op="update",
+                    guild=guild.id,
+                    name=entry.name,
+                    content=entry.content,
+                    message_link=entry.message_link,
+                    updated_on=entry.updated_on.isoformat(),
+                )
+            ]
+        )
 
-    async def increment_faq_hits(self, entry: FaqEntry) -> int:
-        entry.hits += 1
-        await self.dirty()
+    async def increment_faq_hits(self, guild: Guild, entry: FaqEntry) -> int:
+        guild_data = await self.get_guild_data(guild)
+        guild_data.add_hits(entry, 1)
+        key = (guild.id, entry.name)
+        self._unsaved_hits[key] = self._unsaved_hits.get(key, 0) + 1
+        self._unsaved_hit_count += 1
+        # Only write once enough hits have piled up, otherwise wait for the next flush.
+        threshold = self.options.hits_flush_threshold
+        if threshold and self._unsaved_hit_count >= threshold:
+            await self.flush_hits()
         return entry.hits
 
-    async def add_alias_to_faq(self, entry: FaqEntry, alias: str) -> bool:
-        if alias in entry.aliases:
-            return False
-        entry.aliases.add(alias)
-        await self.dirty()
-        return True
-
-    async def remove_alias_from_faq(self, entry: FaqEntry, alias: str) -> bool:
-        if alias not in entry.aliases:
-            return False
-        entry.aliases.remove(alias)
-        await self.dirty()
-        return True
+    async def add_alias_to_faq(self, guild: Guild, entry: FaqEntry, alias: str) -> bool:
+        # Refuse any alias that is already in use, either by this entry or another one.
+        if guild_data := await self.get_guild_data(guild):
+            if guild_data.add_alias(entry, alias):
+                await self._save_changes(
+                    [dict(op="alias_add", guild=guild.id, name=entry.name, alias=alias)]
+                )
+                return True
+        return False
+
+    async def remove_alias_from_faq(
+        self, guild: Guild, entry: FaqEntry, alias: str
+    ) -> bool:
+        if guild_data := await self.get_guild_data(guild):
+            if guild_data.remove_alias(entry, alias):
+                await self._save_changes(
+                    [
+                        dict(
+                            op="alias_remove",
+                            guild=guild.id,
+                            name=entry.name,
+                            alias=alias,
+                        )
+                    ]
+                )
+                return True
+        return False
@@ -0,0 +1,115 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Generic, Iterable, List, NamedTuple, Optional, TypeVar
+
+from commanderbot_lib.database.abc.cog_database import CogDatabase
+from commanderbot_lib.store.abc.cog_store import CogStore
+from commanderbot_lib.types import GuildID
+from discord import Guild, Message
+
+from commanderbot_ext.faq.faq_cache import FaqEntry
+from commanderbot_ext.faq.faq_options import FaqOptions
+
+DatabaseType = TypeVar("DatabaseType", bound=CogDatabase)
+
+
+class FaqImportResult(NamedTuple):
+    added: int
+    replaced: int
+    skipped: int
+
+
+class FaqStoreBase(CogStore[FaqOptions, DatabaseType], ABC, Generic[DatabaseType]):
+    """
+    The interface shared by every kind of FAQ store, whichever way the FAQs are kept, so
+    that the cog's state doesn't need to know which one it's using.
+
+    Entries that are handed out may be kept and passed back in to make changes to them.
+    """
+
+    @abstractmethod
+    async def close(self):
+        """Save anything that's still unsaved, and release the database."""
+
+    @abstractmethod
+    async def get_guild_prefixes(self) -> Dict[GuildID, str]:
+        """Return the prefix of every guild that has one of its own."""
+
+    @abstractmethod
+    async def set_guild_prefix(self, guild: Guild, prefix: Optional[str]):
+        """Set or unset the prefix of a guild."""
+
+    @abstractmethod
+    async def iter_guild_faqs(self, guild: Guild) -> Optional[Iterable[FaqEntry]]:
+        """Return every entry of a guild, if it has any."""
+
+    @abstractmethod
+    async def count_guild_faqs(self, guild: Guild) -> int:
+        """Return how many entries a guild has."""
+
+    @abstractmethod
+    async def get_guild_faq_page(
+        self, guild: Guild, offset: int, limit: int, most_popular_first: bool = False
+    ) -> List[FaqEntry]:
+        """Return up to `limit` entries ordered by hits and then name."""
+
+    @abstractmethod
+    async def get_guild_faq_by_name(
+        self, guild: Guild, faq_name: str
+    ) -> Optional[FaqEntry]:
+        """Return the entry with the given name."""
+
+    @abstractmethod
+    async def get_guild_faq_by_alias(
+        self, guild: Guild, faq_alias: str
+    ) -> Optional[FaqEntry]:
+        """Return the entry with the given alias."""
+
+    @abstractmethod
+    async def get_guild_faq(self, guild: Guild, faq_query: str) -> Optional[FaqEntry]:
+        """Return the entry with the given name or, failing that, alias."""
+
+    @abstractmethod
+    async def suggest_guild_faqs(
+        self, guild: Guild, faq_query: str, limit: int
+    ) -> List[str]:
+        """Return up to `limit` names and aliases similar to a query that matched none."""
+
+    @abstractmethod
+    async def search_guild_faqs(
+        self, guild: Guild, terms: str, limit: int
+    ) -> List[FaqEntry]:
+        """Return up to `limit` entries matching the terms, most relevant first."""
+
+    @abstractmethod
+    async def add_guild_faq(self, guild: Guild, faq_entry: FaqEntry) -> bool:
+        """Add an entry, unless its name or any of its aliases is already in use."""
+
+    @abstractmethod
+    async def import_guild_faqs(
+        self, guild: Guild, faq_entries: Iterable[FaqEntry], overwrite: bool
+    ) -> FaqImportResult:
+        """Add many entries at once, replacing those with the same name if asked to."""
+
+    @abstractmethod
+    async def remove_guild_faq(self, guild: Guild, faq_name: str) -> Optional[FaqEntry]:
+        """Remove the entry with the given name, and return it."""
+
+    @abstractmethod
+    async def update_faq(
+        self, guild: Guild, entry: FaqEntry, message: Message, content: str
+    ):
+        """Replace the content of an entry with that of a message."""
+
+    @abstractmethod
+    async def increment_faq_hits(self, guild: Guild, entry: FaqEntry) -> int:
+        """Count a hit on an entry, and return its new number of hits."""
+
+    @abstractmethod
+    async def add_alias_to_faq(self, guild: Guild, entry: FaqEntry, alias: str) -> bool:
+        """Add an alias to an entry, unless it's already in use."""
+
+    @abstractmethod
+    async def remove_alias_from_faq(
+        self, guild: Guild, entry: FaqEntry, alias: str
+    ) -> bool:
+        """Remove an alias from an entry, if it has it."""
@@ -0,0 +1,81 @@
+from typing import Callable, Dict, FrozenSet, Hashable, Iterable, List, Set, Tuple
+
+# How similar a key has to be to a query to be suggested, from 0 (nothing in common) to 1.
+MIN_SIMILARITY = 0.3
+
+
+def make_trigrams(key: str) -> FrozenSet[str]:
+    # Pad the key so that short keys still have trigrams, and so that matching starts
+    # count for a little more than matching ends.
+    padded = f"  {key.lower()} "
+    return frozenset(padded[i : i + 3] for i in range(len(padded) - 2))
+
+
+def rank_suggestions(
+    query_trigrams: FrozenSet[str],
+    candidates: Iterable[Tuple[str, Hashable, int]],
+    limit: int,
+    count_trigrams: Callable[[str], int] = lambda key: len(make_trigrams(key)),
+) -> List[str]:
+    """
+    Return up to `limit` of the best candidate keys, given as tuples of the key, what it
+    refers to (so that only the best key is suggested for each), and how many trigrams it
+    shares with the query.
+    """
+    # A key can't be any more similar than the fraction of the query it shares, so skip
+    # the ones that can't possibly make the cut without looking at them any further.
+    min_shared = MIN_SIMILARITY * len(query_trigrams)
+    scored: List[Tuple[float, str, Hashable]] = []
+    for key, group, shared in candidates:
+        if shared < min_shared:
+            continue
+        # Jaccard similarity between the trigrams of the query and those of the key.
+        similarity = shared / (len(query_trigrams) + count_trigrams(key) - shared)
+        if similarity >= MIN_SIMILARITY:
+            scored.append((similarity, key, group))
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    suggestions: List[str] = []
+    seen_groups: Set[Hashable] = set()
+    for _, key, group in scored:
+        if group not in seen_groups:
+            seen_groups.add(group)
+            suggestions.append(key)
+            if len(suggestions) >= limit:
+                break
+    return suggestions
+
+
+class FaqTrigramIndex:
+    """
+    An index of every name and alias in a guild by their trigrams, used to suggest similar
+    FAQs when a query doesn't match anything, without comparing it against every key.
+    """
+
+    def __init__(self):
+        self._keys_by_trigram: Dict[str, Set[str]] = {}
+        self._trigram_count_by_key: Dict[str, int] = {}
+
+    def add(self, key: str):
+        trigrams = make_trigrams(key)
+        self._trigram_count_by_key[key] = len(trigrams)
+        for trigram in trigrams:
+            self._keys_by_trigram.setdefault(trigram, set()).add(key)
+
+    def remove(self, key: str):
+        self._trigram_count_by_key.pop(key, None)
+        for trigram in make_trigrams(key):
+            if keys := self._keys_by_trigram.get(trigram):
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_trigram[trigram]
+
+    def count_shared(self, query_trigrams: FrozenSet[str]) -> Dict[str, int]:
+        """Return how many trigrams each key shares with the query, if any."""
+        shared_by_key: Dict[str, int] = {}
+        for trigram in query_trigrams:
+            for key in self._keys_by_trigram.get(trigram, ()):
+                shared_by_key[key] = shared_by_key.get(key, 0) + 1
+        return shared_by_key
+
+    def count_trigrams(self, key: str) -> int:
+        return self._trigram_count_by_key[key]
@@ -1,7 +1,8 @@
-from discord.ext import commands
+from commanderbot_lib.utils import add_configured_cog
+from discord.ext.commands import Bot
 
 from commanderbot_ext.jira.jira_cog import JiraCog
 
 
-def setup(bot: commands.Bot):
-    bot.add_cog(JiraCog(bot))
+def setup(bot: Bot):
+    add_configured_cog(bot, JiraCog)
@@ -0,0 +1,126 @@
+import time
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Tuple
+
+from commanderbot_ext.jira.jira_issue import JiraIssue
+
+
+class JiraCacheStats(NamedTuple):
+    size: int
+    hits: int
+    stale_hits: int
+    misses: int
+    evictions: int
+
+
+class JiraIssueCache:
+    """
+    A bounded cache of recently looked-up issues, evicting the least-recently-used ones.
+
+    An issue is fresh for `ttl` seconds after it was fetched, or `ttl_resolved` seconds if
+    it was resolved, since those rarely change. After that it's stale for `stale_ttl` more
+    seconds, during which it may still be served while it's refreshed in the background.
+    Older issues are kept until they're evicted, but can only be had with `peek`.
+
+    Attributes
+    -----------
+    max_size: :class:`int`
+        The most issues to keep at once.
+    ttl: :class:`float`
+        How long (in seconds) an open issue stays fresh.
+    ttl_resolved: :class:`float`
+        How long (in seconds) a resolved issue stays fresh.
+    stale_ttl: :class:`float`
+        How long (in seconds) an issue may be served after it's no longer fresh.
+    dirty: :class:`bool`
+        Whether any issues have been cached since the cache was last serialized.
+    """
+
+    def __init__(
+        self, max_size: int, ttl: float, ttl_resolved: float, stale_ttl: float
+    ):
+        self.max_size: int = max_size
+        self.ttl: float = ttl
+        self.ttl_resolved: float = ttl_resolved
+        self.stale_ttl: float = stale_ttl
+        self.dirty: bool = False
+        # Maps issue keys to `(fetched_at, issue)`, from least to most recently used. The
+        # time is from the wall clock rather than a monotonic one, so it survives restarts.
+        self._issues: "OrderedDict[str, Tuple[float, JiraIssue]]" = OrderedDict()
+        self._hits: int = 0
+        self._stale_hits: int = 0
+        self._misses: int = 0
+        self._evictions: int = 0
+
+    @property
+    def stats(self) -> JiraCacheStats:
+        return JiraCacheStats(
+            size=len(self._issues),
+            hits=self._hits,
+            stale_hits=self._stale_hits,
+            misses=self._misses,
+            evictions=self._evictions,
+        )
+
+    def _get_ttl(self, issue: JiraIssue) -> float:
+        return self.ttl_resolved if issue.is_resolved else self.ttl
+
+    def get(self, issue_key: str) -> Tuple[Optional[JiraIssue], bool]:
+        """
+        Return the cached issue, if any, and whether it's stale and should be refreshed.
+        """
+        cached = self._issues.get(issue_key)
+        if cached is not None:
+            fetched_at, issue = cached
+            age = time.time() - fetched_at
+            ttl = self._get_ttl(issue)
+            if age < ttl:
+                self._issues.move_to_end(issue_key)
+                self._hits += 1
+                return issue, False
+            if age < ttl + self.stale_ttl:
+                self._issues.move_to_end(issue_key)
+                self._stale_hits += 1
+                return issue, True
+            # Kept around in case Jira can't be reached to fetch it again.
+        self._misses += 1
+        return None, False
+
+    def peek(self, issue_key: str) -> Optional[JiraIssue]:
+        """Return the cached issue, if any, no matter how old it is."""
+        cached = self._issues.get(issue_key)
+        return cached[1] if cached else None
+
+    def put(self, issue: JiraIssue, fetched_at: Optional[float] = None):
+        self._issues[issue.key] = (fetched_at or time.time(), issue)
+        self._issues.move_to_end(issue.key)
+        self.dirty = True
+        while len(self._issues) > self.max_size:
+            self._issues.popitem(last=False)
+            self._evictions += 1
+
+    def load(self, data: dict) -> int:
+        """
+        Cache the issues from serialized data, skipping any that are too old to be served,
+        and return how many were cached.
+        """
+        now = time.time()
+        loaded = 0
+        for raw_issue in data.get("issues", []):
+            issue = JiraIssue.from_data(raw_issue["issue"])
+            fetched_at = raw_issue["fetched_at"]
+            if now - fetched_at < self._get_ttl(issue) + self.stale_ttl:
+                self.put(issue, fetched_at)
+                loaded += 1
+        # Nothing has changed since these were saved.
+        self.dirty = False
+        return loaded
+
+    def serialize(self) -> dict:
+        # From least to most recently used, so that loading them keeps the same order.
+        issues: List[dict] = [
+            dict(fetched_at=fetched_at, issue=issue.serialize())
+            for fetched_at, issue in self._issues.values()
+        ]
+        self.dirty = False
+        return dict(issues=issues)
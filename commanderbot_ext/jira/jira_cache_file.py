@@ -0,0 +1,40 @@
+import json
+from os import PathLike
+from pathlib import Path
+from typing import Optional
+
+from commanderbot_lib.utils import fix_path
+
+from commanderbot_ext.utils import write_file_atomically
+
+
+class JiraCacheFile:
+    """
+    A versioned JSON file that the issue cache is kept in between restarts. Reading and
+    writing block, so they're meant to be run in an executor rather than on the event loop.
+
+    Attributes
+    -----------
+    path: :class:`Path`
+        The path to the file on the local filesystem.
+    """
+
+    version: int = 1
+
+    def __init__(self, path: PathLike):
+        self.path: Path = fix_path(path)
+
+    def read(self) -> Optional[dict]:
+        if not self.path.exists():
+            return None
+        with open(self.path, encoding="utf-8") as file:
+            wrapper_data = json.load(file)
+        # The cache can always be rebuilt, so anything from another version is discarded.
+        if wrapper_data.get("version") != self.version:
+            return None
+        return wrapper_data.get("data", {})
+
+    def write(self, data: dict):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        content = json.dumps({"version": self.version, "data": data})
+        write_file_atomically(self.path, content.encode("utf-8"))
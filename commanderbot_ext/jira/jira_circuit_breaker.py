@@ -0,0 +1,133 @@
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+from commanderbot_lib.logging import Logger
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Return how many seconds a `Retry-After` header asks to wait, if it can be read."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class JiraCircuitBreaker:
+    """
+    Stops requests from being made to Jira while it appears to be down, so that they can
+    fail right away instead of each waiting on a failing round trip.
+
+    The breaker starts closed, letting every request through. It opens after `threshold`
+    consecutive failures, or as soon as Jira asks to be left alone with `Retry-After`, and
+    then rejects every request for a cooldown. After that it's half-open and lets a single
+    probe through: if the probe succeeds the breaker closes again, otherwise it re-opens
+    with twice the cooldown, up to `max_cooldown`.
+
+    Each request that's let through is given a token, to hand back along with how it went.
+    Only requests let through since the breaker last changed state are counted, so that a
+    slow one from before can't close the breaker or release the probe.
+
+    Attributes
+    -----------
+    threshold: :class:`int`
+        How many consecutive failures open the breaker.
+    cooldown: :class:`float`
+        How long (in seconds) the breaker first stays open for.
+    max_cooldown: :class:`float`
+        The longest (in seconds) the breaker stays open for at once.
+    state: :class:`str`
+        Whether the breaker is currently closed, open, or half-open.
+    consecutive_failures: :class:`int`
+        How many requests have failed since the last one that succeeded.
+    trips: :class:`int`
+        How many times the breaker has opened.
+    """
+
+    def __init__(
+        self, threshold: int, cooldown: float, max_cooldown: float, log: Logger
+    ):
+        self.threshold: int = threshold
+        self.cooldown: float = cooldown
+        self.max_cooldown: float = max_cooldown
+        self._log: Logger = log
+        self.state: str = CLOSED
+        self.consecutive_failures: int = 0
+        self.trips: int = 0
+        self._current_cooldown: float = cooldown
+        self._open_until: float = 0.0
+        self._probing: bool = False
+        # Changes whenever the state does, and is what requests are given as tokens.
+        self._epoch: int = 1
+
+    @property
+    def retry_in(self) -> float:
+        """How long (in seconds) until the breaker lets a request through again."""
+        if self.state == CLOSED:
+            return 0.0
+        return max(self._open_until - time.monotonic(), 0.0)
+
+    def allow(self) -> Optional[int]:
+        """Return a token if a request may be made right now, or nothing otherwise."""
+        if self.state == CLOSED:
+            return self._epoch
+        if self._probing or time.monotonic() < self._open_until:
+            return None
+        self._set_state(HALF_OPEN)
+        self._probing = True
+        return self._epoch
+
+    def record(
+        self, token: int, healthy: Optional[bool], retry_after: Optional[float] = None
+    ):
+        """
+        Record how a request that was allowed went: whether Jira seemed healthy, or nothing
+        if that couldn't be told, such as when the request was cancelled.
+        """
+        if token != self._epoch:
+            return
+        if self.state == HALF_OPEN:
+            self._probing = False
+        if healthy is None:
+            return
+        if healthy:
+            if self.state != CLOSED:
+                self._log.warning(
+                    "Jira is reachable again, closing the circuit breaker"
+                )
+                self._set_state(CLOSED)
+            self.consecutive_failures = 0
+            self._current_cooldown = self.cooldown
+            return
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN:
+            # The probe failed, so back off for longer this time.
+            self._current_cooldown = min(self._current_cooldown * 2, self.max_cooldown)
+            self._open(retry_after)
+        elif retry_after is not None or self.consecutive_failures >= self.threshold:
+            self._open(retry_after)
+
+    def _set_state(self, state: str):
+        self.state = state
+        self._epoch += 1
+
+    def _open(self, retry_after: Optional[float]):
+        cooldown = max(self._current_cooldown, retry_after or 0.0)
+        if self.state == CLOSED:
+            self.trips += 1
+        self._set_state(OPEN)
+        self._open_until = time.monotonic() + cooldown
+        self._log.warning(
+            f"Opening the circuit breaker for {cooldown:.0f} seconds after"
+            f" {self.consecutive_failures} consecutive failures"
+        )
@@ -0,0 +1,156 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+from urllib.parse import quote
+
+import aiohttp
+from commanderbot_lib.logging import Logger
+
+from commanderbot_ext.jira.jira_circuit_breaker import (
+    JiraCircuitBreaker,
+    parse_retry_after,
+)
+from commanderbot_ext.jira.jira_issue import ISSUE_FIELDS, JiraIssue
+from commanderbot_ext.jira.jira_options import JiraOptions
+
+
+class JiraError(Exception):
+    pass
+
+
+class JiraUnavailableError(JiraError):
+    def __init__(self, what: str, retry_in: float):
+        super().__init__(f"Jira is unavailable, not requesting {what}")
+        self.retry_in: float = retry_in
+
+
+class JiraClient:
+    """
+    Talks to the Jira REST API over a single pooled HTTP session, which is created the first
+    time it's needed and kept open until the client is closed.
+
+    Attributes
+    -----------
+    base_url: :class:`str`
+        The base URL of the Jira instance, without a trailing slash.
+    options: :class:`JiraOptions`
+        The timeouts and concurrency limit to use.
+    breaker: :class:`JiraCircuitBreaker`
+        Stops requests from being made while Jira appears to be down.
+    """
+
+    def __init__(self, base_url: str, options: JiraOptions, log: Logger):
+        self.base_url: str = base_url
+        self.options: JiraOptions = options
+        self._log: Logger = log
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.breaker: JiraCircuitBreaker = JiraCircuitBreaker(
+            threshold=options.breaker_threshold,
+            cooldown=options.breaker_cooldown,
+            max_cooldown=options.breaker_max_cooldown,
+            log=log,
+        )
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # Created lazily, so that it's bound to the event loop the bot is running on.
+        if self._session is None or self._session.closed:
+            timeout = aiohttp.ClientTimeout(
+                sock_connect=self.options.connect_timeout,
+                sock_read=self.options.read_timeout,
+            )
+            self._session = aiohttp.ClientSession(timeout=timeout)
+            self._semaphore = asyncio.Semaphore(self.options.max_concurrent_requests)
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _get_json(self, url: str, what: str, **params) -> Any:
+        if (token := self.breaker.allow()) is None:
+            raise JiraUnavailableError(what, self.breaker.retry_in)
+        session = self._get_session()
+        # Whether Jira seemed healthy, which stays unknown if the request is cancelled.
+        healthy: Optional[bool] = None
+        retry_after: Optional[float] = None
+        try:
+            async with self._semaphore:
+                async with session.get(url, params=params) as response:
+                    if response.status == 429 or response.status >= 500:
+                        healthy = False
+                        retry_after = parse_retry_after(
+                            response.headers.get("Retry-After")
+                        )
+                    elif response.status >= 400:
+                        # It answered, even if it's with an error, so it's not down.
+                        healthy = True
+                    if response.status in (401, 403, 404):
+                        return None
+                    response.raise_for_status()
+                    data = await response.json()
+                    healthy = True
+                    return data
+        except asyncio.TimeoutError as ex:
+            healthy = False
+            raise JiraError(f"Timed out requesting {what}") from ex
+        except aiohttp.ClientError as ex:
+            if healthy is None:
+                healthy = False
+            raise JiraError(f"Failed to request {what}") from ex
+        finally:
+            self.breaker.record(token, healthy, retry_after)
+
+    async def get_issue(self, issue_id: str) -> Optional[JiraIssue]:
+        """Return an issue, or nothing if it's private or doesn't exist."""
+        url = f"{self.base_url}/rest/api/latest/issue/{quote(issue_id, safe='')}"
+        data = await self._get_json(
+            url, f"Jira issue: {issue_id}", fields=",".join(ISSUE_FIELDS)
+        )
+        if data is None:
+            return None
+        try:
+            return JiraIssue.from_fields(issue_id, data["fields"])
+        except (KeyError, TypeError, IndexError) as ex:
+            raise JiraError(f"Unexpected response for Jira issue: {issue_id}") from ex
+
+    async def search_issues(self, issue_ids: List[str]) -> Dict[str, JiraIssue]:
+        """
+        Return as many of the issues as are accessible, by key, using a single request. Any
+        that are private or don't exist are left out.
+        """
+        what = f"Jira issues: {', '.join(issue_ids)}"
+        url = f"{self.base_url}/rest/api/latest/search"
+        # Keys are quoted so they can't change the meaning of the query, and the query is
+        # only validated loosely so that keys which don't exist aren't an error.
+        jql = "key in ({})".format(", ".join(f'"{issue_id}"' for issue_id in issue_ids))
+        data = await self._get_json(
+            url,
+            what,
+            jql=jql,
+            fields=",".join(ISSUE_FIELDS),
+            maxResults=len(issue_ids),
+            validateQuery="warn",
+        )
+        if data is None:
+            return {}
+        try:
+            issues = (
+                JiraIssue.from_fields(raw_issue["key"], raw_issue["fields"])
+                for raw_issue in data["issues"]
+            )
+            return {issue.key: issue for issue in issues}
+        except (KeyError, TypeError, IndexError) as ex:
+            raise JiraError(f"Unexpected response for {what}") from ex
+
+    async def get_names(self, resource: str) -> Dict[str, str]:
+        """Return the names of every status or resolution, for example, by their ids."""
+        url = f"{self.base_url}/rest/api/latest/{resource}"
+        what = f"Jira metadata: {resource}"
+        data = await self._get_json(url, what)
+        if data is None:
+            return {}
+        try:
+            return {item["id"]: item["name"] for item in data}
+        except (KeyError, TypeError) as ex:
+            raise JiraError(f"Unexpected response for {what}") from ex
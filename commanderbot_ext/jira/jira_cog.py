@@ -1,74 +1,305 @@
+import asyncio
+import math
+import re
+import time
+from typing import Dict, List, Optional, Set
+from urllib.parse import urlparse
+
 import discord
-import requests
+from commanderbot_lib import checks
 from commanderbot_lib.logging import Logger, get_clogger
-from discord.ext.commands import Bot, Cog, command
+from discord import Message
+from discord.ext.commands import Bot, Cog, Context, group
+
+from commanderbot_ext.jira.jira_cache import JiraIssueCache
+from commanderbot_ext.jira.jira_cache_file import JiraCacheFile
+from commanderbot_ext.jira.jira_client import (
+    JiraClient,
+    JiraError,
+    JiraUnavailableError,
+)
+from commanderbot_ext.jira.jira_issue import JiraIssue
+from commanderbot_ext.jira.jira_options import JiraOptions
+from commanderbot_ext.utils import is_command, toggle_auto_channel
+
+
+def compile_issue_pattern(url: str, project_keys: List[str]) -> "re.Pattern[str]":
+    """
+    Compile a pattern matching links to issues on the Jira instance at `url`, capturing
+    the key in the first group, and the keys of the given projects on their own, capturing
+    them in the second group.
+    """
+    parsed_url = urlparse(url)
+    browse_url = re.escape(f"{parsed_url.netloc}{parsed_url.path.rstrip('/')}/browse/")
+    pattern = f"{browse_url}([A-Za-z][A-Za-z0-9_]*-[0-9]+)"
+    if project_keys:
+        keys = "|".join(re.escape(project_key) for project_key in project_keys)
+        pattern += rf"|\b((?:{keys})-[0-9]+)\b"
+    return re.compile(pattern)
 
 
 class JiraCog(Cog):
-    def __init__(self, bot: Bot):
+    def __init__(self, bot: Bot, **options):
         self.bot: Bot = bot
+        self.options: JiraOptions = JiraOptions(**options)
         self._log: Logger = get_clogger(self)
+        self.url: str = self.options.url.rstrip("/")
+        self.issue_pattern: "re.Pattern[str]" = compile_issue_pattern(
+            self.url, self.options.project_keys
+        )
+        self.client: JiraClient = JiraClient(self.url, self.options, self._log)
+        self.cache: JiraIssueCache = JiraIssueCache(
+            max_size=self.options.cache_size,
+            ttl=self.options.cache_ttl,
+            ttl_resolved=self.options.cache_ttl_resolved,
+            stale_ttl=self.options.cache_stale_ttl,
+        )
+        # The cache is loaded from its file before the first lookup, and then saved in the
+        # background every so often.
+        self._cache_file: Optional[JiraCacheFile] = None
+        if self.options.cache_file:
+            self._cache_file = JiraCacheFile(self.options.cache_file)
+        self._cache_loaded: bool = False
+        self._load_cache_task: Optional["asyncio.Task[None]"] = None
+        self._save_cache_task: Optional["asyncio.Task[None]"] = None
+        # Issues that are being fetched, so that concurrent lookups share one request.
+        self._fetches: Dict[str, "asyncio.Future[Optional[JiraIssue]]"] = {}
+        self.coalesced_lookups: int = 0
+        self._auto_lookup_channel_ids: Set[int] = set(self.options.auto_lookup_channels)
 
-        self.resolution_table = {
-            "https://bugs.mojang.com/rest/api/2/resolution/1": "Fixed",
-            "https://bugs.mojang.com/rest/api/2/resolution/2": "Won't Fix",
-            "https://bugs.mojang.com/rest/api/2/resolution/3": "Duplicate",
-            "https://bugs.mojang.com/rest/api/2/resolution/4": "Incomplete",
-            "https://bugs.mojang.com/rest/api/2/resolution/5": "Cannot Reproduce",
-            "https://bugs.mojang.com/rest/api/2/resolution/6": "Works as Intended",
-            "https://bugs.mojang.com/rest/api/2/resolution/7": "Invalid",
-            "https://bugs.mojang.com/rest/api/2/resolution/10001": "Awaiting Response",
-            "https://bugs.mojang.com/rest/api/2/resolution/10003": "Done",
-        }
-
-        self.status_table = {
-            "https://bugs.mojang.com/rest/api/2/status/1": "Open",
-            "https://bugs.mojang.com/rest/api/2/status/3": "In Progress",
-            "https://bugs.mojang.com/rest/api/2/status/4": "Reopened",
-            "https://bugs.mojang.com/rest/api/2/status/5": "Resolved",
-            "https://bugs.mojang.com/rest/api/2/status/6": "Closed",
-            "https://bugs.mojang.com/rest/api/2/status/10200": "Postponed",
-        }
-
-    # TODO remove hardcoded status and resolve values and add config for JIRA URL and bug ID format
-    @command(name="jira", aliases=["bug"])
-    async def cmd_jira(self, ctx: discord.Message, bug_id: str):
-        # Assume the parameter is a URL, so get the ID from it
-        if "/" in bug_id:
-            bug_id = bug_id.split("/")[-1]
+        # The names of statuses and resolutions by id, refreshed every so often.
+        self.status_names: Dict[str, str] = {}
+        self.resolution_names: Dict[str, str] = {}
+        self._metadata_refreshed_at: Optional[float] = None
+        self._metadata_retry_at: float = 0.0
+        self._metadata_refresh: Optional["asyncio.Task[None]"] = None
+
+    # @overrides Cog
+    def cog_unload(self):
+        self.bot.loop.create_task(self.close())
+
+    async def close(self):
+        if self._save_cache_task:
+            self._save_cache_task.cancel()
+            self._save_cache_task = None
+        await self.save_cache()
+        await self.client.close()
 
+    async def _ensure_cache_loaded(self):
+        if self._cache_loaded or self._cache_file is None:
+            return
+        if self._load_cache_task is None:
+            self._load_cache_task = self.bot.loop.create_task(self._load_cache())
+        await asyncio.shield(self._load_cache_task)
+
+    async def _load_cache(self):
         try:
-            report_data = requests.get(
-                f"https://bugs.mojang.com/rest/api/latest/issue/{bug_id}"
-            ).json()["fields"]
-        # Bug report doesn't exist
-        except KeyError:
-            await ctx.send(
-                f"**{bug_id.upper()}** is not accessible. This may be due to it being private or it may not exist."
-            )
+            data = await self.bot.loop.run_in_executor(None, self._cache_file.read)
+            if data:
+                loaded = self.cache.load(data)
+                self._log.info(
+                    f"Loaded {loaded} cached issues from: {self._cache_file.path}"
+                )
+        except:
+            # It's only a cache, so carry on without it.
+            self._log.exception("Failed to load cached issues")
+        self._cache_loaded = True
+        self._save_cache_task = self.bot.loop.create_task(
+            self._save_cache_periodically()
+        )
+
+    async def save_cache(self):
+        if not (self._cache_loaded and self.cache.dirty):
             return
+        # Serialized up-front, so that it's a snapshot of the cache as it is now.
+        data = self.cache.serialize()
+        try:
+            await self.bot.loop.run_in_executor(None, self._cache_file.write, data)
+        except:
+            # Try again next time.
+            self.cache.dirty = True
+            raise
+
+    async def _save_cache_periodically(self):
+        while True:
+            await asyncio.sleep(self.options.cache_save_interval)
+            try:
+                await self.save_cache()
+            except:
+                self._log.exception("Failed to save cached issues")
+
+    def _get_cached_issue(self, issue_key: str) -> Optional[JiraIssue]:
+        issue, stale = self.cache.get(issue_key)
+        if stale and issue_key not in self._fetches:
+            # Serve the stale issue right away, and refresh it for next time.
+            self.bot.loop.create_task(self._refresh_issue(issue_key))
+        return issue
 
-        title = f"[{bug_id.upper()}] {report_data['summary']}"
-        if report_data["assignee"] == None:
-            assignee = "Unassigned"
+    async def get_issue(self, issue_key: str) -> Optional[JiraIssue]:
+        await self._ensure_cache_loaded()
+        if issue := self._get_cached_issue(issue_key):
+            return issue
+        try:
+            # Shielded so that one lookup being cancelled doesn't fail everyone else's.
+            return await asyncio.shield(self._fetch_issue(issue_key))
+        except JiraError:
+            # Better to show an outdated issue than nothing while Jira is having trouble.
+            if issue := self.cache.peek(issue_key):
+                return issue
+            raise
+
+    async def get_issues(self, issue_keys: List[str]) -> List[JiraIssue]:
+        """
+        Return whichever of the issues are accessible, in order, using a single request for
+        all of the ones that aren't cached or already being fetched.
+        """
+        await self._ensure_cache_loaded()
+        issues: Dict[str, Optional[JiraIssue]] = {}
+        fetches: Dict[str, "asyncio.Future[Optional[JiraIssue]]"] = {}
+        missing_keys: List[str] = []
+        for issue_key in issue_keys:
+            if issue := self._get_cached_issue(issue_key):
+                issues[issue_key] = issue
+            elif fetch := self._fetches.get(issue_key):
+                self.coalesced_lookups += 1
+                fetches[issue_key] = fetch
+            else:
+                missing_keys.append(issue_key)
+        if missing_keys:
+            fetches.update(self._fetch_issues(missing_keys))
+        # Wait for all of them, so that none of their errors go unretrieved.
+        results = await asyncio.gather(
+            *(asyncio.shield(fetch) for fetch in fetches.values()),
+            return_exceptions=True,
+        )
+        for issue_key, result in zip(fetches, results):
+            if isinstance(result, BaseException):
+                raise result
+            issues[issue_key] = result
+        return [issue for issue_key in issue_keys if (issue := issues.get(issue_key))]
+
+    def _fetch_issues(
+        self, issue_keys: List[str]
+    ) -> Dict[str, "asyncio.Future[Optional[JiraIssue]]"]:
+        # Each issue gets a future of its own, which any other lookups of it share until
+        # the search is done.
+        fetches = {issue_key: self.bot.loop.create_future() for issue_key in issue_keys}
+        self._fetches.update(fetches)
+        search = self.bot.loop.create_task(self._search_and_cache_issues(issue_keys))
+        search.add_done_callback(lambda _: self._settle_fetches(search, fetches))
+        return fetches
+
+    def _settle_fetches(
+        self,
+        search: "asyncio.Task[Dict[str, JiraIssue]]",
+        fetches: Dict[str, "asyncio.Future[Optional[JiraIssue]]"],
+    ):
+        for issue_key, fetch in fetches.items():
+            if self._fetches.get(issue_key) is fetch:
+                del self._fetches[issue_key]
+            if search.cancelled():
+                fetch.cancel()
+            elif ex := search.exception():
+                fetch.set_exception(ex)
+            else:
+                fetch.set_result(search.result().get(issue_key))
+
+    async def _search_and_cache_issues(
+        self, issue_keys: List[str]
+    ) -> Dict[str, JiraIssue]:
+        try:
+            found_issues = await self.client.search_issues(issue_keys)
+        except JiraError:
+            found_issues = {
+                issue.key: issue
+                for issue_key in issue_keys
+                if (issue := self.cache.peek(issue_key))
+            }
+            if not found_issues:
+                raise
         else:
-            assignee = report_data["assignee"]["name"]
-        reporter = report_data["reporter"]["displayName"]
-        creation_date = report_data["created"][:10]
-        since_version = report_data["versions"][0]["name"]
+            for issue in found_issues.values():
+                self.cache.put(issue)
+        return found_issues
+
+    def _fetch_issue(self, issue_key: str) -> "asyncio.Task[Optional[JiraIssue]]":
+        if fetch := self._fetches.get(issue_key):
+            self.coalesced_lookups += 1
+            return fetch
+        fetch = self.bot.loop.create_task(self._fetch_and_cache_issue(issue_key))
+        self._fetches[issue_key] = fetch
+        fetch.add_done_callback(lambda _: self._fetches.pop(issue_key, None))
+        return fetch
 
+    async def _fetch_and_cache_issue(self, issue_key: str) -> Optional[JiraIssue]:
+        if issue := await self.client.get_issue(issue_key):
+            self.cache.put(issue)
+        return issue
+
+    async def _refresh_issue(self, issue_key: str):
+        try:
+            await self._fetch_issue(issue_key)
+        except JiraUnavailableError:
+            # It'll be refreshed once Jira is back.
+            pass
+        except JiraError as ex:
+            self._log.warning(f"Failed to refresh: {ex} ({ex.__cause__!r})")
+
+    def _ensure_metadata(self):
+        # Issues carry their own names too, so nothing ever waits on these: until they're
+        # loaded, or while Jira is down, the issue's own names are shown instead.
+        now = time.monotonic()
+        if now < self._metadata_retry_at:
+            return
+        if (
+            self._metadata_refreshed_at is None
+            or now - self._metadata_refreshed_at > self.options.metadata_ttl
+        ):
+            self._refresh_metadata()
+
+    def _refresh_metadata(self) -> "asyncio.Task[None]":
+        if self._metadata_refresh is None or self._metadata_refresh.done():
+            self._metadata_refresh = self.bot.loop.create_task(self._fetch_metadata())
+        return self._metadata_refresh
+
+    async def _fetch_metadata(self):
+        try:
+            self.status_names, self.resolution_names = await asyncio.gather(
+                self.client.get_names("status"), self.client.get_names("resolution")
+            )
+        except JiraError as ex:
+            self._log.warning(f"Failed to refresh: {ex} ({ex.__cause__!r})")
+            # Try again soon, rather than waiting for the next refresh to be due.
+            self._metadata_retry_at = (
+                time.monotonic() + self.options.metadata_retry_delay
+            )
+            return
+        self._metadata_refreshed_at = time.monotonic()
+
+    def get_status_name(self, issue: JiraIssue) -> str:
+        # Fall back to the issue's own names, such as for statuses added since the refresh.
+        if issue.is_resolved:
+            return self.resolution_names.get(issue.resolution_id, issue.resolution_name)
+        return self.status_names.get(issue.status_id, issue.status_name)
+
+    def make_embed(self, issue: JiraIssue) -> discord.Embed:
         jira_embed = discord.Embed(
-            title=title, url=f"https://bugs.mojang.com/browse/{bug_id}", color=0x00ACED
+            title=f"[{issue.key}] {issue.summary}",
+            url=f"{self.url}/browse/{issue.key}",
+            color=0x00ACED,
+        )
+        jira_embed.add_field(name="Reporter", value=issue.reporter, inline=True)
+        jira_embed.add_field(
+            name="Assignee", value=issue.assignee or "Unassigned", inline=True
+        )
+        jira_embed.add_field(name="Created On", value=issue.created_on, inline=True)
+        jira_embed.add_field(
+            name="Since Version", value=issue.since_version or "None", inline=True
         )
-        jira_embed.add_field(name="Reporter", value=reporter, inline=True)
-        jira_embed.add_field(name="Assignee", value=assignee, inline=True)
-        jira_embed.add_field(name="Created On", value=creation_date, inline=True)
-        jira_embed.add_field(name="Since Version", value=since_version, inline=True)
 
         # The bug report is still open
-        if report_data["resolution"] == None:
-            status = self.status_table[report_data["status"]["self"]]
-            votes = report_data["votes"]["votes"]
+        if not issue.is_resolved:
+            status = self.get_status_name(issue)
 
             """
             if not report_data["customfield_10500"]:
@@ -77,25 +308,130 @@ class JiraCog(Cog):
             """
 
             jira_embed.add_field(name="Status", value=status, inline=True)
-            jira_embed.add_field(name="Votes", value=votes, inline=True)
+            jira_embed.add_field(name="Votes", value=issue.votes, inline=True)
             # jira_embed.add_field(name="Confirmation", value=confirmation, inline=True)
 
         # The bug report is closed
         else:
-            resolution_status = self.resolution_table[report_data["resolution"]["self"]]
-            resolve_date = report_data["resolutiondate"][:10]
-            if not report_data["fixVersions"]:
-                fix_version = "None"
-            else:
-                fix_version = report_data["fixVersions"][0]["name"]
-
+            resolution_status = self.get_status_name(issue)
             jira_embed.add_field(
                 name="Resolution", value=resolution_status, inline=True
             )
-            jira_embed.add_field(name="Resolved On", value=resolve_date, inline=True)
-            jira_embed.add_field(name="Fix Version", value=fix_version, inline=True)
+            jira_embed.add_field(
+                name="Resolved On", value=issue.resolved_on, inline=True
+            )
+            jira_embed.add_field(
+                name="Fix Version", value=issue.fix_version or "None", inline=True
+            )
+
+        return jira_embed
+
+    def make_summary_embed(self, issues: List[JiraIssue]) -> discord.Embed:
+        lines = [
+            f"[{issue.key}]({self.url}/browse/{issue.key})"
+            f" {issue.summary} (**{self.get_status_name(issue)}**)"
+            for issue in issues
+        ]
+        return discord.Embed(description="\n".join(lines), color=0x00ACED)
+
+    def find_issue_keys(self, content: str) -> List[str]:
+        """Return the distinct issue keys mentioned in a message, up to the limit."""
+        issue_keys: Dict[str, None] = {}
+        for match in self.issue_pattern.finditer(content):
+            issue_keys[(match.group(1) or match.group(2)).upper()] = None
+            if len(issue_keys) >= self.options.auto_lookup_max_issues:
+                break
+        return list(issue_keys)
+
+    @Cog.listener()
+    async def on_message(self, message: Message):
+        if (
+            message.channel.id not in self._auto_lookup_channel_ids
+            or message.author.bot
+        ):
+            return
+        issue_keys = self.find_issue_keys(message.content)
+        if not issue_keys:
+            return
+        if await is_command(self.bot, message):
+            return
+        try:
+            issues = await self.get_issues(issue_keys)
+        except JiraError as ex:
+            # Nobody asked for these explicitly, so don't bother the channel about it.
+            self._log.warning(f"{ex} ({ex.__cause__!r})")
+            return
+        if issues:
+            self._ensure_metadata()
+            await message.channel.send(embed=self.make_summary_embed(issues))
+
+    @group(name="jira", aliases=["bug"], invoke_without_command=True)
+    async def cmd_jira(self, ctx: Context, bug_id: str):
+        # Assume the parameter is a URL, so get the ID from it
+        if "/" in bug_id:
+            bug_id = bug_id.split("/")[-1]
+        bug_id = bug_id.upper()
+
+        try:
+            issue = await self.get_issue(bug_id)
+        except JiraUnavailableError as ex:
+            await ctx.send(
+                f"Jira is unavailable right now, try again in {math.ceil(ex.retry_in)} seconds."
+            )
+            return
+        except JiraError as ex:
+            self._log.warning(f"{ex} ({ex.__cause__!r})")
+            await ctx.send(
+                f"**{bug_id}** could not be retrieved right now, try again later."
+            )
+            return
+
+        # Bug report doesn't exist
+        if issue is None:
+            await ctx.send(
+                f"**{bug_id}** is not accessible. This may be due to it being private or it may not exist."
+            )
+            return
 
+        self._ensure_metadata()
+        jira_embed = self.make_embed(issue)
         jira_embed.set_footer(
             text=str(ctx.message.author), icon_url=str(ctx.message.author.avatar_url)
         )
         await ctx.send(embed=jira_embed)
+
+    @cmd_jira.command(name="stats")
+    async def cmd_jira_stats(self, ctx: Context):
+        stats = self.cache.stats
+        breaker = self.client.breaker
+        breaker_state = breaker.state
+        if breaker.retry_in:
+            breaker_state += f" (retrying in {math.ceil(breaker.retry_in)} seconds)"
+        lookups = stats.hits + stats.stale_hits + stats.misses
+        hit_rate = (stats.hits + stats.stale_hits) / lookups if lookups else 0.0
+        await ctx.send(
+            f"Cached issues: {stats.size}/{self.cache.max_size}\n"
+            f"Hits: {stats.hits} (+{stats.stale_hits} stale)\n"
+            f"Misses: {stats.misses}\n"
+            f"Evictions: {stats.evictions}\n"
+            f"Coalesced lookups: {self.coalesced_lookups}\n"
+            f"Hit rate: {hit_rate:.1%}\n"
+            f"Jira: {breaker_state}\n"
+            f"Consecutive failures: {breaker.consecutive_failures}\n"
+            f"Circuit breaker trips: {breaker.trips}"
+        )
+
+    @cmd_jira.command(name="auto")
+    @checks.is_administrator()
+    async def cmd_jira_auto(self, ctx: Context, enabled: bool):
+        """
+        Toggle looking up issues mentioned in this channel, until the bot restarts. Add the
+        channel to `auto_lookup_channels` to keep it on for good.
+        """
+        await toggle_auto_channel(
+            ctx,
+            self._auto_lookup_channel_ids,
+            enabled,
+            subject="Issues mentioned",
+            action="looked up",
+        )
@@ -0,0 +1,68 @@
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+# Only the fields that are actually shown are requested, rather than the entire issue.
+ISSUE_FIELDS = (
+    "summary",
+    "reporter",
+    "assignee",
+    "created",
+    "versions",
+    "status",
+    "votes",
+    "resolution",
+    "resolutiondate",
+    "fixVersions",
+)
+
+
+@dataclass
+class JiraIssue:
+    """The parts of a Jira issue that are shown when it's looked up."""
+
+    key: str
+    summary: str
+    reporter: str
+    assignee: Optional[str]
+    created_on: str
+    since_version: Optional[str]
+    status_id: str
+    status_name: str
+    votes: int
+    resolution_id: Optional[str]
+    resolution_name: Optional[str]
+    resolved_on: Optional[str]
+    fix_version: Optional[str]
+
+    @property
+    def is_resolved(self) -> bool:
+        return self.resolution_id is not None
+
+    @staticmethod
+    def from_data(data: dict) -> "JiraIssue":
+        return JiraIssue(**data)
+
+    def serialize(self) -> dict:
+        return asdict(self)
+
+    @staticmethod
+    def from_fields(key: str, fields: dict) -> "JiraIssue":
+        assignee = fields.get("assignee")
+        resolution = fields.get("resolution")
+        versions = fields.get("versions") or ()
+        fix_versions = fields.get("fixVersions") or ()
+        return JiraIssue(
+            key=key.upper(),
+            summary=fields["summary"],
+            reporter=fields["reporter"]["displayName"],
+            assignee=assignee["name"] if assignee else None,
+            created_on=fields["created"][:10],
+            since_version=versions[0]["name"] if versions else None,
+            status_id=fields["status"]["id"],
+            status_name=fields["status"]["name"],
+            votes=fields["votes"]["votes"],
+            resolution_id=resolution["id"] if resolution else None,
+            resolution_name=resolution["name"] if resolution else None,
+            resolved_on=(fields.get("resolutiondate") or "")[:10] or None,
+            fix_version=fix_versions[0]["name"] if fix_versions else None,
+        )
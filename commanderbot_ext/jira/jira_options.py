@@ -0,0 +1,51 @@
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from commanderbot_lib.options.abc.cog_options import CogOptions
+
+MOJANG_PROJECT_KEYS = ("MC", "MCPE", "MCL", "MCD", "MCCE", "REALMS", "BDS", "WEB")
+
+
+@dataclass
+class JiraOptions(CogOptions):
+    # The Jira instance to look issues up on, and the projects whose keys are recognized
+    # in messages on their own, outside of a link.
+    url: str = "https://bugs.mojang.com"
+    project_keys: List[str] = field(default_factory=lambda: list(MOJANG_PROJECT_KEYS))
+
+    # How long (in seconds) to wait to connect to Jira, and then for each read.
+    connect_timeout: float = 5.0
+    read_timeout: float = 10.0
+
+    # The most requests to have in flight at once; any others wait their turn.
+    max_concurrent_requests: int = 4
+
+    # How many consecutive failures stop requests to Jira for a while, and how long (in
+    # seconds) that is at first and at most, as it doubles each time Jira is still down.
+    breaker_threshold: int = 5
+    breaker_cooldown: float = 30.0
+    breaker_max_cooldown: float = 600.0
+
+    # How many issues to cache, and how long (in seconds) they stay fresh. Resolved issues
+    # rarely change, so they're kept for longer.
+    cache_size: int = 256
+    cache_ttl: float = 300.0
+    cache_ttl_resolved: float = 3600.0
+
+    # How long (in seconds) past its TTL an issue may still be shown while it's refreshed.
+    cache_stale_ttl: float = 600.0
+
+    # Where to keep the cache between restarts, if anywhere, and how often (in seconds) to
+    # save it there when it changes.
+    cache_file: Optional[str] = None
+    cache_save_interval: float = 60.0
+
+    # How often (in seconds) to refresh the names of statuses and resolutions, and how long
+    # to wait before trying again when that fails.
+    metadata_ttl: float = 86400.0
+    metadata_retry_delay: float = 60.0
+
+    # Channels where issues mentioned in messages are looked up automatically, and the most
+    # issues to look up from any one message.
+    auto_lookup_channels: List[int] = field(default_factory=list)
+    auto_lookup_max_issues: int = 5
@@ -1,18 +1,130 @@
+import asyncio
+import re
+from typing import Dict, List, NamedTuple, Optional, Set
+
 import discord
+from commanderbot_lib import checks
 from commanderbot_lib.logging import Logger, get_clogger
-from discord.ext.commands import Bot, Cog, command
+from discord import (
+    Message,
+    RawBulkMessageDeleteEvent,
+    RawMessageDeleteEvent,
+    RawMessageUpdateEvent,
+    TextChannel,
+)
+from discord.ext.commands import Bot, Cog, Context, command, group
+
+from commanderbot_ext.quote.quote_message_cache import QuoteMessageCache
+from commanderbot_ext.quote.quote_options import QuoteOptions
+from commanderbot_ext.utils import can_read_history, is_command, toggle_auto_channel
+
+# Jump URLs of messages, from any of Discord's clients, capturing the guild, channel and
+# message IDs. Messages in DMs can't be quoted, so those links aren't matched.
+MESSAGE_LINK_PATTERN = re.compile(
+    r"https?://(?:(?:ptb|canary)\.)?discord(?:app)?\.com/channels"
+    r"/([0-9]{15,21})/([0-9]{15,21})/([0-9]{15,21})"
+)
+
+
+class MessageLink(NamedTuple):
+    url: str
+    guild_id: int
+    channel_id: int
+    message_id: int
 
 
 class QuoteCog(Cog):
-    def __init__(self, bot: Bot):
+    def __init__(self, bot: Bot, **options):
         self.bot: Bot = bot
+        self.options: QuoteOptions = QuoteOptions(**options)
         self._log: Logger = get_clogger(self)
+        self.message_cache: QuoteMessageCache = QuoteMessageCache(
+            self.options.message_cache_size
+        )
+        self._fetch_semaphore: Optional[asyncio.Semaphore] = None
+        self._auto_quote_channel_ids: Set[int] = set(self.options.auto_quote_channels)
+
+    def find_message_links(self, content: str) -> List[MessageLink]:
+        """Return the distinct message links in some text, up to the limit."""
+        links: Dict[int, MessageLink] = {}
+        for match in MESSAGE_LINK_PATTERN.finditer(content):
+            guild_id, channel_id, message_id = map(int, match.groups())
+            links.setdefault(
+                message_id,
+                MessageLink(match.group(0), guild_id, channel_id, message_id),
+            )
+            if len(links) >= self.options.max_quotes:
+                break
+        return list(links.values())
+
+    async def get_message(
+        self, channel: TextChannel, message_id: int
+    ) -> discord.Message:
+        # Recent messages are usually still in discord.py's own cache, newest last. Either
+        # cache is only trusted for messages in the linked channel, so that a link can't
+        # name one channel and quote a message from another.
+        message = discord.utils.find(
+            lambda cached_message: cached_message.id == message_id
+            and cached_message.channel.id == channel.id,
+            reversed(self.bot.cached_messages),
+        )
+        if message is not None:
+            self.message_cache.client_hits += 1
+            return message
+        # Otherwise it may have been fetched for a quote before.
+        if message := self.message_cache.get(channel.id, message_id):
+            return message
+        # Not made in `__init__`, which may run before the bot's loop does (see `JiraClient`).
+        if self._fetch_semaphore is None:
+            self._fetch_semaphore = asyncio.Semaphore(
+                self.options.max_concurrent_fetches
+            )
+        async with self._fetch_semaphore:
+            message = await channel.fetch_message(message_id)
+        self.message_cache.put(message)
+        return message
+
+    async def get_linked_message(
+        self, link: MessageLink, user: discord.abc.User
+    ) -> Optional[Message]:
+        channel = self.bot.get_channel(link.channel_id)
+        # Make sure the link is consistent, rather than trusting whichever part of it.
+        if not isinstance(channel, TextChannel) or channel.guild.id != link.guild_id:
+            return None
+        # Only quote messages that whoever linked them could have read themselves.
+        if not can_read_history(channel, user):
+            return None
+        try:
+            return await self.get_message(channel, link.message_id)
+        except (discord.NotFound, discord.Forbidden):
+            return None
+
+    async def get_linked_messages(
+        self, links: List[MessageLink], user: discord.abc.User
+    ) -> List[Message]:
+        """
+        Return whichever of the linked messages can be found and read by the user, fetched
+        concurrently.
+        """
+        messages = await asyncio.gather(
+            *(self.get_linked_message(link, user) for link in links)
+        )
+        return [message for message in messages if message is not None]
 
-    async def construct_embed(self, msg_link: str, quotem: bool = False):
-        message_link = msg_link.split("/")
-        message_channel = self.bot.get_channel(int(message_link[-2]))
-        message = await message_channel.fetch_message(int(message_link[-1]))
+    @Cog.listener()
+    async def on_raw_message_edit(self, payload: RawMessageUpdateEvent):
+        self.message_cache.invalidate(payload.message_id)
 
+    @Cog.listener()
+    async def on_raw_message_delete(self, payload: RawMessageDeleteEvent):
+        self.message_cache.invalidate(payload.message_id)
+
+    @Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload: RawBulkMessageDeleteEvent):
+        for message_id in payload.message_ids:
+            self.message_cache.invalidate(message_id)
+
+    def make_embed(self, message: Message) -> discord.Embed:
         # message.author is name + discrim, icon_url is authors avatar
         quote_embed = discord.Embed(
             description=message.clean_content, timestamp=message.created_at
@@ -20,21 +132,82 @@ class QuoteCog(Cog):
         quote_embed.set_author(
             name=str(message.author), icon_url=str(message.author.avatar_url)
         )
-        quote_embed.set_footer(text=f"#{message_channel.name}")
-
-        if quotem:
-            return (quote_embed, message.author)
+        quote_embed.set_footer(text=f"#{message.channel.name}")
         return quote_embed
 
-    @command(name="quote")
-    async def cmd_quote(self, ctx: discord.Message, msg_link: str):
-        quote_embed = await self.construct_embed(msg_link)
-        await ctx.send(f"{ctx.author.mention}\n{msg_link}", embed=quote_embed)
+    async def send_quotes(
+        self,
+        destination: discord.abc.Messageable,
+        content: Optional[str],
+        messages: List[Message],
+    ):
+        # Each message can only have one embed, so any after the first follow on their own.
+        await destination.send(content, embed=self.make_embed(messages[0]))
+        for message in messages[1:]:
+            await destination.send(embed=self.make_embed(message))
 
-    @command(name="quotem")
-    async def cmd_quotem(self, ctx: discord.Message, msg_link: str):
-        quote_embed = await self.construct_embed(msg_link, quotem=True)
+    async def quote_links(self, ctx: Context, msg_links: str, mention_authors: bool):
+        links = self.find_message_links(msg_links)
+        if not links:
+            await ctx.send("There are no message links to quote.")
+            return
+        messages = await self.get_linked_messages(links, ctx.author)
+        if not messages:
+            await ctx.send("None of the linked messages could be found.")
+            return
+        mentions = [ctx.author.mention]
+        if mention_authors:
+            for message in messages:
+                if message.author.mention not in mentions:
+                    mentions.append(message.author.mention)
+        urls = "\n".join(link.url for link in links)
+        await self.send_quotes(ctx, f"{' '.join(mentions)}\n{urls}", messages)
+
+    @Cog.listener()
+    async def on_message(self, message: Message):
+        if message.channel.id not in self._auto_quote_channel_ids or message.author.bot:
+            return
+        links = self.find_message_links(message.content)
+        if not links:
+            return
+        if await is_command(self.bot, message):
+            return
+        if messages := await self.get_linked_messages(links, message.author):
+            await self.send_quotes(message.channel, None, messages)
+
+    @group(name="quote", invoke_without_command=True)
+    async def cmd_quote(self, ctx: Context, *, msg_links: str):
+        await self.quote_links(ctx, msg_links, mention_authors=False)
+
+    @cmd_quote.command(name="stats")
+    async def cmd_quote_stats(self, ctx: Context):
+        stats = self.message_cache.stats
+        lookups = stats.client_hits + stats.hits + stats.misses
+        hit_rate = (stats.client_hits + stats.hits) / lookups if lookups else 0.0
         await ctx.send(
-            f"{ctx.author.mention} {quote_embed[1].mention}\n{msg_link}",
-            embed=quote_embed[0],
+            f"Cached messages: {stats.size}/{self.message_cache.max_size}\n"
+            f"Hits: {stats.hits} (+{stats.client_hits} from discord.py's cache)\n"
+            f"Fetched: {stats.misses}\n"
+            f"Invalidations: {stats.invalidations}\n"
+            f"Evictions: {stats.evictions}\n"
+            f"Hit rate: {hit_rate:.1%}"
+        )
+
+    @cmd_quote.command(name="auto")
+    @checks.is_administrator()
+    async def cmd_quote_auto(self, ctx: Context, enabled: bool):
+        """
+        Toggle quoting messages linked in this channel, until the bot restarts. Add the
+        channel to `auto_quote_channels` to keep it on for good.
+        """
+        await toggle_auto_channel(
+            ctx,
+            self._auto_quote_channel_ids,
+            enabled,
+            subject="Messages linked",
+            action="quoted",
         )
+
+    @command(name="quotem")
+    async def cmd_quotem(self, ctx: Context, *, msg_links: str):
+        await self.quote_links(ctx, msg_links, mention_authors=True)
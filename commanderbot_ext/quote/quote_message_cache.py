@@ -0,0 +1,71 @@
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from discord import Message
+
+
+class QuoteMessageCacheStats(NamedTuple):
+    size: int
+    client_hits: int
+    hits: int
+    misses: int
+    invalidations: int
+    evictions: int
+
+
+class QuoteMessageCache:
+    """
+    A bounded cache of messages that had to be fetched to be quoted, evicting the
+    least-recently-used ones. Messages are dropped as soon as they're edited or deleted, so
+    that a quote never shows anything that's out of date.
+
+    Attributes
+    -----------
+    max_size: :class:`int`
+        The most messages to keep at once.
+    client_hits: :class:`int`
+        How many messages were found in discord.py's own cache instead, which is counted
+        here so that all of the hit rates can be reported together.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size: int = max_size
+        self.client_hits: int = 0
+        self._messages: "OrderedDict[int, Message]" = OrderedDict()
+        self._hits: int = 0
+        self._misses: int = 0
+        self._invalidations: int = 0
+        self._evictions: int = 0
+
+    @property
+    def stats(self) -> QuoteMessageCacheStats:
+        return QuoteMessageCacheStats(
+            size=len(self._messages),
+            client_hits=self.client_hits,
+            hits=self._hits,
+            misses=self._misses,
+            invalidations=self._invalidations,
+            evictions=self._evictions,
+        )
+
+    def get(self, channel_id: int, message_id: int) -> Optional[Message]:
+        # Keyed by message ID alone, so that edits and deletions can be matched without
+        # their channel, but a hit only counts if the message is in the channel asked for.
+        message = self._messages.get(message_id)
+        if message is None or message.channel.id != channel_id:
+            self._misses += 1
+            return None
+        self._messages.move_to_end(message_id)
+        self._hits += 1
+        return message
+
+    def put(self, message: Message):
+        self._messages[message.id] = message
+        self._messages.move_to_end(message.id)
+        while len(self._messages) > self.max_size:
+            self._messages.popitem(last=False)
+            self._evictions += 1
+
+    def invalidate(self, message_id: int):
+        if self._messages.pop(message_id, None) is not None:
+            self._invalidations += 1
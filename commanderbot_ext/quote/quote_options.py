@@ -0,0 +1,17 @@
+from dataclasses import dataclass, field
+from typing import List
+
+from commanderbot_lib.options.abc.cog_options import CogOptions
+
+
+@dataclass
+class QuoteOptions(CogOptions):
+    # How many fetched messages to keep, on top of the ones discord.py already caches.
+    message_cache_size: int = 256
+
+    # The most messages to quote at once, and to fetch at the same time while doing so.
+    max_quotes: int = 5
+    max_concurrent_fetches: int = 3
+
+    # Channels where links to messages are quoted automatically.
+    auto_quote_channels: List[int] = field(default_factory=list)
@@ -0,0 +1,52 @@
+import os
+from pathlib import Path
+from typing import Set
+
+import discord
+from discord import Message, TextChannel
+from discord.ext.commands import Bot, Context
+
+
+def write_file_atomically(path: Path, content: bytes):
+    # Write to a temporary file first, so a crash never leaves a file half-written.
+    temp_path = path.with_name(path.name + ".tmp")
+    with open(temp_path, "wb") as file:
+        file.write(content)
+    os.replace(temp_path, path)
+
+
+def can_read_history(channel: TextChannel, user: discord.abc.User) -> bool:
+    # The user may be a member of another guild than the channel's, if it's linked there.
+    member = user
+    if not (isinstance(member, discord.Member) and member.guild == channel.guild):
+        member = channel.guild.get_member(user.id)
+        if member is None:
+            return False
+    permissions = channel.permissions_for(member)
+    return permissions.read_messages and permissions.read_message_history
+
+
+async def is_command(bot: Bot, message: Message) -> bool:
+    # Cogs that reply to messages by themselves leave commands alone, including their own,
+    # so that those are answered the usual way instead of twice.
+    ctx = await bot.get_context(message)
+    return ctx.valid
+
+
+async def toggle_auto_channel(
+    ctx: Context, channel_ids: Set[int], enabled: bool, subject: str, action: str
+):
+    """
+    Add or remove the channel from those that a cog replies to messages in by itself, and
+    say so, such as: "<subject> in this channel will be <action> until the bot restarts."
+    """
+    if enabled:
+        channel_ids.add(ctx.channel.id)
+        await ctx.send(
+            f"{subject} in this channel will be {action} until the bot restarts."
+        )
+    else:
+        channel_ids.discard(ctx.channel.id)
+        await ctx.send(
+            f"{subject} in this channel will no longer be {action} until the bot restarts."
+        )
@@ -1,7 +1,8 @@
-from discord.ext import commands
+from commanderbot_lib.utils import add_configured_cog
+from discord.ext.commands import Bot
 
 from commanderbot_ext.vote.vote_cog import VoteCog
 
 
-def setup(bot: commands.Bot):
-    bot.add_cog(VoteCog(bot))
+def setup(bot: Bot):
+    add_configured_cog(bot, VoteCog)
@@ -1,54 +1,255 @@
+import asyncio
 import re
+import time
+import weakref
+from collections import OrderedDict
+from typing import Dict, List, Optional
 
 import discord
 from commanderbot_lib.logging import Logger, get_clogger
+from discord import (
+    RawReactionActionEvent,
+    RawReactionClearEmojiEvent,
+    RawReactionClearEvent,
+    TextChannel,
+)
 from discord.ext.commands import Bot, Cog, Context, command
 
+from commanderbot_ext.utils import can_read_history
+from commanderbot_ext.vote.vote_options import VoteOptions
+from commanderbot_ext.vote.vote_tally import VoteTally, normalize_emoji
+
+# Characters that are always rendered as emojis, even on their own: those in the BMP with
+# emoji presentation, and the pictographic blocks beyond it. Regional indicators and skin
+# tone modifiers are left out, since they only combine with others.
+_EMOJI_PRESENTATION_CHARACTER = (
+    "["
+    "\u231a\u231b\u23e9-\u23ec\u23f0\u23f3\u25fd\u25fe\u2614\u2615\u2648-\u2653"
+    "\u267f\u2693\u26a1\u26aa\u26ab\u26bd\u26be\u26c4\u26c5\u26ce\u26d4\u26ea"
+    "\u26f2\u26f3\u26f5\u26fa\u26fd\u2705\u270a\u270b\u2728\u274c\u274e"
+    "\u2753-\u2755\u2757\u2795-\u2797\u27b0\u27bf\u2b1b\u2b1c\u2b50\u2b55"
+    "\U0001f000-\U0001f1e5"
+    "\U0001f200-\U0001f3fa"
+    "\U0001f400-\U0001faff"
+    "]"
+)
+
+# Characters that are only rendered as emojis when followed by the emoji presentation
+# selector, and are otherwise just symbols, such as © and ™.
+_TEXT_PRESENTATION_CHARACTER = (
+    "["
+    "\u00a9\u00ae\u203c\u2049\u2122\u2139\u2194-\u2199\u21a9\u21aa\u2328\u23cf"
+    "\u23ed-\u23ef\u23f1\u23f2\u23f8-\u23fa\u24c2\u25aa\u25ab\u25b6\u25c0"
+    "\u25fb\u25fc\u2600-\u27bf\u2934\u2935\u2b05-\u2b07\u3030\u303d\u3297\u3299"
+    "]"
+)
+
+# A single emoji character, followed by any presentation selector, skin tone, or tags (as
+# in subdivision flags).
+_EMOJI_CHARACTER = (
+    f"(?:{_EMOJI_PRESENTATION_CHARACTER}|{_TEXT_PRESENTATION_CHARACTER}\ufe0f)"
+    "[\ufe0f\U0001f3fb-\U0001f3ff\U000e0020-\U000e007f]*"
+)
+
+# A custom emoji, which may be animated.
+CUSTOM_EMOJI_PATTERN = re.compile(r"<a?:(?P<name>\w+):(?P<id>\d+)>")
+
+# Regex to get emojis in a message, one per match: custom emojis, flags (or lone regional
+# indicators), keycaps, and emojis joined into a sequence with zero-width joiners.
+EMOJI_PATTERN = re.compile(
+    r"<a?:\w+:\d+>"
+    "|[\U0001f1e6-\U0001f1ff]{1,2}"
+    "|[0-9#*]\ufe0f?\u20e3"
+    f"|{_EMOJI_CHARACTER}(?:\u200d{_EMOJI_CHARACTER})*"
+)
+
+# The emojis to use if none were specified.
+DEFAULT_EMOJIS = ("👍", "👎")
+
+# The most reactions a message can have.
+MAX_REACTIONS = 20
+
+
+def as_reaction(emoji: str) -> str:
+    # Custom emojis are reacted with by name and ID alone, whether animated or not.
+    if match := CUSTOM_EMOJI_PATTERN.fullmatch(emoji):
+        return f"{match['name']}:{match['id']}"
+    return emoji
+
 
 class VoteCog(Cog):
-    def __init__(self, bot: Bot):
+    def __init__(self, bot: Bot, **options):
         self.bot: Bot = bot
+        self.options: VoteOptions = VoteOptions(**options)
         self._log: Logger = get_clogger(self)
-
-    def get_emojis(self, message: discord.Message, ctx: Context):
-        # Regex to get emojis in a message
-        # https://github.com/Arcensoth/cogbot/blob/e4157822202151c293203adbbc5a73175307ac43/cogbot/cog_bot.py#L23
-        emoji_patterns = re.compile(
-            "["
-            "\U0001F1E0-\U0001F1FF"
-            "\U0001F300-\U0001F5FF"
-            "\U0001F600-\U0001F64F"
-            "\U0001F680-\U0001F6FF"
-            "\U0001F700-\U0001F77F"
-            "\U0001F780-\U0001F7FF"
-            "\U0001F800-\U0001F8FF"
-            "\U0001F900-\U0001F9FF"
-            "\U0001FA00-\U0001FA6F"
-            "\U0001FA70-\U0001FAFF"
-            "\U00002702-\U000027B0"
-            "\U000024C2-\U0001F251"
-            "\U0000200d"
-            "]+|"
-            r"\<\:\w+\:\d+\>"
-            "",
-            flags=re.UNICODE,
+        # How many reactions may be waiting to be added in each channel at once.
+        self._channel_budgets: "weakref.WeakValueDictionary[int, asyncio.Semaphore]" = (
+            weakref.WeakValueDictionary()
         )
+        # Tallies of the most recent votes by message ID, from oldest to newest.
+        self._tallies: "OrderedDict[int, VoteTally]" = OrderedDict()
 
-        # Get all emojis in the message and return a generator.
+    def get_emojis(self, message: discord.Message, ctx: Context) -> List[str]:
+        # Get all distinct emojis in the message, in order, up to the reaction cap.
         # All default emojis become unicode which can be reacted with no problem, and custom emojis become <:name:ID> which can be used normally
-        emoji_matches = emoji_patterns.findall(message.clean_content)
-        yield from emoji_matches
+        emojis: Dict[str, str] = {}
+        for emoji in EMOJI_PATTERN.findall(message.clean_content):
+            # The same emoji with and without its presentation selector is one reaction.
+            emojis.setdefault(normalize_emoji(emoji), emoji)
+            if len(emojis) >= MAX_REACTIONS:
+                break
+        return list(emojis.values())
+
+    def _get_channel_budget(self, channel_id: int) -> asyncio.Semaphore:
+        # Only kept around while something is using it, like discord.py's own locks.
+        budget = self._channel_budgets.get(channel_id)
+        if budget is None:
+            budget = asyncio.Semaphore(self.options.max_pending_reactions_per_channel)
+            self._channel_budgets[channel_id] = budget
+        return budget
+
+    async def add_reactions(self, message: discord.Message, emojis: List[str]):
+        started = time.perf_counter()
+        budget = self._get_channel_budget(message.channel.id)
+
+        async def add_reaction(emoji: str) -> bool:
+            async with budget:
+                try:
+                    # Attempt to react with the emoji specified
+                    await message.add_reaction(as_reaction(emoji))
+                    return True
+
+                # If any error occurred, then don't bother adding the reaction and log the error
+                except:
+                    self._log.exception(
+                        f"Couldn't add reaction {emoji} to message {message.id}"
+                    )
+                    return False
+
+        # Queue every reaction up-front, in order, so each one is sent as soon as the
+        # channel's rate limit allows. discord.py sends requests to the same channel one at
+        # a time and in the order they were made, so the reactions stay in order too.
+        added = await asyncio.gather(*(add_reaction(emoji) for emoji in emojis))
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self._log.info(
+            f"Added {sum(added)} of {len(emojis)} reactions to message {message.id}"
+            f" in {elapsed_ms:.0f} ms"
+        )
+
+    def track_vote(self, message: discord.Message, emojis: List[str]) -> VoteTally:
+        tally = VoteTally(
+            message_id=message.id,
+            channel_id=message.channel.id,
+            jump_url=message.jump_url,
+            emojis=emojis,
+            one_vote_per_user=self.options.one_vote_per_user,
+        )
+        self._tallies[message.id] = tally
+        while len(self._tallies) > self.options.max_tracked_votes:
+            self._tallies.popitem(last=False)
+        return tally
+
+    async def get_tally(
+        self, channel: TextChannel, message_id: int
+    ) -> Optional[VoteTally]:
+        if tally := self._tallies.get(message_id):
+            # Only if it's the channel that was asked about, which may have been checked.
+            return tally if tally.channel_id == channel.id else None
+        # The vote isn't being tracked, such as when it was made before a restart, so catch
+        # up on it from the message itself. It's tracked from then on.
+        try:
+            message = await channel.fetch_message(message_id)
+        except (discord.NotFound, discord.Forbidden):
+            return None
+        ctx = await self.bot.get_context(message)
+        if ctx.command is not self.cmd_vote:
+            return None
+        emojis = self.get_emojis(message, ctx) or list(DEFAULT_EMOJIS)
+        tally = self.track_vote(message, emojis)
+        for reaction in message.reactions:
+            # The bot's own reactions aren't votes.
+            count = reaction.count - 1 if reaction.me else reaction.count
+            user_ids = []
+            if tally.one_vote_per_user and count:
+                user_ids = [
+                    user.id
+                    async for user in reaction.users()
+                    if user.id != self.bot.user.id
+                ]
+            tally.set_votes(str(reaction.emoji), count, user_ids)
+        return tally
+
+    def get_latest_tally(self, channel_id: int) -> Optional[VoteTally]:
+        for tally in reversed(self._tallies.values()):
+            if tally.channel_id == channel_id:
+                return tally
+        return None
+
+    @Cog.listener()
+    async def on_raw_reaction_add(self, payload: RawReactionActionEvent):
+        tally = self._tallies.get(payload.message_id)
+        if tally is None or payload.user_id == self.bot.user.id:
+            return
+        previous_emoji = tally.add(payload.user_id, str(payload.emoji))
+        if previous_emoji is None:
+            return
+        # Take back the reaction of the vote that was just replaced.
+        channel = self.bot.get_channel(payload.channel_id)
+        try:
+            await channel.get_partial_message(payload.message_id).remove_reaction(
+                as_reaction(previous_emoji), discord.Object(payload.user_id)
+            )
+        except discord.HTTPException:
+            self._log.exception(
+                f"Couldn't remove reaction {previous_emoji}"
+                f" from message {payload.message_id}"
+            )
+
+    @Cog.listener()
+    async def on_raw_reaction_remove(self, payload: RawReactionActionEvent):
+        if tally := self._tallies.get(payload.message_id):
+            tally.remove(payload.user_id, str(payload.emoji))
+
+    @Cog.listener()
+    async def on_raw_reaction_clear(self, payload: RawReactionClearEvent):
+        if tally := self._tallies.get(payload.message_id):
+            tally.clear()
+
+    @Cog.listener()
+    async def on_raw_reaction_clear_emoji(self, payload: RawReactionClearEmojiEvent):
+        if tally := self._tallies.get(payload.message_id):
+            tally.clear_emoji(str(payload.emoji))
 
     @command(name="vote")
-    async def cmd_vote(self, ctx: discord.Message):
-        # If no emojis were specified, then use the default ones, then iterate over them (reaction cap is 20)
-        for emoji in (self.get_emojis(ctx.message, ctx) or ("👍", "👎"))[:20]:
-            try:
-                # Attempt to react with the emoji specified
-                await ctx.message.add_reaction(emoji)
-
-            # If any error occurred, then don't bother adding the reaction and log the error
-            except:
-                self._log.exception(
-                    f"Couldn't add reaction {emoji} to message {ctx.message.id}"
-                )
+    async def cmd_vote(self, ctx: Context):
+        # If no emojis were specified, then use the default ones
+        emojis = self.get_emojis(ctx.message, ctx) or list(DEFAULT_EMOJIS)
+        self.track_vote(ctx.message, emojis)
+        await self.add_reactions(ctx.message, emojis)
+
+    @command(name="voteresults")
+    async def cmd_voteresults(self, ctx: Context, message_link: Optional[str] = None):
+        if message_link is None:
+            tally = self.get_latest_tally(ctx.channel.id)
+        else:
+            # Either a link to the message, or just its ID in this channel.
+            ids = [int(part) for part in message_link.split("/") if part.isdigit()]
+            channel = self.bot.get_channel(ids[-2]) if len(ids) > 1 else ctx.channel
+            if not ids or not isinstance(channel, TextChannel):
+                await ctx.send(f"`{message_link}` is not a message link or ID.")
+                return
+            # Only show votes that whoever asked could have seen themselves.
+            if not can_read_history(channel, ctx.author):
+                await ctx.send("There is no vote to show the results of.")
+                return
+            tally = await self.get_tally(channel, ids[-1])
+        if tally is None:
+            await ctx.send("There is no vote to show the results of.")
+            return
+        total = sum(tally.counts.values())
+        lines = [f"Results of the vote at {tally.jump_url}:"]
+        for emoji in tally.emojis:
+            count = tally.get_count(emoji)
+            share = count / total if total else 0.0
+            lines.append(f"{emoji} **{count}** ({share:.0%})")
+        await ctx.send("\n".join(lines))
@@ -0,0 +1,15 @@
+from dataclasses import dataclass
+
+from commanderbot_lib.options.abc.cog_options import CogOptions
+
+
+@dataclass
+class VoteOptions(CogOptions):
+    # How many reactions may be waiting to be added in any one channel at once, so that
+    # a burst of votes in one channel can't queue up an unbounded number of requests.
+    max_pending_reactions_per_channel: int = 20
+
+    # Whether each user only gets a single vote, replacing any earlier one, and how many of
+    # the most recent votes to keep tallies of.
+    one_vote_per_user: bool = False
+    max_tracked_votes: int = 1000
@@ -0,0 +1,118 @@
+from typing import Dict, List, Optional
+
+
+def normalize_emoji(emoji: str) -> str:
+    # Reactions may or may not carry the emoji presentation selector, depending on where
+    # they came from, so it's ignored when comparing them.
+    return emoji.replace("\ufe0f", "")
+
+
+class VoteTally:
+    """
+    The votes on one message, counted by emoji and kept up-to-date from reaction events.
+
+    Attributes
+    -----------
+    message_id: :class:`int`
+        The ID of the message being voted on.
+    channel_id: :class:`int`
+        The ID of the channel the message is in.
+    jump_url: :class:`str`
+        A link to the message.
+    emojis: :class:`List[str]`
+        The emojis that can be voted with, in order.
+    counts: :class:`Dict[str, int]`
+        How many votes each emoji has, by normalized emoji.
+    one_vote_per_user: :class:`bool`
+        Whether each user only gets a single vote, replacing any earlier one.
+    """
+
+    def __init__(
+        self,
+        message_id: int,
+        channel_id: int,
+        jump_url: str,
+        emojis: List[str],
+        one_vote_per_user: bool,
+    ):
+        self.message_id: int = message_id
+        self.channel_id: int = channel_id
+        self.jump_url: str = jump_url
+        self.emojis: List[str] = emojis
+        self.counts: Dict[str, int] = {normalize_emoji(emoji): 0 for emoji in emojis}
+        self._emojis_by_key: Dict[str, str] = {
+            normalize_emoji(emoji): emoji for emoji in emojis
+        }
+        self.one_vote_per_user: bool = one_vote_per_user
+        # The current vote of each user, if they only get one.
+        self._choices: Dict[int, str] = {}
+
+    def add(self, user_id: int, emoji: str) -> Optional[str]:
+        """
+        Count a vote, and return the user's previous vote if it's been replaced by this one
+        and its reaction should be removed.
+        """
+        key = normalize_emoji(emoji)
+        if key not in self.counts:
+            return None
+        if not self.one_vote_per_user:
+            self.counts[key] += 1
+            return None
+        previous_key = self._choices.get(user_id)
+        if previous_key == key:
+            return None
+        self._choices[user_id] = key
+        self.counts[key] += 1
+        if previous_key is None:
+            return None
+        # Counted off right away, whether or not the reaction itself can be removed.
+        self.counts[previous_key] -= 1
+        return self._emojis_by_key[previous_key]
+
+    def remove(self, user_id: int, emoji: str):
+        key = normalize_emoji(emoji)
+        if key not in self.counts:
+            return
+        if not self.one_vote_per_user:
+            self.counts[key] = max(self.counts[key] - 1, 0)
+        elif self._choices.get(user_id) == key:
+            del self._choices[user_id]
+            self.counts[key] -= 1
+
+    def clear(self):
+        """Drop every vote, such as when all reactions are removed from the message."""
+        self.counts = dict.fromkeys(self.counts, 0)
+        self._choices.clear()
+
+    def clear_emoji(self, emoji: str):
+        """Drop every vote for an emoji, such as when its reaction is removed entirely."""
+        key = normalize_emoji(emoji)
+        if key not in self.counts:
+            return
+        self.counts[key] = 0
+        self._choices = {
+            user_id: choice
+            for user_id, choice in self._choices.items()
+            if choice != key
+        }
+
+    def set_votes(self, emoji: str, count: int, user_ids: List[int]):
+        """
+        Overwrite the votes for an emoji, such as when catching up after a restart. Only
+        the users are needed if each only gets one vote, and only the count otherwise.
+        """
+        key = normalize_emoji(emoji)
+        if key not in self.counts:
+            return
+        if not self.one_vote_per_user:
+            self.counts[key] = count
+            return
+        for user_id in user_ids:
+            self._choices[user_id] = key
+        # Anyone who voted more than once before now only has the last of their votes.
+        self.counts = dict.fromkeys(self.counts, 0)
+        for choice in self._choices.values():
+            self.counts[choice] += 1
+
+    def get_count(self, emoji: str) -> int:
+        return self.counts.get(normalize_emoji(emoji), 0)
@@ -0,0 +1,72 @@
+import asyncio
+import json
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Iterable, List, Optional
+
+from commanderbot_ext.faq.faq_cache import FaqEntry
+from commanderbot_ext.faq.faq_options import FaqOptions
+from commanderbot_ext.faq.faq_state import FaqState
+
+# Every kind of store, by what its database is named.
+DATABASES = {
+    "json": "faq.json",
+    "sqlite": "faq.db",
+    "sharded": "faqs",
+}
+
+guild = SimpleNamespace(id=1)
+
+
+class FakeAttachment:
+    def __init__(self, content: bytes):
+        self.content: bytes = content
+
+    async def read(self) -> bytes:
+        return self.content
+
+
+class FakeContext:
+    """Collects whatever is sent, along with the content of any file."""
+
+    def __init__(self, attachment: Optional[bytes] = None):
+        attachments = [FakeAttachment(attachment)] if attachment is not None else []
+        self.message = SimpleNamespace(attachments=attachments)
+        self.sent: List[str] = []
+        self.file_content: Optional[bytes] = None
+
+    async def send(self, content: str, file=None):
+        self.sent.append(content)
+        if file is not None:
+            self.file_content = file.fp.read()
+
+
+def make_database(tmp_path: Path, kind: str) -> str:
+    tmp_path.mkdir(parents=True, exist_ok=True)
+    path = tmp_path / DATABASES[kind]
+    # A single JSON file has to exist up-front, unlike the others.
+    if kind == "json" and not path.exists():
+        path.write_text(json.dumps({"version": 1, "data": {"guilds": {}}}))
+    return str(path)
+
+
+def make_entry(name: str, aliases: Iterable[str] = (), content: str = "") -> FaqEntry:
+    now = datetime(2021, 1, 1)
+    return FaqEntry(
+        name=name,
+        content=content or name.upper(),
+        message_link=None,
+        aliases=aliases,
+        added_on=now,
+        updated_on=now,
+        hits=0,
+    )
+
+
+async def open_state(database: str, **options) -> FaqState:
+    bot = SimpleNamespace(loop=asyncio.get_running_loop(), user=None)
+    cog = SimpleNamespace(qualified_name="faq")
+    state = FaqState(bot, cog, FaqOptions(database=database, **options))
+    await state.async_init()
+    return state
@@ -0,0 +1,36 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+
+def issue_fields(summary: str, resolved: bool = False) -> dict:
+    """Return the fields of a Jira issue, as the REST API would."""
+    return {
+        "summary": summary,
+        "reporter": {"displayName": "Reporter"},
+        "assignee": None,
+        "created": "2021-01-01T00:00:00.000+0000",
+        "versions": [{"name": "1.16.5"}],
+        "status": {"id": "5", "name": "Resolved" if resolved else "Open"},
+        "votes": {"votes": 3},
+        "resolution": {"id": "1", "name": "Fixed"} if resolved else None,
+        "resolutiondate": "2021-02-01T00:00:00.000+0000" if resolved else None,
+        "fixVersions": [],
+    }
+
+
+@asynccontextmanager
+async def serve_jira(
+    handler: Callable[[web.Request], Awaitable[web.StreamResponse]],
+) -> AsyncIterator[str]:
+    """Serve every Jira REST API request with `handler`, and yield the base URL."""
+    app = web.Application()
+    app.router.add_get("/rest/api/latest/{path:.*}", handler)
+    server = TestServer(app, host="127.0.0.1")
+    await server.start_server()
+    try:
+        yield str(server.make_url("")).rstrip("/")
+    finally:
+        await server.close()
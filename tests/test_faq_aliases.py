@@ -0,0 +1,129 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+from faq_stub import DATABASES, guild, make_database, make_entry, open_state
+
+from commanderbot_ext.faq.faq_cache import FaqEntries, FaqGuildData
+
+
+@pytest.fixture(params=DATABASES)
+def database(request, tmp_path: Path) -> str:
+    return make_database(tmp_path, request.param)
+
+
+def test_new_faq_cannot_take_a_name_or_alias_in_use(database: str):
+    async def run():
+        state = await open_state(database)
+        store = state.store
+        try:
+            assert await store.add_guild_faq(guild, make_entry("a", aliases=["x"]))
+            added = [
+                await store.add_guild_faq(guild, make_entry("x")),
+                await store.add_guild_faq(guild, make_entry("b", aliases=["a"])),
+                await store.add_guild_faq(guild, make_entry("c", aliases=["x"])),
+                await store.add_guild_faq(guild, make_entry("d", aliases=["y"])),
+            ]
+            return added, await store.count_guild_faqs(guild)
+        finally:
+            await state.close()
+
+    added, count = asyncio.run(run())
+    assert added == [False, False, False, True]
+    assert count == 2
+
+
+def test_alias_cannot_be_added_if_in_use(database: str):
+    async def run():
+        state = await open_state(database)
+        store = state.store
+        try:
+            await store.add_guild_faq(guild, make_entry("a", aliases=["x"]))
+            await store.add_guild_faq(guild, make_entry("b"))
+            entry = await store.get_guild_faq_by_name(guild, "b")
+            added = [
+                await store.add_alias_to_faq(guild, entry, "a"),
+                await store.add_alias_to_faq(guild, entry, "x"),
+                await store.add_alias_to_faq(guild, entry, "b"),
+                await store.add_alias_to_faq(guild, entry, "y"),
+                await store.add_alias_to_faq(guild, entry, "y"),
+            ]
+            found = await store.get_guild_faq(guild, "y")
+            return added, entry.aliases, found.name
+        finally:
+            await state.close()
+
+    added, aliases, found = asyncio.run(run())
+    assert added == [False, False, False, True, False]
+    assert aliases == {"y"}
+    assert found == "b"
+
+
+def test_keys_are_freed_when_removed(database: str):
+    async def run():
+        state = await open_state(database)
+        store = state.store
+        try:
+            await store.add_guild_faq(guild, make_entry("a", aliases=["x", "y"]))
+            entry = await store.get_guild_faq_by_name(guild, "a")
+            assert await store.remove_alias_from_faq(guild, entry, "x")
+            assert not await store.remove_alias_from_faq(guild, entry, "x")
+            after_alias = await store.add_guild_faq(guild, make_entry("x"))
+            await store.remove_guild_faq(guild, "a")
+            after_entry = [
+                await store.add_guild_faq(guild, make_entry("a")),
+                await store.add_guild_faq(guild, make_entry("y")),
+            ]
+            return after_alias, after_entry
+        finally:
+            await state.close()
+
+    after_alias, after_entry = asyncio.run(run())
+    assert after_alias
+    assert after_entry == [True, True]
+
+
+def test_import_skips_faqs_that_clash(database: str):
+    async def run():
+        state = await open_state(database)
+        store = state.store
+        try:
+            await store.add_guild_faq(guild, make_entry("a", aliases=["x"]))
+            entries = [
+                make_entry("b", aliases=["a"]),
+                make_entry("x"),
+                make_entry("c", aliases=["z"]),
+                # Replacing an entry may keep its own keys, but not take another's.
+                make_entry("a", aliases=["x", "w"], content="new"),
+            ]
+            result = await store.import_guild_faqs(guild, entries, overwrite=True)
+            replaced = await store.get_guild_faq(guild, "w")
+            return result, replaced.content
+        finally:
+            await state.close()
+
+    result, content = asyncio.run(run())
+    assert (result.added, result.replaced, result.skipped) == (1, 1, 2)
+    assert content == "new"
+
+
+def test_clashes_in_existing_data_resolve_to_names_first():
+    # Data from before clashes were refused may still have them.
+    guild_data = FaqGuildData(
+        guild_id=1,
+        entries=FaqEntries(
+            {
+                "x": make_entry("x"),
+                "a": make_entry("a", aliases=["x", "y"]),
+                "b": make_entry("b", aliases=["y"]),
+            }
+        ),
+    )
+    guild_data.rebuild_index()
+    assert guild_data.get_entry("x").name == "x"
+    # Each shadowed key falls through to the next entry using it, once it's freed.
+    guild_data.remove_entry("x")
+    assert guild_data.get_entry("x").name == "a"
+    guild_data.remove_entry("a")
+    assert guild_data.get_entry("x") is None
+    assert guild_data.get_entry("y").name == "b"
@@ -0,0 +1,125 @@
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+from faq_stub import (
+    DATABASES,
+    FakeContext,
+    guild,
+    make_database,
+    make_entry,
+    open_state,
+)
+
+from commanderbot_ext.faq.faq_guild_state import FaqGuildState
+
+
+def load_exported(content: bytes) -> dict:
+    # Aliases come out in no particular order.
+    entries = json.loads(content)["entries"]
+    for entry in entries.values():
+        entry["aliases"].sort()
+    return entries
+
+
+async def export_faqs(database: str) -> bytes:
+    state = await open_state(database)
+    try:
+        guild_state = FaqGuildState(
+            state.bot, state.cog, state.options, guild, state.store
+        )
+        ctx = FakeContext()
+        await guild_state.export_faqs(ctx)
+        return ctx.file_content
+    finally:
+        await state.close()
+
+
+async def import_faqs(database: str, content: bytes, policy: str) -> FakeContext:
+    state = await open_state(database)
+    try:
+        guild_state = FaqGuildState(
+            state.bot, state.cog, state.options, guild, state.store
+        )
+        ctx = FakeContext(attachment=content)
+        await guild_state.import_faqs(ctx, policy)
+        return ctx
+    finally:
+        await state.close()
+
+
+async def add_faqs(database: str, *entries):
+    state = await open_state(database)
+    try:
+        for entry in entries:
+            assert await state.store.add_guild_faq(guild, entry)
+    finally:
+        await state.close()
+
+
+@pytest.mark.parametrize("target_kind", DATABASES)
+@pytest.mark.parametrize("source_kind", DATABASES)
+def test_exported_faqs_are_imported_unchanged(
+    tmp_path: Path, source_kind: str, target_kind: str
+):
+    source = make_database(tmp_path / "source", source_kind)
+    target = make_database(tmp_path / "target", target_kind)
+    hit_entry = make_entry("b", aliases=["y", "z"], content="Bee")
+    hit_entry.hits = 5
+
+    async def run():
+        await add_faqs(source, make_entry("a", aliases=["x"]), hit_entry)
+        exported = await export_faqs(source)
+        ctx = await import_faqs(target, exported, "skip")
+        return exported, ctx.sent, await export_faqs(target)
+
+    exported, sent, reexported = asyncio.run(run())
+    assert sent == ["Imported FAQs: 2 added, 0 replaced, 0 skipped"]
+    entries = load_exported(exported)
+    assert load_exported(reexported) == entries
+    assert entries["b"]["aliases"] == ["y", "z"]
+    assert entries["b"]["hits"] == 5
+
+
+@pytest.mark.parametrize(
+    "policy, expected_content", [("skip", "A"), ("overwrite", "new")]
+)
+def test_existing_faqs_are_kept_or_replaced(
+    tmp_path: Path, policy: str, expected_content: str
+):
+    database = make_database(tmp_path, "json")
+    content = json.dumps({"entries": {"a": make_entry("a", content="new").serialize()}})
+
+    async def run():
+        await add_faqs(database, make_entry("a"))
+        ctx = await import_faqs(database, content.encode(), policy)
+        exported = await export_faqs(database)
+        return ctx.sent, json.loads(exported)["entries"]["a"]["content"]
+
+    sent, content = asyncio.run(run())
+    replaced, skipped = (1, 0) if policy == "overwrite" else (0, 1)
+    assert sent == [f"Imported FAQs: 0 added, {replaced} replaced, {skipped} skipped"]
+    assert content == expected_content
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        b"not json",
+        b'{"entries": {"a": {"content": 1}}}',
+        b'{"entries": {"a": {"content": "A", "message_link": null, "aliases": [],'
+        b' "added_on": "never", "updated_on": "never", "hits": 0}}}',
+    ],
+)
+def test_invalid_files_import_nothing(tmp_path: Path, content: bytes):
+    database = make_database(tmp_path, "json")
+
+    async def run():
+        ctx = await import_faqs(database, content, "skip")
+        exported = await export_faqs(database)
+        return ctx.sent, json.loads(exported)["entries"]
+
+    sent, entries = asyncio.run(run())
+    assert len(sent) == 1 and sent[0].startswith("Invalid FAQ file")
+    assert entries == {}
@@ -0,0 +1,133 @@
+import asyncio
+import json
+import logging
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from commanderbot_ext.faq import faq_store
+from commanderbot_ext.faq.faq_journal import FaqJournal
+from commanderbot_ext.faq.faq_options import FaqOptions
+from commanderbot_ext.faq.faq_store import FaqStore
+
+log = logging.getLogger(__name__)
+
+guild = SimpleNamespace(id=1)
+
+
+def read_seqs(path: Path):
+    with open(path, encoding="utf-8") as file:
+        return [json.loads(line)["seq"] for line in file]
+
+
+def make_database(tmp_path: Path) -> Path:
+    path = tmp_path / "faq.json"
+    path.write_text(json.dumps({"version": 1, "data": {"guilds": {}}}))
+    return path
+
+
+async def open_store(path: Path, **options) -> FaqStore:
+    bot = SimpleNamespace(loop=asyncio.get_running_loop())
+    cog = SimpleNamespace(qualified_name="faq")
+    store = FaqStore(bot, cog, FaqOptions(database=str(path), journal=True, **options))
+    await store.async_init()
+    return store
+
+
+def test_read_only_yields_changes_after_the_given_seq(tmp_path: Path):
+    path = tmp_path / "faq.journal.jsonl"
+    journal = FaqJournal(path, log)
+    journal.append([{"op": "a"}, {"op": "b"}, {"op": "c"}])
+    journal.close()
+
+    journal = FaqJournal(path, log)
+    assert [change["op"] for change in journal.read(after_seq=2)] == ["c"]
+    assert journal.last_seq == 3
+    assert journal.length == 3
+
+
+def test_append_continues_from_the_last_seq_read(tmp_path: Path):
+    path = tmp_path / "faq.journal.jsonl"
+    journal = FaqJournal(path, log)
+    journal.append([{"op": "a"}, {"op": "b"}])
+    journal.close()
+
+    journal = FaqJournal(path, log)
+    list(journal.read(after_seq=0))
+    journal.append([{"op": "c"}])
+    journal.close()
+    assert read_seqs(path) == [1, 2, 3]
+
+
+def test_read_skips_a_partially_written_line(tmp_path: Path):
+    path = tmp_path / "faq.journal.jsonl"
+    path.write_text('{"op": "a", "seq": 1}\n{"op": "b", "se')
+    journal = FaqJournal(path, log)
+    assert [change["op"] for change in journal.read(after_seq=0)] == ["a"]
+    assert journal.last_seq == 1
+
+
+def test_discard_through_keeps_only_later_changes(tmp_path: Path):
+    path = tmp_path / "faq.journal.jsonl"
+    journal = FaqJournal(path, log)
+    journal.append([{"op": "a"}, {"op": "b"}, {"op": "c"}])
+    journal.discard_through(2)
+    assert read_seqs(path) == [3]
+    assert journal.length == 1
+    # Appending afterwards carries on where it left off.
+    journal.append([{"op": "d"}])
+    journal.close()
+    assert read_seqs(path) == [3, 4]
+
+
+def test_changes_are_replayed_after_a_restart(tmp_path: Path):
+    path = make_database(tmp_path)
+
+    async def run():
+        store = await open_store(path)
+        await store.set_guild_prefix(guild, "a")
+        await store.set_guild_prefix(guild, "b")
+        # Nothing but the journal is written until it's compacted.
+        assert json.loads(path.read_text())["data"]["guilds"] == {}
+        await store.close()
+        store = await open_store(path)
+        prefixes = await store.get_guild_prefixes()
+        await store.close()
+        return prefixes
+
+    assert asyncio.run(run()) == {1: "b"}
+
+
+def test_compaction_keeps_changes_made_while_writing(tmp_path: Path, monkeypatch):
+    path = make_database(tmp_path)
+    journal_path = tmp_path / "faq.journal.jsonl"
+    write_file_atomically = faq_store.write_file_atomically
+
+    def write_slowly(*args):
+        time.sleep(0.2)
+        write_file_atomically(*args)
+
+    monkeypatch.setattr(faq_store, "write_file_atomically", write_slowly)
+
+    async def run():
+        store = await open_store(path, journal_compact_threshold=3)
+        for prefix in "abc":
+            await store.set_guild_prefix(guild, prefix)
+        compaction = store._compact_journal_task
+        assert compaction
+        await asyncio.sleep(0.05)
+        await store.set_guild_prefix(guild, "d")
+        await compaction
+        snapshot = json.loads(path.read_text())["data"]
+        assert snapshot["journal_seq"] == 3
+        assert snapshot["guilds"]["1"]["prefix"] == "c"
+        # Only the change made while writing is left, so the journal has shrunk.
+        assert read_seqs(journal_path) == [4]
+        assert store._compact_journal_task is None
+        await store.close()
+        store = await open_store(path)
+        prefixes = await store.get_guild_prefixes()
+        await store.close()
+        return prefixes
+
+    assert asyncio.run(run()) == {1: "d"}
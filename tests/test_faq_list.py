@@ -0,0 +1,38 @@
+import asyncio
+from pathlib import Path
+
+from faq_stub import FakeContext, guild, make_database, make_entry, open_state
+
+from commanderbot_ext.faq.faq_guild_state import MAX_MESSAGE_LENGTH, FaqGuildState
+
+
+def list_faqs(tmp_path: Path, names, page: int = 1, **options) -> FakeContext:
+    async def run():
+        state = await open_state(make_database(tmp_path, "json"), **options)
+        try:
+            for name in names:
+                await state.store.add_guild_faq(guild, make_entry(name))
+            guild_state = FaqGuildState(
+                state.bot, state.cog, state.options, guild, state.store
+            )
+            ctx = FakeContext()
+            await guild_state.list_faqs(ctx, page)
+            return ctx
+        finally:
+            await state.close()
+
+    return asyncio.run(run())
+
+
+def test_page_is_listed_in_one_message(tmp_path: Path):
+    ctx = list_faqs(tmp_path, ["b", "a", "c"], page=2, list_page_size=2)
+    assert ctx.sent == ["There are 3 FAQs available (page 2 of 2): `c`"]
+
+
+def test_long_page_is_split_over_several_messages(tmp_path: Path):
+    names = [f"{i:03}" + "x" * 96 for i in range(50)]
+    ctx = list_faqs(tmp_path, names, list_page_size=50)
+    assert len(ctx.sent) > 1
+    assert all(len(text) <= MAX_MESSAGE_LENGTH for text in ctx.sent)
+    listed = " ".join(ctx.sent).split(":", 1)[1].split()
+    assert listed == [f"`{name}`" for name in names]
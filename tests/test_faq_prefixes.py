@@ -0,0 +1,80 @@
+import asyncio
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from faq_stub import DATABASES, guild, make_database, make_entry, open_state
+
+from commanderbot_ext.faq.faq_cog import FaqCog
+
+
+@pytest.mark.parametrize("kind", DATABASES)
+def test_prefixes_are_kept_between_restarts(tmp_path: Path, kind: str):
+    database = make_database(tmp_path, kind)
+    other_guild = SimpleNamespace(id=2)
+
+    async def run():
+        state = await open_state(database)
+        try:
+            await state.store.set_guild_prefix(guild, "?")
+            await state.store.set_guild_prefix(other_guild, "!")
+            await state.store.set_guild_prefix(other_guild, None)
+        finally:
+            await state.close()
+        state = await open_state(database)
+        try:
+            return await state.store.get_guild_prefixes()
+        finally:
+            await state.close()
+
+    assert asyncio.run(run()) == {1: "?"}
+
+
+def test_sharded_prefixes_are_only_kept_in_the_manifest(tmp_path: Path):
+    database = make_database(tmp_path, "sharded")
+    guild_path = Path(database) / "1.json"
+
+    async def run():
+        state = await open_state(database)
+        try:
+            await state.store.add_guild_faq(guild, make_entry("a"))
+            await state.store.set_guild_prefix(guild, "?")
+        finally:
+            await state.close()
+        wrapper_data = json.loads(guild_path.read_text())
+        assert "prefix" not in wrapper_data["data"]
+        # Such as from before they were only kept in the manifest.
+        wrapper_data["data"]["prefix"] = "!"
+        guild_path.write_text(json.dumps(wrapper_data))
+        state = await open_state(database)
+        try:
+            guild_data = await state.store.get_guild_data(guild)
+            return await state.store.get_guild_prefixes(), guild_data.prefix
+        finally:
+            await state.close()
+
+    prefixes, guild_prefix = asyncio.run(run())
+    assert prefixes == {1: "?"}
+    assert guild_prefix == "?"
+
+
+def test_bot_messages_are_rejected(tmp_path: Path):
+    database = make_database(tmp_path, "json")
+
+    async def run():
+        state = await open_state(database, prefix="?")
+        cog = FaqCog(state.bot, database=database, prefix="?")
+        cog._state = state
+        try:
+            for bot in (True, False):
+                author = SimpleNamespace(bot=bot)
+                message = SimpleNamespace(
+                    content="?a", guild=guild, author=author, channel=None
+                )
+                await cog.on_message(message)
+        finally:
+            await state.close()
+        return cog.accepted_messages, cog.rejected_messages
+
+    assert asyncio.run(run()) == (1, 1)
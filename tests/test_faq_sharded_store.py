@@ -0,0 +1,60 @@
+import asyncio
+import json
+from pathlib import Path
+
+from faq_stub import guild, make_database, make_entry, open_state
+
+
+def write_old_shard(tmp_path: Path, make_wrapper_data) -> Path:
+    database = make_database(tmp_path, "sharded")
+    guild_path = Path(database) / "1.json"
+
+    async def run():
+        state = await open_state(database)
+        try:
+            await state.store.add_guild_faq(guild, make_entry("a", content="old"))
+        finally:
+            await state.close()
+
+    asyncio.run(run())
+    guild_data = json.loads(guild_path.read_text())["data"]
+    # Such as from before aliases, dates and hits were added.
+    for entry_data in guild_data["entries"].values():
+        for key in ("aliases", "added_on", "updated_on", "hits"):
+            del entry_data[key]
+    guild_path.write_text(json.dumps(make_wrapper_data(guild_data)))
+    return guild_path
+
+
+def read_entry(database: str):
+    async def run():
+        state = await open_state(database)
+        try:
+            entry = await state.store.get_guild_faq(guild, "a")
+            return entry.content, entry.aliases, entry.hits
+        finally:
+            await state.close()
+
+    return asyncio.run(run())
+
+
+def test_older_shard_is_migrated(tmp_path: Path):
+    guild_path = write_old_shard(
+        tmp_path, lambda guild_data: {"version": 0, "data": guild_data}
+    )
+    assert read_entry(str(guild_path.parent)) == ("old", set(), 0)
+    wrapper_data = json.loads(guild_path.read_text())
+    assert wrapper_data["version"] == 1
+    assert wrapper_data["data"]["entries"]["a"]["hits"] == 0
+    assert len(list(guild_path.parent.glob("1.backup.*.json"))) == 1
+
+
+def test_unversioned_shard_is_assumed_current(tmp_path: Path):
+    guild_path = write_old_shard(tmp_path, lambda guild_data: guild_data)
+    wrapper_data = json.loads(guild_path.read_text())
+    wrapper_data["entries"]["a"].update(aliases=[], hits=3)
+    wrapper_data["entries"]["a"]["added_on"] = "2021-01-01T00:00:00"
+    wrapper_data["entries"]["a"]["updated_on"] = "2021-01-01T00:00:00"
+    guild_path.write_text(json.dumps(wrapper_data))
+    assert read_entry(str(guild_path.parent)) == ("old", set(), 3)
+    assert json.loads(guild_path.read_text())["version"] == 1
@@ -0,0 +1,103 @@
+import asyncio
+import json
+import sqlite3
+from pathlib import Path
+
+import pytest
+from commanderbot_lib.database.abc.versioned_file_database import (
+    BackwardsMigrationError,
+)
+from faq_stub import guild, make_entry, open_state
+
+from commanderbot_ext.faq import faq_sqlite_migrations as sqlite_migrations
+
+
+def make_old_database(path: Path, version: int):
+    connection = sqlite3.connect(path)
+    with connection:
+        sqlite_migrations.m_1a_create_tables(connection)
+        sqlite_migrations.m_2a_create_trigrams(connection)
+        connection.execute(
+            "INSERT INTO faq_entries (guild_id, name, content, added_on, updated_on)"
+            " VALUES (1, 'old', 'legacy words here', '2020-01-01', '2020-01-01')"
+        )
+        connection.execute("INSERT INTO faq_aliases VALUES (1, 'ancient', 1)")
+        connection.execute(f"PRAGMA user_version = {version}")
+    connection.close()
+
+
+def get_user_version(path: Path) -> int:
+    connection = sqlite3.connect(path)
+    try:
+        return connection.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        connection.close()
+
+
+def test_older_schema_is_migrated(tmp_path: Path):
+    path = tmp_path / "faq.db"
+    make_old_database(path, version=2)
+
+    async def run():
+        state = await open_state(str(path))
+        store = state.store
+        try:
+            entry = await store.get_guild_faq(guild, "ancient")
+            results = await store.search_guild_faqs(guild, "legacy", 5)
+            return entry.name, [result.name for result in results]
+        finally:
+            await state.close()
+
+    name, results = asyncio.run(run())
+    assert name == "old"
+    # Existing entries are indexed for searching as part of the migration.
+    assert results == ["old"]
+    assert get_user_version(path) == 4
+
+
+def test_newer_schema_is_refused(tmp_path: Path):
+    path = tmp_path / "faq.db"
+    make_old_database(path, version=5)
+
+    async def run():
+        await open_state(str(path))
+
+    with pytest.raises(BackwardsMigrationError):
+        asyncio.run(run())
+
+
+def test_json_database_is_imported_on_creation(tmp_path: Path):
+    json_path = tmp_path / "faq.json"
+    entry = make_entry("datapacks", aliases=["dp"], content="Some words")
+    entry.hits = 3
+    data = {
+        "guilds": {"1": {"entries": {"datapacks": entry.serialize()}, "prefix": "?"}}
+    }
+    json_path.write_text(json.dumps({"version": 1, "data": data}))
+    path = tmp_path / "faq.db"
+
+    async def run():
+        state = await open_state(str(path), json_import=str(json_path))
+        store = state.store
+        try:
+            imported = await store.get_guild_faq(guild, "dp")
+            results = await store.search_guild_faqs(guild, "words", 5)
+            suggestions = await store.suggest_guild_faqs(guild, "datapack", 5)
+            prefixes = await store.get_guild_prefixes()
+            # Only the first time, so that later changes to it are left alone.
+            await store.remove_guild_faq(guild, "datapacks")
+        finally:
+            await state.close()
+        state = await open_state(str(path), json_import=str(json_path))
+        try:
+            count = await state.store.count_guild_faqs(guild)
+        finally:
+            await state.close()
+        return imported, results, suggestions, prefixes, count
+
+    imported, results, suggestions, prefixes, count = asyncio.run(run())
+    assert imported.serialize() == entry.serialize()
+    assert [result.name for result in results] == ["datapacks"]
+    assert suggestions == ["datapacks"]
+    assert prefixes == {1: "?"}
+    assert count == 0
@@ -0,0 +1,231 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+from aiohttp import web
+from jira_stub import serve_jira
+
+from commanderbot_ext.jira import jira_circuit_breaker
+from commanderbot_ext.jira.jira_circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    JiraCircuitBreaker,
+    parse_retry_after,
+)
+from commanderbot_ext.jira.jira_client import (
+    JiraClient,
+    JiraError,
+    JiraUnavailableError,
+)
+from commanderbot_ext.jira.jira_options import JiraOptions
+
+log = logging.getLogger(__name__)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now: float = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(jira_circuit_breaker, "time", clock)
+    return clock
+
+
+def make_breaker() -> JiraCircuitBreaker:
+    return JiraCircuitBreaker(threshold=3, cooldown=30, max_cooldown=100, log=log)
+
+
+def request(breaker: JiraCircuitBreaker, healthy, retry_after=None):
+    # A request that's let through, and then finishes before any other starts.
+    token = breaker.allow()
+    assert token is not None
+    breaker.record(token, healthy, retry_after)
+
+
+def test_opens_after_threshold(clock):
+    breaker = make_breaker()
+    for _ in range(2):
+        request(breaker, False)
+    assert breaker.state == CLOSED
+    request(breaker, False)
+    assert breaker.state == OPEN
+    assert breaker.trips == 1
+    assert breaker.retry_in == 30
+
+
+def test_success_resets_failures(clock):
+    breaker = make_breaker()
+    request(breaker, False)
+    request(breaker, False)
+    request(breaker, True)
+    request(breaker, False)
+    assert breaker.state == CLOSED
+    assert breaker.consecutive_failures == 1
+
+
+def test_rejects_while_open(clock):
+    breaker = make_breaker()
+    for _ in range(3):
+        request(breaker, False)
+    clock.advance(29)
+    assert breaker.allow() is None
+    assert breaker.state == OPEN
+    assert breaker.retry_in == 1
+
+
+def test_half_open_lets_one_probe_through(clock):
+    breaker = make_breaker()
+    for _ in range(3):
+        request(breaker, False)
+    clock.advance(30)
+    token = breaker.allow()
+    assert token is not None
+    assert breaker.state == HALF_OPEN
+    # Everything else waits on the probe.
+    assert breaker.allow() is None
+    breaker.record(token, True)
+    assert breaker.state == CLOSED
+    assert breaker.consecutive_failures == 0
+    assert breaker.allow() is not None
+
+
+def test_cancelled_probe_allows_another(clock):
+    breaker = make_breaker()
+    for _ in range(3):
+        request(breaker, False)
+    clock.advance(30)
+    token = breaker.allow()
+    breaker.record(token, None)
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() is not None
+    # The cancelled probe no longer counts, even if it does finish after all.
+    breaker.record(token, True)
+    assert breaker.state == HALF_OPEN
+
+
+def test_earlier_requests_do_not_count(clock):
+    breaker = make_breaker()
+    slow_tokens = [breaker.allow() for _ in range(2)]
+    for _ in range(3):
+        request(breaker, False)
+    assert breaker.state == OPEN
+    # Requests from before the breaker opened neither re-open nor close it.
+    breaker.record(slow_tokens[0], False, retry_after=500)
+    assert breaker.retry_in == 30
+    clock.advance(30)
+    probe_token = breaker.allow()
+    breaker.record(slow_tokens[1], True)
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() is None
+    # Only the probe's own response does.
+    breaker.record(probe_token, True)
+    assert breaker.state == CLOSED
+
+
+def test_failed_probe_doubles_cooldown(clock):
+    breaker = make_breaker()
+    for _ in range(3):
+        request(breaker, False)
+    expected_cooldowns = [60, 100, 100]
+    for cooldown in expected_cooldowns:
+        clock.advance(breaker.retry_in)
+        request(breaker, False)
+        assert breaker.state == OPEN
+        assert breaker.retry_in == cooldown
+    assert breaker.trips == 1
+    # Once the probe succeeds, the cooldown goes back to where it started.
+    clock.advance(breaker.retry_in)
+    request(breaker, True)
+    for _ in range(3):
+        request(breaker, False)
+    assert breaker.retry_in == 30
+    assert breaker.trips == 2
+
+
+def test_retry_after_opens_right_away(clock):
+    breaker = make_breaker()
+    request(breaker, False, retry_after=120)
+    assert breaker.state == OPEN
+    assert breaker.retry_in == 120
+    # A shorter one never cuts the cooldown short.
+    clock.advance(120)
+    request(breaker, False, retry_after=5)
+    assert breaker.retry_in == 60
+
+
+def test_parse_retry_after(clock):
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("") is None
+    assert parse_retry_after("garbage") is None
+    assert parse_retry_after("120") == 120
+    assert parse_retry_after("-5") == 0
+    date = datetime.fromtimestamp(clock.now, timezone.utc) + timedelta(seconds=90)
+    assert parse_retry_after(format_datetime(date, usegmt=True)) == 90
+
+
+def test_client_rejects_without_requesting():
+    calls = 0
+
+    async def handler(request: web.Request) -> web.Response:
+        nonlocal calls
+        calls += 1
+        return web.Response(status=503)
+
+    async def run():
+        async with serve_jira(handler) as url:
+            options = JiraOptions(breaker_threshold=2)
+            client = JiraClient(url, options, log)
+            try:
+                for _ in range(2):
+                    with pytest.raises(JiraError):
+                        await client.get_issue("MC-1")
+                with pytest.raises(JiraUnavailableError) as exc_info:
+                    await client.get_issue("MC-1")
+            finally:
+                await client.close()
+            return exc_info.value
+
+    error = asyncio.run(run())
+    assert calls == 2
+    assert 0 < error.retry_in <= 30
+
+
+def test_client_honours_retry_after():
+    calls = 0
+
+    async def handler(request: web.Request) -> web.Response:
+        nonlocal calls
+        calls += 1
+        return web.Response(status=429, headers={"Retry-After": "120"})
+
+    async def run():
+        async with serve_jira(handler) as url:
+            client = JiraClient(url, JiraOptions(), log)
+            try:
+                with pytest.raises(JiraError):
+                    await client.get_issue("MC-1")
+                with pytest.raises(JiraUnavailableError):
+                    await client.search_issues(["MC-1", "MC-2"])
+            finally:
+                await client.close()
+            return client.breaker
+
+    breaker = asyncio.run(run())
+    assert calls == 1
+    assert breaker.state == OPEN
+    assert 110 < breaker.retry_in <= 120
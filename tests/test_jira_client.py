@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import time
+from typing import List
+
+import pytest
+from aiohttp import web
+from jira_stub import issue_fields, serve_jira
+
+from commanderbot_ext.jira.jira_client import JiraClient, JiraError
+from commanderbot_ext.jira.jira_options import JiraOptions
+
+log = logging.getLogger(__name__)
+
+
+async def measure_lag(ticks: List[float], interval: float, stop: asyncio.Event):
+    # Records how late each tick wakes up, which is how long the loop was blocked for.
+    while not stop.is_set():
+        started = time.monotonic()
+        await asyncio.sleep(interval)
+        ticks.append(time.monotonic() - started - interval)
+
+
+def test_slow_responses_do_not_block_the_loop():
+    delay = 0.3
+
+    async def handler(request: web.Request) -> web.Response:
+        await asyncio.sleep(delay)
+        key = request.match_info["path"].rsplit("/", 1)[-1]
+        return web.json_response({"key": key, "fields": issue_fields(key)})
+
+    async def run():
+        async with serve_jira(handler) as url:
+            client = JiraClient(url, JiraOptions(max_concurrent_requests=2), log)
+            ticks: List[float] = []
+            stop = asyncio.Event()
+            ticker = asyncio.create_task(measure_lag(ticks, 0.01, stop))
+            started = time.monotonic()
+            try:
+                issues = await asyncio.gather(
+                    *(client.get_issue(f"MC-{i}") for i in range(4))
+                )
+            finally:
+                stop.set()
+                await ticker
+                await client.close()
+            return issues, time.monotonic() - started, ticks
+
+    issues, elapsed, ticks = asyncio.run(run())
+    assert [issue.summary for issue in issues] == [f"MC-{i}" for i in range(4)]
+    # Two at a time, so the four requests take two round trips.
+    assert 2 * delay <= elapsed < 4 * delay
+    assert len(ticks) > 10
+    assert max(ticks) < 0.1
+
+
+def test_read_timeout_fails_the_request():
+    async def handler(request: web.Request) -> web.Response:
+        await asyncio.sleep(2)
+        return web.json_response({})
+
+    async def run():
+        async with serve_jira(handler) as url:
+            client = JiraClient(url, JiraOptions(read_timeout=0.2), log)
+            started = time.monotonic()
+            try:
+                with pytest.raises(JiraError, match="Timed out"):
+                    await client.get_issue("MC-1")
+            finally:
+                await client.close()
+            return time.monotonic() - started, client.breaker.consecutive_failures
+
+    elapsed, failures = asyncio.run(run())
+    assert 0.2 <= elapsed < 1
+    assert failures == 1
+
+
+def test_missing_issue_is_none():
+    async def handler(request: web.Request) -> web.Response:
+        return web.json_response({"errorMessages": []}, status=404)
+
+    async def run():
+        async with serve_jira(handler) as url:
+            client = JiraClient(url, JiraOptions(), log)
+            try:
+                return await client.get_issue("MC-1"), client.breaker.state
+            finally:
+                await client.close()
+
+    issue, state = asyncio.run(run())
+    assert issue is None
+    assert state == "closed"
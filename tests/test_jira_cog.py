@@ -0,0 +1,88 @@
+import asyncio
+from types import SimpleNamespace
+from typing import List
+
+from aiohttp import web
+from jira_stub import issue_fields, serve_jira
+
+from commanderbot_ext.jira.jira_client import JiraError
+from commanderbot_ext.jira.jira_cog import JiraCog
+
+
+def parse_search_keys(request: web.Request) -> List[str]:
+    # The keys are given as: key in ("MC-1", "MC-2")
+    jql = request.query["jql"]
+    return [key.strip(' "') for key in jql[jql.index("(") + 1 : -1].split(",")]
+
+
+def make_cog(url: str) -> JiraCog:
+    bot = SimpleNamespace(loop=asyncio.get_running_loop())
+    return JiraCog(bot, url=url)
+
+
+def test_lookups_share_the_search_in_progress():
+    requests: List[str] = []
+
+    async def handler(request: web.Request) -> web.Response:
+        path = request.match_info["path"]
+        if path == "search":
+            requests.append(path)
+            await asyncio.sleep(0.2)
+            issues = [
+                {"key": key, "fields": issue_fields(key)}
+                for key in parse_search_keys(request)
+            ]
+            return web.json_response({"issues": issues})
+        if path.startswith("issue/"):
+            requests.append(path)
+            key = path.rsplit("/", 1)[-1]
+            return web.json_response({"key": key, "fields": issue_fields(key)})
+        return web.json_response([])
+
+    async def run():
+        async with serve_jira(handler) as url:
+            cog = make_cog(url)
+            try:
+                search = asyncio.create_task(cog.get_issues(["MC-1", "MC-2"]))
+                await asyncio.sleep(0.05)
+                in_progress = set(cog._fetches)
+                issue, issues = await asyncio.gather(
+                    cog.get_issue("MC-1"), cog.get_issues(["MC-2"])
+                )
+                searched = await search
+                return in_progress, issue, issues, searched, dict(cog._fetches)
+            finally:
+                await cog.close()
+
+    in_progress, issue, issues, searched, fetches = asyncio.run(run())
+    assert in_progress == {"MC-1", "MC-2"}
+    assert issue.summary == "MC-1"
+    assert [issue.summary for issue in issues] == ["MC-2"]
+    assert [issue.summary for issue in searched] == ["MC-1", "MC-2"]
+    assert requests == ["search"]
+    assert fetches == {}
+
+
+def test_failed_search_fails_everyone_sharing_it():
+    async def handler(request: web.Request) -> web.Response:
+        if request.match_info["path"] == "search":
+            await asyncio.sleep(0.2)
+            return web.Response(status=500)
+        return web.json_response([])
+
+    async def run():
+        async with serve_jira(handler) as url:
+            cog = make_cog(url)
+            try:
+                search = asyncio.create_task(cog.get_issues(["MC-1", "MC-2"]))
+                await asyncio.sleep(0.05)
+                results = await asyncio.gather(
+                    search, cog.get_issue("MC-2"), return_exceptions=True
+                )
+                return results, dict(cog._fetches)
+            finally:
+                await cog.close()
+
+    results, fetches = asyncio.run(run())
+    assert all(isinstance(result, JiraError) for result in results)
+    assert fetches == {}